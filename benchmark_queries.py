@@ -0,0 +1,506 @@
+"""
+Benchmark runner for the queries in bi_queries/.
+
+For every requested scale factor the runner:
+1. Generates a dataset with data_generation.py's streaming engine (seeded, so
+   every run benchmarks the same rows).
+2. Recreates a separate benchmark database and loads the schema, the
+   generated files, the analytics star schema and the rollups.
+3. Runs each PostgreSQL query ``--runs`` times and records the p50/p95
+   latency, the rows returned and one ``EXPLAIN (ANALYZE, BUFFERS)`` plan.
+   With ``--dremio-url`` the ``*_dremio.sql`` variants are also run through
+   Dremio's REST API.
+
+The results are written as JSON. Passing an earlier results file as
+``--baseline`` reports the queries whose p50 latency grew beyond
+``--regression-threshold`` or whose plan shape changed, and exits with a
+non-zero status when a query got slower.
+
+Usage:
+    # Scale factors 1 and 10 (see data_generation.py --scale-factor), 5 runs per query
+    python benchmark_queries.py --scale-factors 1 10 --runs 5
+
+    # Benchmark the data already in banking_db, without generating anything
+    python benchmark_queries.py --no-generate --database banking_db
+
+    # Compare with an earlier run
+    python benchmark_queries.py --scale-factors 1 10 --baseline benchmark_results/baseline.json
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import shutil
+import time
+import urllib.request
+
+import numpy as np
+import psycopg2
+
+import data_generation
+import etl_analytics
+import load_data_from_minio
+import load_schema
+import preaggregate
+
+QUERIES_DIR = './bi_queries'
+DATA_DIR = 'benchmark_data'
+RESULTS_DIR = 'benchmark_results'
+
+def connect_to_postgres(host, port, user, password, database):
+    """
+    Connect to PostgreSQL.
+
+    The session uses the loader's ``SESSION_OPTIONS``, so the benchmark data
+    loads and aggregates in UTC, as it does in production.
+
+    Args:
+        host (str): The host of the PostgreSQL service.
+        port (int): The port of the PostgreSQL service.
+        user (str): The username for PostgreSQL.
+        password (str): The password for PostgreSQL.
+        database (str): The database name.
+
+    Returns:
+        psycopg2.connection: The PostgreSQL connection.
+    """
+    return psycopg2.connect(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database,
+        options=load_data_from_minio.SESSION_OPTIONS
+    )
+
+def list_queries(engine):
+    """
+    List the query files of an engine.
+
+    Args:
+        engine (str): ``'postgres'`` or ``'dremio'``.
+
+    Returns:
+        list: ``(query name, path)`` pairs, sorted by name.
+    """
+    queries = []
+    for path in sorted(glob.glob(os.path.join(QUERIES_DIR, '*.sql'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.endswith('_dremio') == (engine == 'dremio'):
+            queries.append((name, path))
+    return queries
+
+def read_query(path):
+    """
+    Read a query file without its trailing semicolon.
+
+    Args:
+        path (str): The path of the query file.
+
+    Returns:
+        str: The query.
+    """
+    with open(path, encoding='utf-8') as f:
+        return f.read().strip().rstrip(';')
+
+def recreate_database(pg_settings, database):
+    """
+    Drop and create the benchmark database.
+
+    Args:
+        pg_settings (dict): ``host``, ``port``, ``user`` and ``password``.
+        database (str): The benchmark database name.
+    """
+    conn = connect_to_postgres(database='postgres', **pg_settings)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)')
+            cursor.execute(f'CREATE DATABASE "{database}" ENCODING \'UTF8\' TEMPLATE template0')
+    finally:
+        conn.close()
+
+def load_dataset(conn, data_dir, profile, chunk_size):
+    """
+    Load a generated dataset and build everything the BI queries read.
+
+    The schema comes from ``load_schema.PROFILES``; the tables are copied in
+    schema order, then analyzed, and the star schema and rollups are built.
+
+    Args:
+        conn (psycopg2.connection): A connection to the empty benchmark database.
+        data_dir (str): The directory with the generated CSV files.
+        profile (str): The schema profile.
+        chunk_size (int): Rows per COPY chunk.
+
+    Returns:
+        dict: Table name to the number of rows loaded.
+    """
+    with conn.cursor() as cursor:
+        with open(load_schema.PROFILES[profile], encoding='utf-8') as f:
+            cursor.execute(f.read())
+    conn.commit()
+
+    row_counts = {}
+    for table_name in data_generation.OUTPUT_TABLES:
+        with open(data_generation.output_path(data_dir, table_name, 'csv'), 'rb') as csv_file:
+            row_counts[table_name] = load_data_from_minio.stream_csv_to_postgres(conn, table_name, csv_file,
+                                                                                 chunk_size)
+
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+
+    etl_analytics.run_etl(conn)
+    preaggregate.init_rollups(conn)
+    preaggregate.refresh_rollups(conn, full=True)
+
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+    return row_counts
+
+def prepare_dataset(pg_settings, database, scale_factor, args):
+    """
+    Generate a dataset for a scale factor and load it into a fresh benchmark database.
+
+    Args:
+        pg_settings (dict): ``host``, ``port``, ``user`` and ``password``.
+        database (str): The benchmark database name.
+        scale_factor (float): The scale factor.
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        dict: The generated and loaded row counts and the generation and load times.
+    """
+    data_dir = os.path.join(DATA_DIR, f"sf{scale_factor:g}")
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+
+    started = time.perf_counter()
+    data_generation.generate_sharded(data_dir, args.workers, chunk_size=args.chunk_size, seed=args.seed,
+                                     **data_generation.scaled_row_counts(scale_factor))
+    generate_s = time.perf_counter() - started
+    print(f"Generated scale factor {scale_factor:g} in {generate_s:.2f}s.")
+
+    recreate_database(pg_settings, database)
+    conn = connect_to_postgres(database=database, **pg_settings)
+    try:
+        started = time.perf_counter()
+        row_counts = load_dataset(conn, data_dir, args.profile, args.chunk_size)
+        load_s = time.perf_counter() - started
+    finally:
+        conn.close()
+    print(f"Loaded scale factor {scale_factor:g} in {load_s:.2f}s.")
+
+    if not args.keep_data:
+        shutil.rmtree(data_dir)
+    return {'row_counts': row_counts, 'generate_s': generate_s, 'load_s': load_s}
+
+def plan_signature(plan):
+    """
+    Summarize the shape of a plan as its node types and relations, depth first.
+
+    Args:
+        plan (dict): A plan node from ``EXPLAIN (FORMAT JSON)``.
+
+    Returns:
+        str: The signature, e.g. ``'Aggregate > Seq Scan(bank_transaction)'``.
+    """
+    parts = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        label = node['Node Type']
+        target = node.get('Index Name') or node.get('Relation Name')
+        if target:
+            label += f"({target})"
+        parts.append(label)
+        nodes.extend(reversed(node.get('Plans', [])))
+    return ' > '.join(parts)
+
+def latency_summary(latencies_ms):
+    """
+    Compute the p50 and p95 of a list of latencies.
+
+    Args:
+        latencies_ms (list): Latencies in milliseconds.
+
+    Returns:
+        dict: ``p50_ms`` and ``p95_ms``.
+    """
+    return {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95))
+    }
+
+def benchmark_postgres_query(conn, query, runs, statement_timeout_s):
+    """
+    Time a query on PostgreSQL and capture its analyzed plan.
+
+    Each run executes the query and fetches every row. The plan comes from a
+    separate ``EXPLAIN (ANALYZE, BUFFERS)`` run after the timed runs.
+
+    Args:
+        conn (psycopg2.connection): A connection in autocommit mode.
+        query (str): The query.
+        runs (int): The number of timed runs.
+        statement_timeout_s (int): Cancel a run after this many seconds (0 disables).
+
+    Returns:
+        dict: ``rows``, ``latencies_ms``, ``p50_ms``, ``p95_ms`` and the plan fields.
+    """
+    latencies_ms = []
+    rows = 0
+    with conn.cursor() as cursor:
+        cursor.execute(f"SET statement_timeout = {int(statement_timeout_s * 1000)}")
+        for _ in range(runs):
+            started = time.perf_counter()
+            cursor.execute(query)
+            rows = len(cursor.fetchall())
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+        explain = cursor.fetchone()[0]
+    if isinstance(explain, str):
+        explain = json.loads(explain)
+
+    plan = explain[0]['Plan']
+    result = {'rows': rows, 'latencies_ms': latencies_ms}
+    result.update(latency_summary(latencies_ms))
+    result.update({
+        'execution_ms': explain[0]['Execution Time'],
+        'planning_ms': explain[0]['Planning Time'],
+        'shared_hit_blocks': plan.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': plan.get('Shared Read Blocks', 0),
+        'plan_signature': plan_signature(plan),
+        'explain': explain
+    })
+    return result
+
+def dremio_request(base_url, path, payload=None, token=None):
+    """
+    Send a JSON request to the Dremio REST API.
+
+    Args:
+        base_url (str): The Dremio URL, e.g. ``http://localhost:9047``.
+        path (str): The API path.
+        payload (dict): The JSON body; the request is a GET when None.
+        token (str): The login token.
+
+    Returns:
+        dict: The decoded JSON response.
+    """
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"_dremio{token}"
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(base_url.rstrip('/') + path, data=data, headers=headers)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def benchmark_dremio_query(base_url, token, query, runs, poll_interval_s=0.05):
+    """
+    Time a query on Dremio.
+
+    Each run submits the query as a job and polls it until it finishes, so the
+    latency covers planning, execution and the job bookkeeping.
+
+    Args:
+        base_url (str): The Dremio URL.
+        token (str): The login token.
+        query (str): The query.
+        runs (int): The number of timed runs.
+        poll_interval_s (float): The delay between job status requests.
+
+    Returns:
+        dict: ``rows``, ``latencies_ms``, ``p50_ms`` and ``p95_ms``.
+    """
+    latencies_ms = []
+    rows = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        job_id = dremio_request(base_url, '/api/v3/sql', {'sql': query}, token)['id']
+        while True:
+            job = dremio_request(base_url, f"/api/v3/job/{job_id}", token=token)
+            if job['jobState'] in ('COMPLETED', 'FAILED', 'CANCELED'):
+                break
+            time.sleep(poll_interval_s)
+        if job['jobState'] != 'COMPLETED':
+            raise RuntimeError(job.get('errorMessage', job['jobState']))
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        rows = job.get('rowCount', 0)
+
+    result = {'rows': rows, 'latencies_ms': latencies_ms}
+    result.update(latency_summary(latencies_ms))
+    return result
+
+def run_queries(engine, run_query, scale_factor):
+    """
+    Benchmark every query of an engine, recording failures instead of stopping.
+
+    Args:
+        engine (str): ``'postgres'`` or ``'dremio'``.
+        run_query (callable): Takes the query text and returns its result dict.
+        scale_factor (float): The scale factor of the loaded data, or None.
+
+    Returns:
+        list: One result dict per query.
+    """
+    results = []
+    for name, path in list_queries(engine):
+        result = {'scale_factor': scale_factor, 'engine': engine, 'query': name}
+        try:
+            result.update(run_query(read_query(path)))
+            print(f"  [{engine}] {name}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+                  f"{result['rows']} rows")
+        except Exception as e:
+            result['error'] = str(e).strip()
+            print(f"  [{engine}] {name}: error: {result['error']}")
+        results.append(result)
+    return results
+
+def compare_with_baseline(results, baseline, threshold, min_delta_ms):
+    """
+    Compare results with a baseline run.
+
+    A query regresses when its p50 is more than ``threshold`` times the
+    baseline's and at least ``min_delta_ms`` slower, so tiny queries do not
+    trip on noise. Plan shape changes are reported without failing.
+
+    Args:
+        results (list): The current results.
+        baseline (dict): A results file written by an earlier run.
+        threshold (float): The allowed p50 ratio.
+        min_delta_ms (float): The smallest slowdown that counts.
+
+    Returns:
+        list: ``(scale factor, engine, query, baseline p50, p50)`` for each regression.
+    """
+    baseline_results = {(result['scale_factor'], result['engine'], result['query']): result
+                        for result in baseline['results'] if 'error' not in result}
+    regressions = []
+    for result in results:
+        key = (result['scale_factor'], result['engine'], result['query'])
+        previous = baseline_results.get(key)
+        if previous is None or 'error' in result:
+            continue
+        if result['p50_ms'] > previous['p50_ms'] * threshold and \
+                result['p50_ms'] - previous['p50_ms'] >= min_delta_ms:
+            regressions.append(key + (previous['p50_ms'], result['p50_ms']))
+        if previous.get('plan_signature') and result.get('plan_signature') != previous['plan_signature']:
+            print(f"Plan changed for {result['query']} ({result['engine']}, scale factor {result['scale_factor']}).")
+    return regressions
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the bi_queries on PostgreSQL and Dremio.")
+    parser.add_argument('--scale-factors', type=float, nargs='+', default=[1],
+                        help="Datasets to generate and benchmark, as data_generation.py --scale-factor "
+                             "values (1 = 5,000 transactions, 2000 = 10M).")
+    parser.add_argument('--no-generate', action='store_true',
+                        help="Benchmark the data already in --database instead of generating datasets.")
+    parser.add_argument('--database', default='banking_bench',
+                        help="Database the datasets are loaded into; it is dropped and recreated per scale factor.")
+    parser.add_argument('--profile', choices=sorted(load_schema.PROFILES), default='default',
+                        help="Schema profile of the benchmark database.")
+    parser.add_argument('--runs', type=int, default=5,
+                        help="Timed runs per query.")
+    parser.add_argument('--statement-timeout-s', type=int, default=600,
+                        help="Cancel a PostgreSQL query after this many seconds (0 disables).")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="Generator seed, so every run benchmarks the same rows.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Generator worker processes.")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="Rows per generated chunk and per COPY chunk.")
+    parser.add_argument('--keep-data', action='store_true',
+                        help="Keep the generated files in benchmark_data/ after loading them.")
+    parser.add_argument('--dremio-url', default=None,
+                        help="Also run the *_dremio.sql queries on this Dremio, e.g. http://localhost:9047. "
+                             "Dremio reads the database its Postgres source points at.")
+    parser.add_argument('--dremio-user', default='admin',
+                        help="Dremio user name.")
+    parser.add_argument('--dremio-password', default='admin',
+                        help="Dremio password.")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: benchmark_results/<timestamp>.json).")
+    parser.add_argument('--baseline', default=None,
+                        help="Earlier results file to compare with.")
+    parser.add_argument('--regression-threshold', type=float, default=1.5,
+                        help="p50 ratio over the baseline that counts as a regression.")
+    parser.add_argument('--min-regression-ms', type=float, default=5.0,
+                        help="Smallest p50 slowdown that counts as a regression.")
+    args = parser.parse_args()
+
+    # PostgreSQL Configuration
+    PG_HOST = 'localhost'
+    PG_PORT = 5432
+    PG_USER = 'postgres'
+    PG_PASSWORD = 'postgres'
+    PG_DATABASE = 'banking_db'
+
+    if not args.no_generate and args.database == PG_DATABASE:
+        parser.error(f"--database {PG_DATABASE} would be dropped; use --no-generate to benchmark it as-is.")
+    pg_settings = {'host': PG_HOST, 'port': PG_PORT, 'user': PG_USER, 'password': PG_PASSWORD}
+
+    dremio_token = None
+    if args.dremio_url:
+        dremio_token = dremio_request(args.dremio_url, '/apiv2/login',
+                                      {'userName': args.dremio_user, 'password': args.dremio_password})['token']
+
+    report = {
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'runs': args.runs,
+        'profile': args.profile,
+        'seed': args.seed,
+        'datasets': {},
+        'results': []
+    }
+    scale_factors = [None] if args.no_generate else args.scale_factors
+    for scale_factor in scale_factors:
+        if scale_factor is not None:
+            report['datasets'][f"{scale_factor:g}"] = prepare_dataset(pg_settings, args.database, scale_factor, args)
+        print(f"Benchmarking {args.database}" +
+              (f" at scale factor {scale_factor:g}:" if scale_factor is not None else ":"))
+
+        conn = connect_to_postgres(database=args.database, **pg_settings)
+        conn.autocommit = True
+        try:
+            report['results'].extend(run_queries(
+                'postgres', lambda query: benchmark_postgres_query(conn, query, args.runs, args.statement_timeout_s),
+                scale_factor))
+        finally:
+            conn.close()
+        if dremio_token:
+            report['results'].extend(run_queries(
+                'dremio', lambda query: benchmark_dremio_query(args.dremio_url, dremio_token, query, args.runs),
+                scale_factor))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report['results'], baseline, args.regression_threshold,
+                                            args.min_regression_ms)
+        for scale_factor, engine, query, previous_ms, current_ms in regressions:
+            print(f"REGRESSION {query} ({engine}, scale factor {scale_factor}): "
+                  f"p50 {previous_ms:.1f} ms -> {current_ms:.1f} ms")
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
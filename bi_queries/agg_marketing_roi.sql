@@ -1,16 +1,49 @@
 -- Purpose: Calculate the Return on Investment (ROI) for marketing campaigns by channel.
--- Structure: This query assumes a marketing fact table exists. It joins this with the order fact table
--- on the month of the campaign and order. It calculates total spend, total revenue, and ROI per channel.
+-- Structure: Orders are rolled up to one row per month and campaign spend to one row per
+-- month and channel before they are joined, so the join grows with months x channels
+-- instead of orders x campaigns. Each month's order revenue is attributed to the channels
+-- that ran in that month in proportion to their spend (evenly per campaign when the month
+-- has no spend), so every order is counted exactly once.
 -- NULLIF is used to prevent division by zero errors.
--- Assumes a marketing_campaign fact table exists.
+WITH monthly_orders AS (
+    SELECT
+        DATE_TRUNC('month', order_date) AS month,
+        SUM(total_amount) AS revenue
+    FROM
+        analytics_fct_order
+    GROUP BY
+        DATE_TRUNC('month', order_date)
+),
+channel_spend AS (
+    SELECT
+        DATE_TRUNC('month', month) AS month,
+        channel,
+        COUNT(*) AS campaigns,
+        SUM(spend_amount) AS spend
+    FROM
+        marketing_campaign
+    GROUP BY
+        DATE_TRUNC('month', month), channel
+),
+attributed AS (
+    SELECT
+        c.channel,
+        c.spend,
+        COALESCE(o.revenue, 0) * COALESCE(
+            c.spend / NULLIF(SUM(c.spend) OVER (PARTITION BY c.month), 0),
+            c.campaigns::numeric / SUM(c.campaigns) OVER (PARTITION BY c.month)
+        ) AS revenue
+    FROM
+        channel_spend c
+    LEFT JOIN
+        monthly_orders o ON o.month = c.month
+)
 SELECT
-    m.channel,
-    SUM(m.spend_amount) AS spend,
-    COALESCE(SUM(o.total_amount), 0) AS revenue_from_orders,
-    (COALESCE(SUM(o.total_amount), 0) - SUM(m.spend_amount)) / NULLIF(SUM(m.spend_amount), 0) AS roi
+    channel,
+    SUM(spend) AS spend,
+    ROUND(SUM(revenue), 2) AS revenue_from_orders,
+    (SUM(revenue) - SUM(spend)) / NULLIF(SUM(spend), 0) AS roi
 FROM
-    marketing_campaign m
-LEFT JOIN
-    analytics_fct_order o ON DATE_TRUNC('month', o.order_date) = DATE_TRUNC('month', m.month)
+    attributed
 GROUP BY
-    m.channel;
\ No newline at end of file
+    channel;
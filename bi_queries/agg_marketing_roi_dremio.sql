@@ -1,11 +1,42 @@
+WITH monthly_orders AS (
+    SELECT
+        DATE_TRUNC('MONTH', order_date) AS "month",
+        SUM(total_amount) AS revenue
+    FROM
+        Postgres.public."analytics_fct_order"
+    GROUP BY
+        DATE_TRUNC('MONTH', order_date)
+),
+channel_spend AS (
+    SELECT
+        DATE_TRUNC('MONTH', "month") AS "month",
+        channel,
+        COUNT(*) AS campaigns,
+        SUM(spend_amount) AS spend
+    FROM
+        Postgres.public."marketing_campaign"
+    GROUP BY
+        DATE_TRUNC('MONTH', "month"), channel
+),
+attributed AS (
+    SELECT
+        c.channel,
+        c.spend,
+        COALESCE(o.revenue, 0) * COALESCE(
+            c.spend / NULLIF(SUM(c.spend) OVER (PARTITION BY c."month"), 0),
+            CAST(c.campaigns AS DOUBLE) / SUM(c.campaigns) OVER (PARTITION BY c."month")
+        ) AS revenue
+    FROM
+        channel_spend c
+    LEFT JOIN
+        monthly_orders o ON o."month" = c."month"
+)
 SELECT
-    m.channel,
-    SUM(m.spend_amount) AS spend,
-    COALESCE(SUM(o.total_amount), 0) AS revenue_from_orders,
-    (COALESCE(SUM(o.total_amount), 0) - SUM(m.spend_amount)) / NULLIF(SUM(m.spend_amount), 0) AS roi
+    channel,
+    SUM(spend) AS spend,
+    ROUND(SUM(revenue), 2) AS revenue_from_orders,
+    (SUM(revenue) - SUM(spend)) / NULLIF(SUM(spend), 0) AS roi
 FROM
-    Postgres.public."marketing_campaign" m
-LEFT JOIN
-    Postgres.public."analytics_fct_order" o ON DATE_TRUNC('MONTH', o.order_date) = DATE_TRUNC('MONTH', m."month")
+    attributed
 GROUP BY
-    m.channel
\ No newline at end of file
+    channel
@@ -0,0 +1,14 @@
+-- Purpose: Calculate the Return on Investment (ROI) for marketing campaigns by channel, from the channel rollup.
+-- Structure: Same result as agg_marketing_roi.sql. rollup_channel_monthly already holds the
+-- spend and the spend-weighted order revenue of each channel per month, so the report only
+-- sums a few rows per channel.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    channel,
+    SUM(spend) AS spend,
+    ROUND(SUM(attributed_revenue), 2) AS revenue_from_orders,
+    (SUM(attributed_revenue) - SUM(spend)) / NULLIF(SUM(spend), 0) AS roi
+FROM
+    rollup_channel_monthly
+GROUP BY
+    channel;
@@ -0,0 +1,30 @@
+-- Purpose: Calculate the total revenue per customer from both banking deposits and e-commerce purchases,
+-- from the monthly customer rollup.
+-- Structure: Same result as agg_revenue_per_customer.sql. Deposit and order totals per customer
+-- come from rollup_customer_monthly. The original query joins deposits and orders in one pass,
+-- which repeats each deposit once per order and each order once per deposit; the counts
+-- reproduce that multiplication so both queries agree.
+-- Refresh the rollup with preaggregate.py.
+WITH customer_totals AS (
+    SELECT
+        customer_key,
+        SUM(deposit_count) AS deposit_count,
+        SUM(deposit_amount) AS deposit_amount,
+        SUM(order_count) AS order_count,
+        SUM(order_amount) AS order_amount
+    FROM
+        rollup_customer_monthly
+    GROUP BY
+        customer_key
+)
+SELECT
+    ac.customer_key,
+    CONCAT(ac.first_name, ' ', ac.last_name) AS name,
+    COALESCE(t.deposit_amount * GREATEST(t.order_count, 1), 0) AS bank_deposits,
+    COALESCE(t.order_amount * GREATEST(t.deposit_count, 1), 0) AS ecommerce_revenue,
+    COALESCE(t.deposit_amount * GREATEST(t.order_count, 1), 0)
+        + COALESCE(t.order_amount * GREATEST(t.deposit_count, 1), 0) AS total_spend
+FROM
+    analytics_customer ac
+LEFT JOIN
+    customer_totals t ON ac.customer_key = t.customer_key;
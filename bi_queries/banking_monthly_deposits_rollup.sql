@@ -0,0 +1,16 @@
+-- Purpose: Calculate the total deposits per month for the last 12 months, from the daily rollup.
+-- Structure: Same result as banking_monthly_deposits.sql, read from rollup_bank_daily
+-- (one row per day and transaction type) instead of scanning bank_transaction.
+-- The window starts at the first whole day 12 months ago.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    date_trunc('month', day) AS month,
+    SUM(total_amount) FILTER (WHERE type = 'DEPOSIT') AS total_deposits
+FROM
+    rollup_bank_daily
+WHERE
+    day >= (now() - interval '12 months')::date
+GROUP BY
+    month
+ORDER BY
+    month;
@@ -0,0 +1,18 @@
+-- Purpose: Calculate the net movement of funds for each bank account, from the monthly rollup.
+-- Structure: Same result as banking_net_movement.sql. Deposits and withdrawals are read
+-- from rollup_bank_account_monthly (one row per month, account and transaction type)
+-- and summed over all months per account.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    a.account_id,
+    a.balance,
+    SUM(CASE
+            WHEN r.type = 'DEPOSIT' THEN r.total_amount
+            WHEN r.type = 'WITHDRAWAL' THEN -r.total_amount
+        END) AS net_change
+FROM
+    bank_account a
+LEFT JOIN
+    rollup_bank_account_monthly r ON a.account_id = r.account_id
+GROUP BY
+    a.account_id, a.balance;
@@ -0,0 +1,21 @@
+-- Purpose: Identify the top 5 customers by their total withdrawal amount, from the monthly rollup.
+-- Structure: Same result as banking_top_5_withdrawals.sql, with the per-account withdrawal
+-- totals read from rollup_bank_account_monthly instead of bank_transaction.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    c.customer_id,
+    CONCAT(c.first_name, ' ', c.last_name) AS name,
+    SUM(r.total_amount) AS total_withdrawn
+FROM
+    bank_customer c
+JOIN
+    bank_account a ON c.customer_id = a.customer_id
+JOIN
+    rollup_bank_account_monthly r ON a.account_id = r.account_id
+WHERE
+    r.type = 'WITHDRAWAL'
+GROUP BY
+    c.customer_id, name
+ORDER BY
+    total_withdrawn DESC
+LIMIT 5;
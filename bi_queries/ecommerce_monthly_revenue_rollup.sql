@@ -0,0 +1,17 @@
+-- Purpose: Calculate the monthly sales revenue from the last year, from the daily rollup.
+-- Structure: Same result as ecommerce_monthly_revenue.sql, read from rollup_order_daily
+-- (one row per day and order status) instead of scanning ecommerce_order.
+-- The window starts at the first whole day 12 months ago.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    date_trunc('month', r.day) AS month,
+    SUM(r.total_amount) AS revenue
+FROM
+    rollup_order_daily r
+WHERE
+    r.day >= (now() - interval '12 months')::date
+    AND r.status IN ('SHIPPED', 'DELIVERED')
+GROUP BY
+    month
+ORDER BY
+    month;
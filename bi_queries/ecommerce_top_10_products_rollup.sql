@@ -0,0 +1,18 @@
+-- Purpose: List the top 10 best-selling products by units sold, from the monthly rollup.
+-- Structure: Same result as ecommerce_top_10_products.sql. Units and revenue per product
+-- are read from rollup_product_monthly and summed over all months.
+-- Refresh the rollup with preaggregate.py.
+SELECT
+    p.product_id,
+    p.name,
+    SUM(r.units_sold) AS units_sold,
+    SUM(r.revenue) AS revenue
+FROM
+    ecommerce_product p
+JOIN
+    rollup_product_monthly r ON p.product_id = r.product_id
+GROUP BY
+    p.product_id, p.name
+ORDER BY
+    units_sold DESC
+LIMIT 10;
@@ -0,0 +1,222 @@
+"""
+Script to check that the BI queries use partition pruning and the indexes of
+the partitioned schema profile (``ddl/schema_partitioned.sql``).
+
+Every query in ``CHECKS`` is run through ``EXPLAIN (FORMAT JSON)`` and its
+plan is searched for:
+
+- the partitions of each partitioned table that are scanned, which must be
+  fewer than all of them when the query filters on the partition key;
+- the indexes used, with the per-partition indexes mapped back to the index
+  created on the partitioned table.
+
+On small datasets a sequential scan is often cheaper than any index, so by
+default sequential scans are disabled while planning, which checks that the
+indexes can serve each query. ``--planner-defaults`` shows the plans the
+planner picks on its own with the current statistics.
+
+Usage:
+    python load_schema.py --profile partitioned
+    python load_data_from_minio.py && python etl_analytics.py
+    python check_query_plans.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+
+QUERIES_DIR = './bi_queries'
+
+# Query file -> the partitioned tables it must prune and the indexes it must use
+CHECKS = {
+    'banking_monthly_deposits.sql': {
+        'pruned': ['bank_transaction'],
+        'indexes': ['bank_transaction_transaction_date_type_idx']
+    },
+    'banking_net_movement.sql': {
+        'pruned': [],
+        'indexes': ['bank_transaction_account_id_type_idx']
+    },
+    'banking_top_5_withdrawals.sql': {
+        'pruned': [],
+        'indexes': ['bank_transaction_withdrawal_account_id_idx']
+    },
+    'ecommerce_monthly_revenue.sql': {
+        'pruned': ['ecommerce_order'],
+        'indexes': ['ecommerce_order_order_date_brin']
+    },
+    'ecommerce_top_10_products.sql': {
+        'pruned': [],
+        'indexes': ['ecommerce_order_item_product_id_idx']
+    },
+    'agg_revenue_per_customer.sql': {
+        'pruned': [],
+        'indexes': ['analytics_fct_banking_customer_key_type_idx', 'analytics_fct_order_customer_key_idx']
+    }
+}
+
+def connect_to_postgres(host, port, user, password, database):
+    """
+    Connect to PostgreSQL.
+
+    Args:
+        host (str): The host of the PostgreSQL service.
+        port (int): The port of the PostgreSQL service.
+        user (str): The username for PostgreSQL.
+        password (str): The password for PostgreSQL.
+        database (str): The database name.
+
+    Returns:
+        psycopg2.connection: The PostgreSQL connection.
+    """
+    return psycopg2.connect(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database
+    )
+
+def partition_roots(cursor):
+    """
+    Map every partition and partition index to its partitioned table or index.
+
+    Args:
+        cursor (psycopg2.cursor): A database cursor.
+
+    Returns:
+        tuple: A dict of relation name to root name, and a dict of partitioned
+               table name to its number of leaf partitions.
+    """
+    cursor.execute("""
+        SELECT c.relname, r.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_class r ON r.oid = pg_partition_root(c.oid)
+        WHERE n.nspname = 'public' AND c.relispartition
+    """)
+    roots = dict(cursor.fetchall())
+    cursor.execute("""
+        SELECT p.relname, COUNT(*)
+        FROM pg_partitioned_table pt
+        JOIN pg_class p ON p.oid = pt.partrelid
+        JOIN pg_partition_tree(pt.partrelid) t ON t.isleaf
+        GROUP BY p.relname
+    """)
+    return roots, dict(cursor.fetchall())
+
+def plan_relations(plan, roots):
+    """
+    Collect the scanned partitions and the indexes used by a plan.
+
+    Args:
+        plan (dict): A plan node from ``EXPLAIN (FORMAT JSON)``.
+        roots (dict): Relation name to partition root, from ``partition_roots``.
+
+    Returns:
+        tuple: A dict of partitioned table to the set of its scanned partitions,
+               and the set of indexes used (partition indexes mapped to their root).
+    """
+    scanned = {}
+    indexes = set()
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        relation = node.get('Relation Name')
+        if relation in roots:
+            scanned.setdefault(roots[relation], set()).add(relation)
+        if 'Index Name' in node:
+            indexes.add(roots.get(node['Index Name'], node['Index Name']))
+        nodes.extend(node.get('Plans', []))
+    return scanned, indexes
+
+def check_query(cursor, path, expected, roots, partition_counts, planner_defaults=False):
+    """
+    Explain one query and compare its plan with the expected pruning and indexes.
+
+    Args:
+        cursor (psycopg2.cursor): A database cursor.
+        path (str): The path of the query file.
+        expected (dict): The entry of ``CHECKS`` for the query.
+        roots (dict): Relation name to partition root, from ``partition_roots``.
+        partition_counts (dict): Partitioned table to its number of partitions.
+        planner_defaults (bool): Keep sequential scans enabled.
+
+    Returns:
+        list: The failed expectations, empty if the plan matches.
+    """
+    with open(path, encoding='utf-8') as f:
+        query = f.read().strip().rstrip(';')
+
+    cursor.execute("BEGIN")
+    try:
+        if not planner_defaults:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.execute("ROLLBACK")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scanned, indexes = plan_relations(plan[0]['Plan'], roots)
+    failures = []
+    for table in expected['pruned']:
+        total = partition_counts.get(table, 0)
+        count = len(scanned.get(table, ()))
+        print(f"  {table}: {count} of {total} partitions scanned")
+        if not total:
+            failures.append(f"{table} is not partitioned")
+        elif count >= total:
+            failures.append(f"{table} partitions were not pruned")
+    print(f"  indexes: {', '.join(sorted(indexes)) or 'none'}")
+    for index in expected['indexes']:
+        if index not in indexes:
+            failures.append(f"{index} is not used")
+    return failures
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Check the BI query plans for partition pruning and index use.")
+    parser.add_argument('--planner-defaults', action='store_true',
+                        help="Plan with sequential scans enabled instead of checking that the indexes can be used.")
+    args = parser.parse_args()
+
+    # PostgreSQL Configuration
+    PG_HOST = 'localhost'
+    PG_PORT = 5432
+    PG_USER = 'postgres'
+    PG_PASSWORD = 'postgres'
+    PG_DATABASE = 'banking_db'
+
+    conn = connect_to_postgres(PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE)
+    conn.autocommit = True
+    failed = []
+    try:
+        with conn.cursor() as cursor:
+            roots, partition_counts = partition_roots(cursor)
+            for filename, expected in CHECKS.items():
+                print(f"{filename}:")
+                failures = check_query(cursor, os.path.join(QUERIES_DIR, filename), expected, roots,
+                                       partition_counts, args.planner_defaults)
+                for failure in failures:
+                    print(f"  FAIL: {failure}")
+                if failures:
+                    failed.append(filename)
+                else:
+                    print("  OK")
+    finally:
+        conn.close()
+
+    if failed:
+        print(f"{len(failed)} of {len(CHECKS)} queries do not use the expected plan: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"All {len(CHECKS)} queries use partition pruning and the expected indexes.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Streaming gzip/zstd compression for the generated CSV files.
+
+The generator writes ``<n>_<table>.csv.gz`` or ``<n>_<table>.csv.zst`` as it
+goes, the uploader stores them with a matching ``Content-Encoding`` and the
+loader decompresses the object stream on the fly, so no uncompressed copy is
+ever written to disk. zstd requires the ``zstandard`` package.
+
+Compressed files are sequences of gzip members or zstd frames, which
+decompress to the concatenation of their contents. The header line of a file
+is always written as its own member with ``compress_bytes``, so part files
+can be merged by concatenating their bytes and dropping the repeated header
+member.
+
+Usage:
+    with open(path, 'wb') as raw:
+        raw.write(compress_bytes(header, 'zstd'))
+        writer = open_writer(raw, 'zstd')
+        writer.write(rows)
+        writer.close()
+
+    rows = open_reader(s3_body, compression_of(key))
+"""
+
+import gzip
+
+COMPRESSIONS = ['none', 'gzip', 'zstd']
+# File suffix and HTTP Content-Encoding of each compression
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+CONTENT_ENCODINGS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+def _zstandard():
+    """
+    Import the optional ``zstandard`` package.
+
+    Returns:
+        module: The ``zstandard`` module.
+    """
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression requires zstandard: pip install zstandard") from e
+    return zstandard
+
+
+def compression_of(path, content_encoding=None):
+    """
+    Tell how a file or object is compressed.
+
+    Args:
+        path (str): The file path or object key.
+        content_encoding (str): The object's ``Content-Encoding``, used when
+            the name has no compression suffix.
+
+    Returns:
+        str: ``'gzip'``, ``'zstd'`` or None for uncompressed data.
+    """
+    for suffix, compression in CONTENT_ENCODINGS.items():
+        if path.endswith(suffix):
+            return compression
+    return content_encoding if content_encoding in SUFFIXES else None
+
+
+def strip_suffix(path):
+    """
+    Remove the compression suffix from a file name.
+
+    Args:
+        path (str): The file path or object key, e.g. ``0_bank_customer.csv.zst``.
+
+    Returns:
+        str: The name without the suffix, e.g. ``0_bank_customer.csv``.
+    """
+    compression = compression_of(path)
+    return path[:-len(SUFFIXES[compression])] if compression else path
+
+
+def compress_bytes(data, compression):
+    """
+    Compress a block of bytes as one complete gzip member or zstd frame.
+
+    The output is deterministic (the gzip timestamp is zeroed), so the same
+    header compresses to the same bytes in every part file.
+
+    Args:
+        data (bytes): The bytes to compress.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+
+    Returns:
+        bytes: The compressed bytes, or ``data`` unchanged.
+    """
+    if compression == 'gzip':
+        return gzip.compress(data, mtime=0)
+    if compression == 'zstd':
+        return _zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def open_writer(raw, compression, level=None):
+    """
+    Start a new compressed member at the end of an open binary file.
+
+    Closing the returned stream finishes the member but leaves ``raw`` open.
+
+    Args:
+        raw: A binary file object opened for writing.
+        compression (str): ``'gzip'`` or ``'zstd'``.
+        level (int): The compression level, or None for the codec default
+            (6 for gzip, 3 for zstd).
+
+    Returns:
+        A writable binary stream.
+    """
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='wb', mtime=0, compresslevel=6 if level is None else level)
+    if compression == 'zstd':
+        zstandard = _zstandard()
+        return zstandard.ZstdCompressor(level=3 if level is None else level).stream_writer(raw, closefd=False)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def open_reader(fileobj, compression):
+    """
+    Wrap a binary stream so that reads return decompressed bytes.
+
+    Only ``read(size)`` is called on ``fileobj``, so it can be a socket-backed
+    stream such as an S3 ``StreamingBody``; every member or frame is read.
+
+    Args:
+        fileobj: A binary file object.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+
+    Returns:
+        A readable binary stream, or ``fileobj`` itself for uncompressed data.
+    """
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == 'zstd':
+        return _zstandard().ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    return fileobj
@@ -1,12 +1,136 @@
+import argparse
+import concurrent.futures
+import io
+import itertools
+import numpy as np
 import pandas as pd
 from faker import Faker
+from key_allocator import KeyAllocator
+from value_pool import CACHE_DIR as POOL_CACHE_DIR, PROVIDERS as POOL_PROVIDERS, ValuePool
+import schema_ddl
+import compressed_io
+import pipeline_metrics
 import random
 from datetime import datetime, timedelta
+import math
 import os
+import shutil
 
 # Initialize Faker
 fake = Faker()
 
+# Enumerated column values shared by the row-based and vectorized engines
+GENDERS = np.array(['M', 'F', 'O'])
+ACCOUNT_TYPES = np.array(['CHECKING', 'SAVINGS', 'LOAN'])
+ACCOUNT_STATUSES = np.array(['ACTIVE', 'INACTIVE', 'CLOSED'])
+TRANSACTION_TYPES = np.array(['DEPOSIT', 'WITHDRAWAL', 'TRANSFER'])
+PRODUCT_CATEGORIES = ['Electronics', 'Gaming', 'Computers', 'Accessories']
+ORDER_STATUSES = np.array(['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED'])
+PAYMENT_METHODS = np.array(['Credit Card', 'PayPal', 'Stripe', 'Bank Transfer'])
+CHANNELS = np.array(['EMAIL', 'SOCIAL', 'PPC', 'AFFILIATE'])
+MAX_ITEMS_PER_ORDER = 5
+
+# Generated tables in the order they are saved; the position is the file prefix
+OUTPUT_TABLES = [
+    'bank_customer',
+    'bank_account',
+    'bank_transaction',
+    'ecommerce_customer',
+    'ecommerce_address',
+    'product_category',
+    'ecommerce_product',
+    'ecommerce_order',
+    'ecommerce_order_item',
+    'marketing_campaign'
+]
+
+# Row counts at scale factor 1 (the defaults) and how each grows with the scale
+# factor. Customers, accounts, transactions and orders grow linearly, which keeps
+# 1.25 accounts per banking customer, 2 transactions per account and 2.4 orders
+# per e-commerce customer. The product catalog grows with the square root, and
+# the campaigns are a fixed budget of channel-months.
+SCALE_FACTOR_ROWS = {
+    'num_bank_customers': (2000, 'linear'),
+    'num_accounts': (2500, 'linear'),
+    'num_transactions': (5000, 'linear'),
+    'num_ecommerce_customers': (2500, 'linear'),
+    'num_products': (750, 'sqrt'),
+    'num_orders': (6000, 'linear'),
+    'num_campaigns': (150, 'fixed')
+}
+
+# Average bytes per row of each table as CSV, as Parquet and as a pandas DataFrame
+ESTIMATED_ROW_BYTES = {
+    'bank_customer': (172, 103, 255),
+    'bank_account': (73, 33, 99),
+    'bank_transaction': (107, 56, 122),
+    'ecommerce_customer': (92, 53, 124),
+    'ecommerce_address': (97, 54, 126),
+    'product_category': (22, 22, 66),
+    'ecommerce_product': (239, 151, 260),
+    'ecommerce_order': (104, 42, 107),
+    'ecommerce_order_item': (56, 19, 48),
+    'marketing_campaign': (61, 57, 81)
+}
+
+def scaled_row_counts(scale_factor):
+    """
+    Sizes every table for a scale factor.
+
+    Args:
+        scale_factor (float): The dataset size relative to the defaults.
+
+    Returns:
+        dict: The ``num_*`` arguments of the generators, as in ``SCALE_FACTOR_ROWS``.
+    """
+    growth = {'linear': scale_factor, 'sqrt': math.sqrt(scale_factor), 'fixed': 1}
+    return {name: max(1, int(round(rows * growth[kind]))) for name, (rows, kind) in SCALE_FACTOR_ROWS.items()}
+
+def estimate_output(counts, file_format='csv', chunk_size=None, workers=1):
+    """
+    Estimates the rows, output size and peak memory of a generation run.
+
+    Addresses (1-3 per customer) and order items (1-5 per order) are counted
+    at their averages. Without ``chunk_size`` every table is held in memory at
+    once; when streaming, each process holds one chunk of the widest table
+    (or of orders with up to ``MAX_ITEMS_PER_ORDER`` items each) plus the
+    parent key arrays.
+
+    Args:
+        counts (dict): The output of ``scaled_row_counts``.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        chunk_size (int): The rows per chunk when streaming, or None.
+        workers (int): The number of generator processes.
+
+    Returns:
+        tuple: A dict of table name to estimated rows, the output bytes and the
+               peak memory bytes.
+    """
+    rows = {
+        'bank_customer': counts['num_bank_customers'],
+        'bank_account': counts['num_accounts'],
+        'bank_transaction': counts['num_transactions'],
+        'ecommerce_customer': counts['num_ecommerce_customers'],
+        'ecommerce_address': 2 * counts['num_ecommerce_customers'],
+        'product_category': len(PRODUCT_CATEGORIES),
+        'ecommerce_product': counts['num_products'],
+        'ecommerce_order': counts['num_orders'],
+        'ecommerce_order_item': (MAX_ITEMS_PER_ORDER + 1) // 2 * counts['num_orders'],
+        'marketing_campaign': counts['num_campaigns']
+    }
+    file_column = 0 if file_format == 'csv' else 1
+    output_bytes = sum(rows[table] * ESTIMATED_ROW_BYTES[table][file_column] for table in rows)
+    if chunk_size is None:
+        memory_bytes = sum(rows[table] * ESTIMATED_ROW_BYTES[table][2] for table in rows)
+    else:
+        widest = max(ESTIMATED_ROW_BYTES[table][2] for table in rows)
+        orders_with_items = (ESTIMATED_ROW_BYTES['ecommerce_order'][2] +
+                             MAX_ITEMS_PER_ORDER * ESTIMATED_ROW_BYTES['ecommerce_order_item'][2])
+        parent_keys = 8 * (counts['num_bank_customers'] + counts['num_accounts'] +
+                           rows['ecommerce_customer'] + rows['ecommerce_address'] + counts['num_products'])
+        memory_bytes = workers * (chunk_size * max(widest, orders_with_items) + parent_keys)
+    return rows, output_bytes, memory_bytes
+
 def generate_banking_data(num_customers=2000, num_accounts=2500, num_transactions=5000):
     """
     Generates synthetic data for the banking service.
@@ -20,11 +144,15 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
         tuple: A tuple containing three pandas DataFrames:
                (bank_customers, bank_accounts, bank_transactions).
     """
+    customer_keys = KeyAllocator(10, key=random.getrandbits(64))
+    account_keys = KeyAllocator(12, key=random.getrandbits(64))
+    transaction_keys = KeyAllocator(15, key=random.getrandbits(64))
+
     # Generate Customers
     customers_data = []
     for _ in range(num_customers):
         customers_data.append({
-            'customer_id': fake.unique.random_number(digits=10),
+            'customer_id': customer_keys.next_key(),
             'first_name': fake.first_name(),
             'last_name': fake.last_name(),
             'email': fake.unique.email(),
@@ -47,7 +175,7 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
     # Ensure each customer has at least one account
     for customer_id in customer_ids:
         accounts_data.append({
-            'account_id': fake.unique.random_number(digits=12),
+            'account_id': account_keys.next_key(),
             'customer_id': customer_id,
             'account_type': random.choice(['CHECKING', 'SAVINGS', 'LOAN']),
             'balance': round(random.uniform(0, 100000), 2),
@@ -62,7 +190,7 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
     if remaining_accounts > 0:
         for _ in range(remaining_accounts):
             accounts_data.append({
-                'account_id': fake.unique.random_number(digits=12),
+                'account_id': account_keys.next_key(),
                 'customer_id': random.choice(customer_ids),
                 'account_type': random.choice(['CHECKING', 'SAVINGS', 'LOAN']),
                 'balance': round(random.uniform(0, 100000), 2),
@@ -80,7 +208,7 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
     # Ensure each account has at least one transaction
     for account_id in account_ids:
         transactions_data.append({
-            'transaction_id': fake.unique.random_number(digits=15),
+            'transaction_id': transaction_keys.next_key(),
             'account_id': account_id,
             'type': random.choice(['DEPOSIT', 'WITHDRAWAL', 'TRANSFER']),
             'amount': round(random.uniform(10, 5000), 2),
@@ -94,7 +222,7 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
     if remaining_transactions > 0:
         for _ in range(remaining_transactions):
             transactions_data.append({
-                'transaction_id': fake.unique.random_number(digits=15),
+                'transaction_id': transaction_keys.next_key(),
                 'account_id': random.choice(account_ids),
                 'type': random.choice(['DEPOSIT', 'WITHDRAWAL', 'TRANSFER']),
                 'amount': round(random.uniform(10, 5000), 2),
@@ -104,7 +232,396 @@ def generate_banking_data(num_customers=2000, num_accounts=2500, num_transaction
             })
     bank_transactions = pd.DataFrame(transactions_data)
 
-    return bank_customers, bank_accounts, bank_transactions
+    return (schema_ddl.cast_dataframe(bank_customers, 'bank_customer'),
+            schema_ddl.cast_dataframe(bank_accounts, 'bank_account'),
+            schema_ddl.cast_dataframe(bank_transactions, 'bank_transaction'))
+
+def _reference_dates():
+    """
+    Returns the anchors used for relative date ranges in the vectorized engine.
+
+    Dates are anchored to midnight so that a seed reproduces the same day's output.
+
+    Returns:
+        dict: ``now``, ``decade_start`` and ``two_years_ago`` as datetimes.
+    """
+    now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'now': now,
+        'decade_start': datetime(now.year - now.year % 10, 1, 1),
+        'two_years_ago': now - timedelta(days=2 * 365)
+    }
+
+def _seeded_faker(seed):
+    """
+    Creates a Faker instance with its own seeded random state.
+
+    Args:
+        seed (int): The seed for the instance, or None for a random seed.
+
+    Returns:
+        Faker: A Faker instance independent of the module-level ``fake``.
+    """
+    text_fake = Faker()
+    text_fake.seed_instance(seed)
+    return text_fake
+
+def derive_seeds(seed, count):
+    """
+    Derives independent child seeds from a single seed.
+
+    Args:
+        seed (int): The parent seed, or None for unseeded output.
+        count (int): The number of child seeds to derive.
+
+    Returns:
+        list: ``count`` integer seeds, or ``count`` Nones when ``seed`` is None.
+    """
+    if seed is None:
+        return [None] * count
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(count)]
+
+def _chunk_bounds(total, chunk_size):
+    """
+    Splits ``range(total)`` into consecutive ``[start, stop)`` chunks.
+
+    Args:
+        total (int): The number of rows to split.
+        chunk_size (int): The maximum rows per chunk, or None for a single chunk.
+
+    Returns:
+        list: A list of ``(start, stop)`` tuples.
+    """
+    chunk_size = chunk_size or max(total, 1)
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+def _random_datetimes(rng, size, start, end):
+    """
+    Draws uniformly distributed timestamps with second resolution.
+
+    Args:
+        rng (np.random.Generator): The random generator to draw from.
+        size (int): The number of timestamps to draw.
+        start (datetime): The lower bound (inclusive).
+        end (datetime): The upper bound (inclusive).
+
+    Returns:
+        np.ndarray: A datetime64[s] array of length ``size``.
+    """
+    start = np.datetime64(start, 's')
+    span = (np.datetime64(end, 's') - start).astype(np.int64)
+    return start + rng.integers(0, span, size=size, endpoint=True).astype('timedelta64[s]')
+
+def _resolve_seed(seed):
+    """
+    Returns ``seed``, or fresh OS entropy when it is None.
+
+    Chunk seeds are derived from this value, so it must be concrete before any
+    chunk is generated.
+
+    Args:
+        seed (int): The requested seed, or None.
+
+    Returns:
+        int: A concrete seed.
+    """
+    return np.random.SeedSequence().entropy if seed is None else seed
+
+def _key_allocator(seed, table_name, digits):
+    """
+    Creates the primary key allocator of a table.
+
+    Keys are a keyed permutation of the row position, so chunks and shards that
+    cover disjoint row ranges always get disjoint keys.
+
+    Args:
+        seed (int): The seed of the stream, or None for a random permutation.
+        table_name (str): The table the keys belong to.
+        digits (int): The number of digits of every key.
+
+    Returns:
+        KeyAllocator: The table's key allocator.
+    """
+    return KeyAllocator(digits, key=[_resolve_seed(seed), OUTPUT_TABLES.index(table_name)])
+
+def _parent_indices(rng, num_parents, start, stop):
+    """
+    Assigns child rows ``[start, stop)`` to parents so every parent gets a child.
+
+    The first ``num_parents`` children map one-to-one onto the parents and the
+    remaining children are assigned uniformly at random, mirroring the
+    row-based generators.
+
+    Args:
+        rng (np.random.Generator): The random generator to draw from.
+        num_parents (int): The number of parent rows.
+        start (int): The position of the first child row.
+        stop (int): The position after the last child row.
+
+    Returns:
+        np.ndarray: Parent row indices, one per child row.
+    """
+    guaranteed = np.arange(start, min(stop, num_parents))
+    extra = stop - max(start, num_parents)
+    if extra <= 0:
+        return guaranteed
+    return np.concatenate([guaranteed, rng.integers(0, num_parents, size=extra)])
+
+def _draw_order_items(rng, num_orders, product_prices):
+    """
+    Draws the items of a batch of orders as whole arrays.
+
+    Every order gets 1 to ``MAX_ITEMS_PER_ORDER`` items with quantities of 1
+    to 3. Products are distinct within an order whenever the catalog is large
+    enough: repeated picks are found by sorting the items by (order, product)
+    and redrawn until none are left. Line totals gather the product prices and
+    order totals are a grouped sum of the line totals.
+
+    Args:
+        rng (np.random.Generator): The random generator to draw from.
+        num_orders (int): The number of orders.
+        product_prices (np.ndarray): The price of every product, by product index.
+
+    Returns:
+        tuple: Per item, the order index, product index, quantity, unit price
+               and line total, followed by the total of every order.
+    """
+    num_products = product_prices.size
+    counts = rng.integers(1, MAX_ITEMS_PER_ORDER + 1, size=num_orders)
+    item_orders = np.repeat(np.arange(num_orders), counts)
+    picks = rng.integers(0, num_products, size=item_orders.size)
+
+    # Orders with more items than there are products have to repeat some
+    can_be_distinct = counts[item_orders] <= num_products
+    while True:
+        by_order = np.lexsort((picks, item_orders))
+        repeated = by_order[1:][(item_orders[by_order[1:]] == item_orders[by_order[:-1]]) &
+                                (picks[by_order[1:]] == picks[by_order[:-1]])]
+        repeated = repeated[can_be_distinct[repeated]]
+        if not repeated.size:
+            break
+        picks[repeated] = rng.integers(0, num_products, size=repeated.size)
+
+    quantities = rng.integers(1, 4, size=item_orders.size)
+    unit_prices = product_prices[picks]
+    line_totals = np.round(unit_prices * quantities, 2)
+    order_totals = np.round(np.bincount(item_orders, weights=line_totals, minlength=num_orders), 2)
+    return item_orders, picks, quantities, unit_prices, line_totals, order_totals
+
+def _shard_chunks(num_chunks, shard):
+    """
+    Returns the chunk indices a shard is responsible for.
+
+    Chunks are split into ``num_shards`` contiguous, near-equal runs.
+
+    Args:
+        num_chunks (int): The total number of chunks in the table.
+        shard (tuple): ``(shard_index, num_shards)``, or None for every chunk.
+
+    Returns:
+        range: The chunk indices of the shard.
+    """
+    if shard is None:
+        return range(num_chunks)
+    shard_index, num_shards = shard
+    return range(shard_index * num_chunks // num_shards, (shard_index + 1) * num_chunks // num_shards)
+
+def _collect_chunks(chunks):
+    """
+    Concatenates streamed ``(table_name, DataFrame)`` chunks per table.
+
+    Each chunk is converted to the table's dtypes (see
+    ``schema_ddl.pandas_dtypes``) before it is kept.
+
+    Args:
+        chunks (iterable): The chunks yielded by a ``stream_*`` generator.
+
+    Returns:
+        dict: A mapping of table name to its full DataFrame.
+    """
+    frames = {}
+    for table_name, df in chunks:
+        frames.setdefault(table_name, []).append(schema_ddl.cast_dataframe(df, table_name))
+    # Categories inferred per chunk can differ, so the concatenation is cast once more
+    return {table_name: schema_ddl.cast_dataframe(pd.concat(dfs, ignore_index=True), table_name)
+            for table_name, dfs in frames.items()}
+
+def _chunk_random_state(seed, table_name, chunk_index):
+    """
+    Creates the random state for one chunk of a sharded table.
+
+    Every chunk gets its own seed derived from ``(seed, table, chunk_index)``,
+    so a chunk's rows are identical whichever process generates it.
+
+    Args:
+        seed (int): The concrete seed of the stream.
+        table_name (str): The table the chunk belongs to.
+        chunk_index (int): The position of the chunk in the table.
+
+    Returns:
+        np.random.Generator: The generator for the chunk's NumPy draws.
+    """
+    seed_sequence = np.random.SeedSequence([seed, OUTPUT_TABLES.index(table_name), chunk_index])
+    return np.random.default_rng(seed_sequence)
+
+def stream_bank_parents(fk_state, num_customers=2000, num_accounts=2500, chunk_size=100000, seed=None,
+                        value_pool=None):
+    """
+    Streams the bank_customer and bank_account tables as fixed-size chunks.
+
+    Args:
+        fk_state (dict): Filled with the ``account_ids`` array for ``stream_bank_transactions``.
+        num_customers (int): The number of customers to generate.
+        num_accounts (int): The number of bank accounts to generate.
+        chunk_size (int): The maximum rows per chunk, or None for one chunk per table.
+        seed (int): Seed for NumPy, for reproducible output.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+
+    Yields:
+        tuple: ``(table_name, DataFrame)`` chunks, parents before children.
+    """
+    rng = np.random.default_rng(seed)
+    value_pool = value_pool or ValuePool()
+    dates = _reference_dates()
+    customer_keys = _key_allocator(seed, 'bank_customer', 10)
+    account_keys = _key_allocator(seed, 'bank_account', 12)
+
+    # Generate Customers
+    customer_ids = np.empty(num_customers, dtype=np.int64)
+    bounds = _chunk_bounds(num_customers, chunk_size)
+    for start, stop in bounds:
+        size = stop - start
+        customer_ids[start:stop] = customer_keys.keys(start, stop)
+        birth_dates = _random_datetimes(rng, size, dates['now'] - timedelta(days=91 * 365),
+                                        dates['now'] - timedelta(days=18 * 365))
+        yield 'bank_customer', pd.DataFrame({
+            'customer_id': customer_ids[start:stop],
+            'first_name': value_pool.sample(rng, 'first_name', size),
+            'last_name': value_pool.sample(rng, 'last_name', size),
+            'email': value_pool.unique_emails(rng, customer_ids[start:stop]),
+            'phone_number': value_pool.sample(rng, 'phone_number', size),
+            'address_line1': value_pool.sample(rng, 'street_address', size),
+            'address_line2': value_pool.sample(rng, 'secondary_address', size),
+            'city': value_pool.sample(rng, 'city', size),
+            'state': value_pool.sample(rng, 'state', size),
+            'postal_code': value_pool.sample(rng, 'postal_code', size),
+            'country': value_pool.sample(rng, 'country', size),
+            'date_of_birth': birth_dates.astype('datetime64[D]'),
+            'gender': rng.choice(GENDERS, size=size),
+            'created_at': _random_datetimes(rng, size, dates['decade_start'], dates['now'])
+        })
+
+    # Generate Accounts (each customer has at least one account)
+    account_count = max(num_accounts, num_customers)
+    account_ids = np.empty(account_count, dtype=np.int64)
+    for start, stop in _chunk_bounds(account_count, chunk_size):
+        size = stop - start
+        account_ids[start:stop] = account_keys.keys(start, stop)
+        yield 'bank_account', pd.DataFrame({
+            'account_id': account_ids[start:stop],
+            'customer_id': customer_ids[_parent_indices(rng, num_customers, start, stop)],
+            'account_type': rng.choice(ACCOUNT_TYPES, size=size),
+            'balance': np.round(rng.uniform(0, 100000, size=size), 2),
+            'currency': 'USD',
+            'status': rng.choice(ACCOUNT_STATUSES, size=size),
+            'opened_at': _random_datetimes(rng, size, dates['decade_start'], dates['now']),
+            'closed_at': np.full(size, np.datetime64('NaT'), dtype='datetime64[s]')
+        })
+    fk_state['account_ids'] = account_ids
+
+def stream_bank_transactions(fk_state, num_transactions=5000, chunk_size=100000, seed=None, shard=None,
+                             value_pool=None):
+    """
+    Streams the bank_transaction table as fixed-size chunks.
+
+    Each chunk has its own seed and its own disjoint ID range, so any subset of
+    chunks can be generated in a separate process (see ``shard``).
+
+    Args:
+        fk_state (dict): Holds the ``account_ids`` array from ``stream_bank_parents``.
+        num_transactions (int): The number of transactions to generate.
+        chunk_size (int): The maximum rows per chunk, or None for a single chunk.
+        seed (int): Concrete seed shared by all shards of the table.
+        shard (tuple): ``(shard_index, num_shards)`` to generate only that shard's chunks.
+        value_pool (ValuePool): The pools the descriptions are drawn from.
+
+    Yields:
+        tuple: ``('bank_transaction', DataFrame)`` chunks.
+    """
+    value_pool = value_pool or ValuePool()
+    dates = _reference_dates()
+    transaction_keys = _key_allocator(seed, 'bank_transaction', 15)
+    account_ids = fk_state['account_ids']
+    account_count = account_ids.size
+
+    # Each account has at least one transaction
+    transaction_count = max(num_transactions, account_count)
+    bounds = _chunk_bounds(transaction_count, chunk_size)
+    for chunk_index in _shard_chunks(len(bounds), shard):
+        start, stop = bounds[chunk_index]
+        size = stop - start
+        rng = _chunk_random_state(seed, 'bank_transaction', chunk_index)
+        yield 'bank_transaction', pd.DataFrame({
+            'transaction_id': transaction_keys.keys(start, stop),
+            'account_id': account_ids[_parent_indices(rng, account_count, start, stop)],
+            'type': rng.choice(TRANSACTION_TYPES, size=size),
+            'amount': np.round(rng.uniform(10, 5000, size=size), 2),
+            'currency': 'USD',
+            'transaction_date': _random_datetimes(rng, size, dates['two_years_ago'], dates['now']),
+            'description': value_pool.sample(rng, 'sentence', size)
+        })
+
+def stream_banking_data(num_customers=2000, num_accounts=2500, num_transactions=5000,
+                        chunk_size=100000, seed=None, value_pool=None):
+    """
+    Streams synthetic banking data as fixed-size chunks.
+
+    Builds IDs, enums, amounts and timestamps as whole NumPy columns from a
+    seeded ``numpy.random.Generator``; text columns are drawn from the Faker
+    value pools of ``value_pool.ValuePool``. The foreign-key state carried
+    between tables is the customer and account ID arrays, so memory stays flat
+    in the number of transactions.
+
+    Args:
+        num_customers (int): The number of customers to generate.
+        num_accounts (int): The number of bank accounts to generate.
+        num_transactions (int): The number of transactions to generate.
+        chunk_size (int): The maximum rows per chunk, or None for one chunk per table.
+        seed (int): Seed for NumPy, for reproducible output.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+
+    Yields:
+        tuple: ``(table_name, DataFrame)`` chunks, parents before children.
+    """
+    seed = _resolve_seed(seed)
+    value_pool = value_pool or ValuePool()
+    fk_state = {}
+    yield from stream_bank_parents(fk_state, num_customers, num_accounts, chunk_size, seed, value_pool)
+    yield from stream_bank_transactions(fk_state, num_transactions, chunk_size, seed, value_pool=value_pool)
+
+def generate_banking_data_vectorized(num_customers=2000, num_accounts=2500, num_transactions=5000, seed=None,
+                                     value_pool=None):
+    """
+    Generates synthetic banking data with whole-column NumPy draws.
+
+    Produces the same tables and guarantees as ``generate_banking_data`` (every
+    customer has at least one account and every account has at least one
+    transaction) by collecting ``stream_banking_data`` into single DataFrames.
+
+    Args:
+        num_customers (int): The number of customers to generate.
+        num_accounts (int): The number of bank accounts to generate.
+        num_transactions (int): The number of transactions to generate.
+        seed (int): Seed for NumPy, for reproducible output.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+
+    Returns:
+        tuple: A tuple containing three pandas DataFrames:
+               (bank_customers, bank_accounts, bank_transactions).
+    """
+    tables = _collect_chunks(stream_banking_data(num_customers, num_accounts, num_transactions,
+                                                 chunk_size=None, seed=seed, value_pool=value_pool))
+    return tables['bank_customer'], tables['bank_account'], tables['bank_transaction']
 
 def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=6000):
     """
@@ -118,11 +635,17 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
     Returns:
         tuple: A tuple containing pandas DataFrames for the e-commerce schema.
     """
+    customer_keys = KeyAllocator(10, key=random.getrandbits(64))
+    address_keys = KeyAllocator(12, key=random.getrandbits(64))
+    product_keys = KeyAllocator(8, key=random.getrandbits(64))
+    order_keys = KeyAllocator(12, key=random.getrandbits(64))
+    order_item_keys = KeyAllocator(15, key=random.getrandbits(64))
+
     # Generate Customers
     ecom_customers_data = []
     for _ in range(num_customers):
         ecom_customers_data.append({
-            'customer_id': fake.unique.random_number(digits=10),
+            'customer_id': customer_keys.next_key(),
             'first_name': fake.first_name(),
             'last_name': fake.last_name(),
             'email': fake.unique.email(),
@@ -142,7 +665,7 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
         customer_addresses[customer_id] = []
         
         for _ in range(random.randint(1, 3)):
-            address_id = fake.unique.random_number(digits=12)
+            address_id = address_keys.next_key()
             addresses_data.append({
                 'address_id': address_id,
                 'customer_id': customer_id,
@@ -175,7 +698,7 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
     for category_id in category_ids:
         for _ in range(products_per_category):
             cost = round(random.uniform(10, 1000), 2)
-            product_id = fake.unique.random_number(digits=8)
+            product_id = product_keys.next_key()
             products_data.append({
                 'product_id': product_id,
                 'sku': fake.unique.ean(length=13),
@@ -195,7 +718,7 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
     for _ in range(remaining_products):
         category_id = random.choice(category_ids)
         cost = round(random.uniform(10, 1000), 2)
-        product_id = fake.unique.random_number(digits=8)
+        product_id = product_keys.next_key()
         products_data.append({
             'product_id': product_id,
             'sku': fake.unique.ean(length=13),
@@ -224,7 +747,7 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
             billing_address_id = random.choice(customer_address_ids)  # Could be same or different
             
             orders_data.append({
-                'order_id': fake.unique.random_number(digits=12),
+                'order_id': order_keys.next_key(),
                 'customer_id': customer_id,
                 'order_date': fake.date_time_between(start_date='-2y', end_date='now'),
                 'status': random.choice(['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED']),
@@ -246,7 +769,7 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
                 billing_address_id = random.choice(customer_address_ids)
                 
                 orders_data.append({
-                    'order_id': fake.unique.random_number(digits=12),
+                    'order_id': order_keys.next_key(),
                     'customer_id': customer_id,
                     'order_date': fake.date_time_between(start_date='-2y', end_date='now'),
                     'status': random.choice(['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED']),
@@ -257,50 +780,27 @@ def generate_ecommerce_data(num_customers=2500, num_products=750, num_orders=600
                 })
     ecommerce_orders = pd.DataFrame(orders_data)
 
-    # Generate Order Items and update order total
-    order_items_data = []
-    order_ids = ecommerce_orders['order_id'].tolist()
-    product_price_map = ecommerce_products.set_index('product_id')['price'].to_dict()
-    order_totals = {}
+    # Generate Order Items and update order total, for all orders at once
+    product_ids = ecommerce_products['product_id'].to_numpy()
+    item_orders, item_products, quantities, unit_prices, line_totals, order_totals = _draw_order_items(
+        np.random.default_rng(random.getrandbits(64)), len(ecommerce_orders),
+        ecommerce_products['price'].to_numpy())
+    ecommerce_order_items = pd.DataFrame({
+        'order_item_id': order_item_keys.allocate(item_orders.size),
+        'order_id': ecommerce_orders['order_id'].to_numpy()[item_orders],
+        'product_id': product_ids[item_products],
+        'quantity': quantities,
+        'unit_price': unit_prices,
+        'line_total': line_totals
+    })
+    ecommerce_orders['total_amount'] = order_totals
 
-    # Create a list of all product IDs
-    all_product_ids = list(product_price_map.keys())
-
-    for order_id in order_ids:
-        num_items = random.randint(1, 5)
-        current_order_total = 0
-        
-        # Select random products for this order without replacement if possible
-        order_products = random.sample(all_product_ids, min(num_items, len(all_product_ids)))
-        
-        # If we need more products than available, allow duplicates
-        if num_items > len(order_products):
-            additional_products = [random.choice(all_product_ids) for _ in range(num_items - len(order_products))]
-            order_products.extend(additional_products)
-        
-        for product_id in order_products:
-            quantity = random.randint(1, 3)
-            unit_price = product_price_map[product_id]
-            line_total = unit_price * quantity
-            current_order_total += line_total
-            
-            order_items_data.append({
-                'order_item_id': fake.unique.random_number(digits=15),
-                'order_id': order_id,
-                'product_id': product_id,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'line_total': line_total
-            })
-            
-        order_totals[order_id] = round(current_order_total, 2)
-
-    ecommerce_order_items = pd.DataFrame(order_items_data)
-    ecommerce_orders['total_amount'] = ecommerce_orders['order_id'].map(order_totals)
-
-
-    return (ecommerce_customers, ecommerce_addresses, product_categories,
-            ecommerce_products, ecommerce_orders, ecommerce_order_items)
+    return (schema_ddl.cast_dataframe(ecommerce_customers, 'ecommerce_customer'),
+            schema_ddl.cast_dataframe(ecommerce_addresses, 'ecommerce_address'),
+            schema_ddl.cast_dataframe(product_categories, 'product_category'),
+            schema_ddl.cast_dataframe(ecommerce_products, 'ecommerce_product'),
+            schema_ddl.cast_dataframe(ecommerce_orders, 'ecommerce_order'),
+            schema_ddl.cast_dataframe(ecommerce_order_items, 'ecommerce_order_item'))
 
 def generate_marketing_campaign_data(num_campaigns=150):
     """
@@ -312,12 +812,13 @@ def generate_marketing_campaign_data(num_campaigns=150):
     Returns:
         pd.DataFrame: A DataFrame containing marketing campaign data.
     """
+    campaign_keys = KeyAllocator(7, key=random.getrandbits(64))
     campaigns_data = []
     for _ in range(num_campaigns):
         spend = round(random.uniform(1000, 50000), 2)
         revenue = round(spend * random.uniform(0.8, 3.5), 2)
         campaigns_data.append({
-            'campaign_id': fake.unique.random_number(digits=7),
+            'campaign_id': campaign_keys.next_key(),
             'channel': random.choice(['EMAIL', 'SOCIAL', 'PPC', 'AFFILIATE']),
             'month': fake.date_between(start_date='-2y', end_date='now').replace(day=1),
             'spend_amount': spend,
@@ -327,75 +828,613 @@ def generate_marketing_campaign_data(num_campaigns=150):
             'revenue_generated': revenue
         })
     marketing_campaigns = pd.DataFrame(campaigns_data)
-    return marketing_campaigns
+    return schema_ddl.cast_dataframe(marketing_campaigns, 'marketing_campaign')
+
 
+def stream_ecommerce_parents(fk_state, num_customers=2500, num_products=750, chunk_size=100000, seed=None,
+                             value_pool=None):
+    """
+    Streams the e-commerce customer, address, category and product tables.
+
+    The foreign-key state needed by ``stream_ecommerce_orders`` is kept in
+    compact NumPy arrays: customer IDs, a CSR-style address map
+    (``address_offsets`` indexes each customer's slice of ``address_ids``) and
+    the product ID/price arrays.
+
+    Args:
+        fk_state (dict): Filled with the arrays described above.
+        num_customers (int): The number of customers to generate.
+        num_products (int): The number of products to generate.
+        chunk_size (int): The maximum rows per chunk, or None for one chunk per table.
+        seed (int): Seed for NumPy and Faker, for reproducible output.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+
+    Yields:
+        tuple: ``(table_name, DataFrame)`` chunks, parents before children.
+    """
+    rng = np.random.default_rng(seed)
+    # Faker is only called for the unique product SKUs
+    text_fake = _seeded_faker(seed)
+    value_pool = value_pool or ValuePool()
+    dates = _reference_dates()
+    customer_keys = _key_allocator(seed, 'ecommerce_customer', 10)
+    address_keys = _key_allocator(seed, 'ecommerce_address', 12)
+    product_keys = _key_allocator(seed, 'ecommerce_product', 8)
+
+    # Generate Customers
+    customer_ids = np.empty(num_customers, dtype=np.int64)
+    for start, stop in _chunk_bounds(num_customers, chunk_size):
+        size = stop - start
+        customer_ids[start:stop] = customer_keys.keys(start, stop)
+        yield 'ecommerce_customer', pd.DataFrame({
+            'customer_id': customer_ids[start:stop],
+            'first_name': value_pool.sample(rng, 'first_name', size),
+            'last_name': value_pool.sample(rng, 'last_name', size),
+            'email': value_pool.unique_emails(rng, customer_ids[start:stop]),
+            'phone_number': value_pool.sample(rng, 'phone_number', size),
+            'created_at': _random_datetimes(rng, size, dates['decade_start'], dates['now'])
+        })
+
+    # Generate Addresses (1-3 per customer), kept as a CSR map for order lookups
+    address_counts = rng.integers(1, 4, size=num_customers).astype(np.int8)
+    address_offsets = np.zeros(num_customers + 1, dtype=np.int64)
+    np.cumsum(address_counts, out=address_offsets[1:])
+    address_ids = np.empty(address_offsets[-1], dtype=np.int64)
+    for start, stop in _chunk_bounds(num_customers, chunk_size):
+        first, last = address_offsets[start], address_offsets[stop]
+        size = last - first
+        address_ids[first:last] = address_keys.keys(first, last)
+        yield 'ecommerce_address', pd.DataFrame({
+            'address_id': address_ids[first:last],
+            'customer_id': np.repeat(customer_ids[start:stop], address_counts[start:stop]),
+            'address_line1': value_pool.sample(rng, 'street_address', size),
+            'address_line2': value_pool.sample(rng, 'secondary_address', size),
+            'city': value_pool.sample(rng, 'city', size),
+            'state': value_pool.sample(rng, 'state', size),
+            'postal_code': value_pool.sample(rng, 'postal_code', size),
+            'country': value_pool.sample(rng, 'country', size)
+        })
+
+    # Generate Product Categories
+    category_ids = np.arange(1, len(PRODUCT_CATEGORIES) + 1)
+    yield 'product_category', pd.DataFrame({
+        'category_id': category_ids,
+        'name': PRODUCT_CATEGORIES,
+        'parent_category_id': pd.array([None] * len(PRODUCT_CATEGORIES), dtype='Int64')
+    })
+
+    # Generate Products (each category gets an even share, the remainder is random)
+    product_categories = np.concatenate([
+        np.repeat(category_ids, num_products // len(category_ids)),
+        rng.choice(category_ids, size=num_products % len(category_ids))
+    ])
+    product_ids = np.empty(num_products, dtype=np.int64)
+    product_prices = np.empty(num_products, dtype=np.float64)
+    for start, stop in _chunk_bounds(num_products, chunk_size):
+        size = stop - start
+        product_ids[start:stop] = product_keys.keys(start, stop)
+        cost = np.round(rng.uniform(10, 1000, size=size), 2)
+        product_prices[start:stop] = np.round(cost * rng.uniform(1.2, 2.0, size=size), 2)
+        yield 'ecommerce_product', pd.DataFrame({
+            'product_id': product_ids[start:stop],
+            'sku': [text_fake.unique.ean(length=13) for _ in range(size)],
+            'name': value_pool.sample(rng, 'bs', size),
+            'description': value_pool.sample(rng, 'text', size),
+            'category_id': product_categories[start:stop],
+            'price': product_prices[start:stop],
+            'cost_price': cost,
+            'weight_kg': np.round(rng.uniform(0.1, 15, size=size), 3),
+            'stock_quantity': rng.integers(0, 200, size=size, endpoint=True),
+            'reorder_point': rng.integers(10, 50, size=size, endpoint=True),
+            'discontinued': rng.random(size) < 0.1
+        })
+
+    fk_state.update({
+        'customer_ids': customer_ids,
+        'address_counts': address_counts,
+        'address_offsets': address_offsets,
+        'address_ids': address_ids,
+        'product_ids': product_ids,
+        'product_prices': product_prices
+    })
+
+def stream_ecommerce_orders(fk_state, num_orders=6000, chunk_size=100000, seed=None, shard=None):
+    """
+    Streams the ecommerce_order and ecommerce_order_item tables.
+
+    Each chunk of orders is emitted together with its order items so order
+    totals can be computed without holding all items in memory. Each chunk has
+    its own seed and its own disjoint ID ranges, so any subset of chunks can be
+    generated in a separate process (see ``shard``).
+
+    Args:
+        fk_state (dict): Holds the arrays filled by ``stream_ecommerce_parents``.
+        num_orders (int): The number of orders to generate.
+        chunk_size (int): The maximum orders per chunk, or None for a single chunk.
+        seed (int): Concrete seed shared by all shards of the tables.
+        shard (tuple): ``(shard_index, num_shards)`` to generate only that shard's chunks.
+
+    Yields:
+        tuple: ``(table_name, DataFrame)`` chunks, each order chunk before its items.
+    """
+    dates = _reference_dates()
+    order_keys = _key_allocator(seed, 'ecommerce_order', 12)
+    order_item_keys = _key_allocator(seed, 'ecommerce_order_item', 15)
+    customer_ids = fk_state['customer_ids']
+    address_counts = fk_state['address_counts']
+    address_offsets = fk_state['address_offsets']
+    address_ids = fk_state['address_ids']
+    product_ids = fk_state['product_ids']
+    product_prices = fk_state['product_prices']
+    num_customers = customer_ids.size
+
+    # Each customer has at least one order
+    order_count = max(num_orders, num_customers)
+    bounds = _chunk_bounds(order_count, chunk_size)
+    for chunk_index in _shard_chunks(len(bounds), shard):
+        start, stop = bounds[chunk_index]
+        size = stop - start
+        rng = _chunk_random_state(seed, 'ecommerce_order', chunk_index)
+        owners = _parent_indices(rng, num_customers, start, stop)
+        counts = address_counts[owners]
+        shipping = address_offsets[owners] + (rng.random(size) * counts).astype(np.int64)
+        billing = address_offsets[owners] + (rng.random(size) * counts).astype(np.int64)
+        order_ids = order_keys.keys(start, stop)
+        # Item counters of an order chunk start at a fixed stride so chunks never overlap
+        item_start = start * MAX_ITEMS_PER_ORDER
+
+        item_orders, item_products, item_quantities, item_prices, line_totals, order_totals = \
+            _draw_order_items(rng, size, product_prices)
+
+        yield 'ecommerce_order', pd.DataFrame({
+            'order_id': order_ids,
+            'customer_id': customer_ids[owners],
+            'order_date': _random_datetimes(rng, size, dates['two_years_ago'], dates['now']),
+            'status': rng.choice(ORDER_STATUSES, size=size),
+            'shipping_address_id': address_ids[shipping],
+            'billing_address_id': address_ids[billing],
+            'total_amount': order_totals,
+            'payment_method': rng.choice(PAYMENT_METHODS, size=size)
+        })
+
+        yield 'ecommerce_order_item', pd.DataFrame({
+            'order_item_id': order_item_keys.keys(item_start, item_start + item_orders.size),
+            'order_id': order_ids[item_orders],
+            'product_id': product_ids[item_products],
+            'quantity': item_quantities,
+            'unit_price': item_prices,
+            'line_total': line_totals
+        })
+
+def stream_ecommerce_data(num_customers=2500, num_products=750, num_orders=6000,
+                          chunk_size=100000, seed=None, value_pool=None):
+    """
+    Streams synthetic e-commerce data as fixed-size chunks.
+
+    Args:
+        num_customers (int): The number of customers to generate.
+        num_products (int): The number of products to generate.
+        num_orders (int): The number of orders to generate.
+        chunk_size (int): The maximum rows per chunk, or None for one chunk per table.
+        seed (int): Seed for NumPy and Faker, for reproducible output.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+
+    Yields:
+        tuple: ``(table_name, DataFrame)`` chunks, parents before children.
+    """
+    seed = _resolve_seed(seed)
+    fk_state = {}
+    yield from stream_ecommerce_parents(fk_state, num_customers, num_products, chunk_size, seed, value_pool)
+    yield from stream_ecommerce_orders(fk_state, num_orders, chunk_size, seed)
+
+def stream_marketing_campaign_data(num_campaigns=150, chunk_size=100000, seed=None):
+    """
+    Streams synthetic marketing campaign data as fixed-size chunks.
+
+    Args:
+        num_campaigns (int): The number of campaigns to generate.
+        chunk_size (int): The maximum rows per chunk, or None for a single chunk.
+        seed (int): Seed for NumPy, for reproducible output.
+
+    Yields:
+        tuple: ``('marketing_campaign', DataFrame)`` chunks.
+    """
+    rng = np.random.default_rng(seed)
+    dates = _reference_dates()
+    campaign_keys = _key_allocator(seed, 'marketing_campaign', 7)
+    for start, stop in _chunk_bounds(num_campaigns, chunk_size):
+        size = stop - start
+        spend = np.round(rng.uniform(1000, 50000, size=size), 2)
+        days = _random_datetimes(rng, size, dates['two_years_ago'], dates['now'])
+        yield 'marketing_campaign', pd.DataFrame({
+            'campaign_id': campaign_keys.keys(start, stop),
+            'channel': rng.choice(CHANNELS, size=size),
+            'month': days.astype('datetime64[M]').astype('datetime64[D]'),
+            'spend_amount': spend,
+            'impressions': rng.integers(10000, 1000000, size=size, endpoint=True),
+            'clicks': rng.integers(500, 50000, size=size, endpoint=True),
+            'conversions': rng.integers(50, 2000, size=size, endpoint=True),
+            'revenue_generated': np.round(spend * rng.uniform(0.8, 3.5, size=size), 2)
+        })
+
+def output_path(output_dir, table_name, file_format='csv', part=None, compression=None):
+    """
+    Builds the ``<n>_<table>.<ext>`` path a generated table is saved to.
+
+    Args:
+        output_dir (str): The output directory.
+        table_name (str): The table name, one of ``OUTPUT_TABLES``.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        part (int): The shard number for ``<n>_<table>.part-<k>.<ext>`` part files.
+        compression (str): ``'gzip'`` or ``'zstd'`` to add ``.gz`` or ``.zst`` to
+            CSV files; Parquet files are compressed internally and keep their name.
+
+    Returns:
+        str: The output file path.
+    """
+    suffix = '' if part is None else f".part-{part:04d}"
+    if file_format == 'csv' and compression:
+        file_format += compressed_io.SUFFIXES[compression]
+    return os.path.join(output_dir, f"{OUTPUT_TABLES.index(table_name)}_{table_name}{suffix}.{file_format}")
+
+def write_streamed_tables(chunks, output_dir, file_format='csv', part=None, compression=None):
+    """
+    Appends streamed chunks to their table files as soon as they are built.
+
+    CSV chunks are appended to ``<n>_<table>.csv`` (the header is written once);
+    Parquet chunks are written as row groups of ``<n>_<table>.parquet``. Only
+    the chunk currently being written is held in memory. With ``compression``
+    CSV chunks are compressed as they are appended (the header is its own
+    gzip member or zstd frame, see ``compressed_io``) and Parquet pages use
+    that codec instead of Snappy.
+
+    The time spent producing, converting and writing each table's chunks is
+    recorded as its ``generate``, ``cast`` and ``write_<format>`` stages (see
+    ``pipeline_metrics``).
+
+    Every chunk is first converted to the table's dtypes (see
+    ``schema_ddl.pandas_dtypes``). Parquet columns are typed from
+    ``ddl/schema.sql`` (see ``schema_ddl.arrow_schema``): money is
+    ``decimal128``, dates are ``date32`` and timestamps are UTC timestamps, so
+    the loader can copy them without any per-table parsing.
+
+    Args:
+        chunks (iterable): ``(table_name, DataFrame)`` chunks from ``stream_*`` generators.
+        output_dir (str): The output directory.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        part (int): Write to the numbered part files of a shard instead.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+
+    Returns:
+        dict: A mapping of table name to the number of rows written.
+    """
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+        tables = schema_ddl.parse_schema()
+
+    writers = {}
+    files = []
+    paths = {}
+    row_counts = {}
+    write_stage = f"write_{file_format}"
+    try:
+        for table_name, df in pipeline_metrics.timed_chunks(chunks):
+            with pipeline_metrics.stage('cast', table_name) as record:
+                df = schema_ddl.cast_dataframe(df, table_name)
+                record.rows += len(df)
+            if table_name not in writers:
+                path = output_path(output_dir, table_name, file_format, part, compression)
+                paths[table_name] = path
+                if file_format == 'parquet':
+                    schema = schema_ddl.arrow_schema(tables[table_name], list(df.columns))
+                    writers[table_name] = pq.ParquetWriter(path, schema, compression=compression or 'snappy')
+                else:
+                    files.append(open(path, 'wb'))
+                    header = df.head(0).to_csv(index=False).encode('utf-8')
+                    files[-1].write(compressed_io.compress_bytes(header, compression))
+                    stream = compressed_io.open_writer(files[-1], compression) if compression else files[-1]
+                    writers[table_name] = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+                row_counts[table_name] = 0
+
+            with pipeline_metrics.stage(write_stage, table_name) as record:
+                if file_format == 'parquet':
+                    writer = writers[table_name]
+                    writer.write_table(pa.Table.from_pandas(df, preserve_index=False).cast(writer.schema))
+                else:
+                    df.to_csv(writers[table_name], header=False, index=False)
+                record.rows += len(df)
+            row_counts[table_name] += len(df)
+    finally:
+        for table_name, writer in writers.items():
+            with pipeline_metrics.stage(write_stage, table_name):
+                writer.close()
+        for raw_file in files:
+            raw_file.close()
+    for table_name, path in paths.items():
+        pipeline_metrics.add(write_stage, table_name, calls=0, bytes=os.path.getsize(path))
+    return row_counts
+
+
+def merge_part_files(output_dir, table_name, num_parts, file_format='csv', compression=None):
+    """
+    Merges a table's numbered part files into ``<n>_<table>.<ext>`` in shard order.
+
+    CSV parts are concatenated byte-for-byte with only the first header kept;
+    compressed parts are merged the same way, without recompressing, since
+    each starts with the same compressed header member. Parquet parts are
+    copied one row group at a time. Part files are removed once merged.
+
+    Args:
+        output_dir (str): The output directory.
+        table_name (str): The table name, one of ``OUTPUT_TABLES``.
+        num_parts (int): The number of shards that may have written a part file.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+    """
+    parts = [output_path(output_dir, table_name, file_format, part, compression) for part in range(num_parts)]
+    parts = [path for path in parts if os.path.exists(path)]
+    target = output_path(output_dir, table_name, file_format, compression=compression)
+    if not parts:
+        return
+
+    with pipeline_metrics.stage('merge', table_name) as record:
+        _merge_parts(parts, target, file_format, compression)
+        record.bytes += os.path.getsize(target)
+
+    for path in parts:
+        os.remove(path)
+
+def _merge_parts(parts, target, file_format, compression):
+    """
+    Writes the concatenation of part files to ``target``.
+
+    Args:
+        parts (list): The existing part files, in shard order.
+        target (str): The merged file path.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+    """
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = None
+        for path in parts:
+            part_file = pq.ParquetFile(path)
+            if writer is None:
+                writer = pq.ParquetWriter(target, part_file.schema_arrow, compression=compression or 'snappy')
+            for row_group in range(part_file.num_row_groups):
+                writer.write_table(part_file.read_row_group(row_group))
+        writer.close()
+    else:
+        with open(parts[0], 'rb') as part_file:
+            reader = io.BufferedReader(compressed_io.open_reader(part_file, compression))
+            header = compressed_io.compress_bytes(reader.readline(), compression)
+        with open(target, 'wb') as merged:
+            merged.write(header)
+            for path in parts:
+                with open(path, 'rb') as part_file:
+                    part_file.seek(len(header))
+                    shutil.copyfileobj(part_file, merged, 16 * 1024 * 1024)
+
+def _write_shard(table_name, fk_state, num_rows, chunk_size, seed, shard, output_dir, file_format, value_pool,
+                 compression, metrics_options=None):
+    """
+    Process-pool entry point that writes one shard of a sharded table to part files.
+
+    Args:
+        table_name (str): ``'bank_transaction'`` or ``'ecommerce_order'`` (with its items).
+        fk_state (dict): The parent arrays filled by the matching ``stream_*_parents``.
+        num_rows (int): The total number of rows requested for the table.
+        chunk_size (int): The maximum rows per chunk.
+        seed (int): Concrete seed shared by all shards of the table.
+        shard (tuple): ``(shard_index, num_shards)``.
+        output_dir (str): The output directory.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+        metrics_options (dict): ``pipeline_metrics.options()`` of the parent, to
+            collect the shard's stage metrics; None to skip them.
+
+    Returns:
+        tuple: A mapping of table name to the number of rows written by the
+        shard, and the shard's stage records for ``pipeline_metrics.merge``.
+    """
+    if metrics_options:
+        pipeline_metrics.start(**metrics_options)
+    if table_name == 'bank_transaction':
+        chunks = stream_bank_transactions(fk_state, num_rows, chunk_size, seed, shard, value_pool)
+    else:
+        chunks = stream_ecommerce_orders(fk_state, num_rows, chunk_size, seed, shard)
+    row_counts = write_streamed_tables(chunks, output_dir, file_format, part=shard[0], compression=compression)
+    return row_counts, pipeline_metrics.stage_records()
+
+def generate_sharded(output_dir, workers, num_bank_customers=2000, num_accounts=2500,
+                     num_transactions=5000, num_ecommerce_customers=2500, num_products=750,
+                     num_orders=6000, num_campaigns=150, chunk_size=100000, seed=None,
+                     file_format='csv', value_pool=None, compression=None):
+    """
+    Generates every table, sharding the largest ones across a process pool.
+
+    Parent tables are streamed in this process. ``bank_transaction``,
+    ``ecommerce_order`` and ``ecommerce_order_item`` are then split into
+    ``workers`` shards of whole chunks; every chunk has its own seed and ID
+    range, so the output is identical to single-process streaming with the same
+    seed and keys never collide across shards. Shards write numbered part files
+    that are merged at the end.
+
+    Args:
+        output_dir (str): The output directory.
+        workers (int): The number of worker processes.
+        num_bank_customers (int): The number of banking customers to generate.
+        num_accounts (int): The number of bank accounts to generate.
+        num_transactions (int): The number of transactions to generate.
+        num_ecommerce_customers (int): The number of e-commerce customers to generate.
+        num_products (int): The number of products to generate.
+        num_orders (int): The number of orders to generate.
+        num_campaigns (int): The number of campaigns to generate.
+        chunk_size (int): The maximum rows per chunk.
+        seed (int): Seed for reproducible output.
+        file_format (str): ``'csv'`` or ``'parquet'``.
+        value_pool (ValuePool): The pools the text columns are drawn from.
+        compression (str): ``'gzip'``, ``'zstd'`` or None.
+
+    Returns:
+        dict: A mapping of table name to the number of rows written.
+    """
+    bank_seed, ecommerce_seed, marketing_seed = derive_seeds(_resolve_seed(seed), 3)
+    value_pool = value_pool or ValuePool()
+    bank_state = {}
+    ecommerce_state = {}
+
+    row_counts = write_streamed_tables(itertools.chain(
+        stream_bank_parents(bank_state, num_bank_customers, num_accounts, chunk_size, bank_seed, value_pool),
+        stream_ecommerce_parents(ecommerce_state, num_ecommerce_customers, num_products, chunk_size, ecommerce_seed,
+                                 value_pool),
+        stream_marketing_campaign_data(num_campaigns, chunk_size, marketing_seed)
+    ), output_dir, file_format, compression=compression)
+    # Build the transaction pool here so the workers receive it instead of each building it
+    with pipeline_metrics.stage('value_pool'):
+        value_pool.values('sentence')
+
+    metrics_options = pipeline_metrics.options()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for shard_index in range(workers):
+            shard = (shard_index, workers)
+            futures.append(pool.submit(_write_shard, 'bank_transaction', bank_state, num_transactions,
+                                       chunk_size, bank_seed, shard, output_dir, file_format, value_pool,
+                                       compression, metrics_options))
+            futures.append(pool.submit(_write_shard, 'ecommerce_order', ecommerce_state, num_orders,
+                                       chunk_size, ecommerce_seed, shard, output_dir, file_format, value_pool,
+                                       compression, metrics_options))
+        for future in concurrent.futures.as_completed(futures):
+            shard_counts, stage_records = future.result()
+            for table_name, rows in shard_counts.items():
+                row_counts[table_name] = row_counts.get(table_name, 0) + rows
+            # Shard stages are summed across processes, so their times can exceed the wall time
+            pipeline_metrics.merge(stage_records)
+
+    for table_name in ['bank_transaction', 'ecommerce_order', 'ecommerce_order_item']:
+        merge_part_files(output_dir, table_name, workers, file_format, compression)
+
+    return {table_name: row_counts[table_name] for table_name in OUTPUT_TABLES if table_name in row_counts}
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic banking and e-commerce data.")
+    parser.add_argument('--engine', choices=['faker', 'numpy'], default='faker',
+                        help="Row-by-row Faker generation or the vectorized NumPy engine (banking tables).")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for the vectorized engine, for reproducible output.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Generate every table in fixed-size chunks and append each chunk to disk as it is built.")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="Rows per chunk in streaming mode.")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="Output file format (Parquet requires pyarrow).")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Shard bank_transaction, ecommerce_order and ecommerce_order_item "
+                             "across N processes (uses the streaming engine).")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="Size every table relative to the defaults (1 = 5,000 transactions), "
+                             "keeping the ratios between tables.")
+    parser.add_argument('--pool-size', action='append', default=[], metavar='[PROVIDER=]N',
+                        help="Distinct Faker values pooled per text column by the NumPy engine, for every "
+                             "provider or for one (e.g. sentence=50000). Repeatable.")
+    parser.add_argument('--pool-cache-dir', default=POOL_CACHE_DIR,
+                        help="Directory the value pools are cached in between runs.")
+    parser.add_argument('--compression', choices=compressed_io.COMPRESSIONS, default='none',
+                        help="Compress CSV files as they are written (.csv.gz/.csv.zst), or the "
+                             "Parquet pages with this codec. zstd requires zstandard.")
+    pipeline_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    compression = None if args.compression == 'none' else args.compression
+
+    pool_sizes = {}
+    for option in args.pool_size:
+        provider, _, size = option.rpartition('=')
+        if provider and provider not in POOL_PROVIDERS:
+            parser.error(f"unknown value pool '{provider}', expected one of: {', '.join(POOL_PROVIDERS)}")
+        if not size.isdigit() or int(size) < 1:
+            parser.error(f"invalid --pool-size '{option}'")
+        pool_sizes.update(dict.fromkeys([provider] if provider else POOL_PROVIDERS, int(size)))
+    text_pool = ValuePool(pool_sizes, cache_dir=args.pool_cache_dir)
+    pipeline_metrics.start('generate', trace_memory=args.trace_memory)
+
+    counts = scaled_row_counts(args.scale_factor)
+    streaming = args.stream or args.workers > 1
+    table_rows, output_bytes, memory_bytes = estimate_output(
+        counts, args.format, args.chunk_size if streaming else None, args.workers)
+    print(f"Scale factor {args.scale_factor:g}:")
+    for table, rows in table_rows.items():
+        print(f"  {table}: ~{rows:,} rows")
+    print(f"Estimated output: {output_bytes / 1024 ** 2:,.1f} MB of {args.format.upper()}"
+          f"{' before compression' if compression else ''}, "
+          f"peak memory: {memory_bytes / 1024 ** 2:,.1f} MB"
+          f"{'' if streaming else ' (use --stream or --workers to bound it)'}")
+
     # Create output directory
     output_dir = "synthetic_data"
     os.makedirs(output_dir, exist_ok=True)
 
-    # Define the order of tables to generate and save based on dependencies
-    table_order = [
-        'bank_customer',
-        'bank_account',
-        'bank_transaction',
-        'ecommerce_customer',
-        'ecommerce_address',
-        'product_category',
-        'ecommerce_product',
-        'ecommerce_order',
-        'ecommerce_order_item',
-        'analytics_customer',
-        'analytics_fct_banking',
-        'analytics_fct_order',
-        'analytics_fct_order_item',
-        'marketing_campaign'
-    ]
-
-    # Generate all data first
-    bank_customers, bank_accounts, bank_transactions = generate_banking_data()
-    (ecommerce_customers, ecommerce_addresses, product_categories,
-     ecommerce_products, ecommerce_orders, ecommerce_order_items) = generate_ecommerce_data()
-    marketing_campaigns = generate_marketing_campaign_data()
-
-    # Create a dictionary mapping table names to their corresponding DataFrames
-    data_frames = {
-        'bank_customer': bank_customers,
-        'bank_account': bank_accounts,
-        'bank_transaction': bank_transactions,
-        'ecommerce_customer': ecommerce_customers,
-        'ecommerce_address': ecommerce_addresses,
-        'product_category': product_categories,
-        'ecommerce_product': ecommerce_products,
-        'ecommerce_order': ecommerce_orders,
-        'ecommerce_order_item': ecommerce_order_items,
-        'marketing_campaign': marketing_campaigns
-    }
+    # Each generator gets its own seed so the banking and e-commerce draws are independent
+    bank_seed, ecommerce_seed, marketing_seed = derive_seeds(args.seed, 3)
 
-    # File name mapping (some table names differ from file names)
-    file_name_map = {
-        'bank_customer': 'bank_customers',
-        'bank_account': 'bank_accounts',
-        'bank_transaction': 'bank_transactions',
-        'ecommerce_customer': 'ecommerce_customers',
-        'ecommerce_address': 'ecommerce_addresses',
-        'product_category': 'product_categories',
-        'ecommerce_product': 'ecommerce_products',
-        'ecommerce_order': 'ecommerce_orders',
-        'ecommerce_order_item': 'ecommerce_order_items',
-        'marketing_campaign': 'marketing_campaigns'
-    }
+    if args.workers > 1:
+        # Sharded mode: the largest tables are generated by a process pool
+        chunks = None
+        row_counts = generate_sharded(output_dir, args.workers, chunk_size=args.chunk_size,
+                                      seed=args.seed, file_format=args.format, value_pool=text_pool,
+                                      compression=compression, **counts)
+    elif args.stream:
+        # Streaming mode: chunks are written as soon as they are built
+        chunks = itertools.chain(
+            stream_banking_data(counts['num_bank_customers'], counts['num_accounts'], counts['num_transactions'],
+                                chunk_size=args.chunk_size, seed=bank_seed, value_pool=text_pool),
+            stream_ecommerce_data(counts['num_ecommerce_customers'], counts['num_products'], counts['num_orders'],
+                                  chunk_size=args.chunk_size, seed=ecommerce_seed, value_pool=text_pool),
+            stream_marketing_campaign_data(counts['num_campaigns'], chunk_size=args.chunk_size, seed=marketing_seed)
+        )
+    else:
+        # Generate all data first
+        # Every table of a dataset is built at once, so generation is timed per dataset
+        bank_counts = (counts['num_bank_customers'], counts['num_accounts'], counts['num_transactions'])
+        with pipeline_metrics.stage('generate', 'banking'):
+            if args.engine == 'numpy':
+                bank_customers, bank_accounts, bank_transactions = generate_banking_data_vectorized(
+                    *bank_counts, seed=bank_seed, value_pool=text_pool)
+            else:
+                bank_customers, bank_accounts, bank_transactions = generate_banking_data(*bank_counts)
+        with pipeline_metrics.stage('generate', 'ecommerce'):
+            (ecommerce_customers, ecommerce_addresses, product_categories,
+             ecommerce_products, ecommerce_orders, ecommerce_order_items) = generate_ecommerce_data(
+                counts['num_ecommerce_customers'], counts['num_products'], counts['num_orders'])
+        with pipeline_metrics.stage('generate', 'marketing'):
+            marketing_campaigns = generate_marketing_campaign_data(counts['num_campaigns'])
+
+        # Create a dictionary mapping table names to their corresponding DataFrames
+        data_frames = {
+            'bank_customer': bank_customers,
+            'bank_account': bank_accounts,
+            'bank_transaction': bank_transactions,
+            'ecommerce_customer': ecommerce_customers,
+            'ecommerce_address': ecommerce_addresses,
+            'product_category': product_categories,
+            'ecommerce_product': ecommerce_products,
+            'ecommerce_order': ecommerce_orders,
+            'ecommerce_order_item': ecommerce_order_items,
+            'marketing_campaign': marketing_campaigns
+        }
+        chunks = ((table, data_frames[table]) for table in OUTPUT_TABLES)
+
+    # Save data in dependency order
+    if chunks is not None:
+        row_counts = write_streamed_tables(chunks, output_dir, args.format, compression=compression)
+    for table, rows in row_counts.items():
+        path = output_path(output_dir, table, args.format, compression=compression)
+        print(f"Generated and saved {rows} rows to {path} ({os.path.getsize(path) / 1024 ** 2:,.1f} MB)")
 
-    # Save data in the specified order
-    pointer = 0
-    for table in table_order:
-        if table in data_frames:
-            file_name = file_name_map.get(table, table)
-            data_frames[table].to_csv(f"{output_dir}/{pointer}_{table}.csv", index=False)
-            print(f"{file_name} Generated and saved {table}.csv")
-            pointer += 1
-        else:
-            print(f"Warning: Table '{table}' specified in order but not generated")
-
-    print(f"Synthetic data generated and saved in '{output_dir}' directory.")
\ No newline at end of file
+    print(f"Synthetic data generated and saved in '{output_dir}' directory.")
+    pipeline_metrics.finish(args.metrics_json, args.metrics_prom)
@@ -0,0 +1,177 @@
+-- Pre-aggregated rollups for the bi_queries dashboards.
+--
+-- Each rollup is keyed by day or month, so it can be rebuilt one month at a
+-- time. Statement-level triggers record the months touched by every INSERT,
+-- UPDATE, DELETE or COPY on the source tables in rollup_dirty_month, and
+-- preaggregate.py rebuilds only those months. A TRUNCATE marks the whole
+-- source table dirty ('-infinity').
+--
+-- Apply with: python preaggregate.py --init
+
+-- Months whose rollups are out of date, per source table
+CREATE TABLE IF NOT EXISTS rollup_dirty_month (
+    source_table        TEXT NOT NULL,
+    month               DATE NOT NULL,             -- first day of the month, or '-infinity' for all
+    PRIMARY KEY (source_table, month)
+);
+
+-- Banking transactions per day and type (banking_monthly_deposits)
+CREATE TABLE IF NOT EXISTS rollup_bank_daily (
+    day                 DATE NOT NULL,
+    type                VARCHAR(20) NOT NULL,
+    transaction_count   BIGINT NOT NULL,
+    total_amount        NUMERIC(18,2),
+    PRIMARY KEY (day, type)
+);
+
+-- Banking transactions per month, account and type (banking_net_movement, banking_top_5_withdrawals)
+CREATE TABLE IF NOT EXISTS rollup_bank_account_monthly (
+    month               DATE NOT NULL,
+    account_id          BIGINT NOT NULL,
+    type                VARCHAR(20) NOT NULL,
+    transaction_count   BIGINT NOT NULL,
+    total_amount        NUMERIC(18,2),
+    PRIMARY KEY (month, account_id, type)
+);
+
+-- Orders per day and status (ecommerce_monthly_revenue)
+CREATE TABLE IF NOT EXISTS rollup_order_daily (
+    day                 DATE NOT NULL,
+    status              VARCHAR(20) NOT NULL,
+    order_count         BIGINT NOT NULL,
+    total_amount        NUMERIC(14,2),
+    PRIMARY KEY (day, status)
+);
+
+-- Order items per month of the order and product (ecommerce_top_10_products)
+CREATE TABLE IF NOT EXISTS rollup_product_monthly (
+    month               DATE NOT NULL,
+    product_id          BIGINT NOT NULL,
+    units_sold          BIGINT,
+    revenue             NUMERIC(14,2),
+    PRIMARY KEY (month, product_id)
+);
+
+-- Campaign spend and spend-weighted order revenue per month and channel (agg_marketing_roi)
+CREATE TABLE IF NOT EXISTS rollup_channel_monthly (
+    month               DATE NOT NULL,
+    channel             VARCHAR(250) NOT NULL,
+    campaign_count      BIGINT NOT NULL,
+    spend               NUMERIC(15,2),
+    attributed_revenue  NUMERIC,
+    PRIMARY KEY (month, channel)
+);
+
+-- Star-schema deposits and orders per month and customer (agg_revenue_per_customer)
+CREATE TABLE IF NOT EXISTS rollup_customer_monthly (
+    month               DATE NOT NULL,
+    customer_key        BIGINT NOT NULL,
+    deposit_count       BIGINT NOT NULL,
+    deposit_amount      NUMERIC(18,2),
+    order_count         BIGINT NOT NULL,
+    order_amount        NUMERIC(14,2),
+    PRIMARY KEY (month, customer_key)
+);
+
+-- Records the months of the changed rows; TG_ARGV[0] is the table's date column
+CREATE OR REPLACE FUNCTION rollup_mark_dirty() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO rollup_dirty_month (source_table, month)
+        VALUES (TG_TABLE_NAME, '-infinity') ON CONFLICT DO NOTHING;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('INSERT INTO rollup_dirty_month (source_table, month)
+                        SELECT DISTINCT %L, date_trunc(''month'', %I)::date FROM new_rows
+                        WHERE %I IS NOT NULL ON CONFLICT DO NOTHING',
+                       TG_TABLE_NAME, TG_ARGV[0], TG_ARGV[0]);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('INSERT INTO rollup_dirty_month (source_table, month)
+                        SELECT DISTINCT %L, date_trunc(''month'', %I)::date FROM old_rows
+                        WHERE %I IS NOT NULL ON CONFLICT DO NOTHING',
+                       TG_TABLE_NAME, TG_ARGV[0], TG_ARGV[0]);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Order items have no date of their own; they belong to the month of their order
+CREATE OR REPLACE FUNCTION rollup_mark_dirty_order_items() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO rollup_dirty_month (source_table, month)
+        VALUES (TG_TABLE_NAME, '-infinity') ON CONFLICT DO NOTHING;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_dirty_month (source_table, month)
+        SELECT DISTINCT TG_TABLE_NAME, date_trunc('month', o.order_date)::date
+        FROM new_rows i JOIN ecommerce_order o ON o.order_id = i.order_id
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_dirty_month (source_table, month)
+        SELECT DISTINCT TG_TABLE_NAME, date_trunc('month', o.order_date)::date
+        FROM old_rows i JOIN ecommerce_order o ON o.order_id = i.order_id
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow one event per trigger, hence one trigger per event
+CREATE OR REPLACE TRIGGER bank_transaction_rollup_insert AFTER INSERT ON bank_transaction
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER bank_transaction_rollup_update AFTER UPDATE ON bank_transaction
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER bank_transaction_rollup_delete AFTER DELETE ON bank_transaction
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER bank_transaction_rollup_truncate AFTER TRUNCATE ON bank_transaction
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+
+CREATE OR REPLACE TRIGGER ecommerce_order_rollup_insert AFTER INSERT ON ecommerce_order
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER ecommerce_order_rollup_update AFTER UPDATE ON ecommerce_order
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER ecommerce_order_rollup_delete AFTER DELETE ON ecommerce_order
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER ecommerce_order_rollup_truncate AFTER TRUNCATE ON ecommerce_order
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+
+CREATE OR REPLACE TRIGGER ecommerce_order_item_rollup_insert AFTER INSERT ON ecommerce_order_item
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty_order_items();
+CREATE OR REPLACE TRIGGER ecommerce_order_item_rollup_update AFTER UPDATE ON ecommerce_order_item
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty_order_items();
+CREATE OR REPLACE TRIGGER ecommerce_order_item_rollup_delete AFTER DELETE ON ecommerce_order_item
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty_order_items();
+CREATE OR REPLACE TRIGGER ecommerce_order_item_rollup_truncate AFTER TRUNCATE ON ecommerce_order_item
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty_order_items();
+
+CREATE OR REPLACE TRIGGER analytics_fct_banking_rollup_insert AFTER INSERT ON analytics_fct_banking
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER analytics_fct_banking_rollup_update AFTER UPDATE ON analytics_fct_banking
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER analytics_fct_banking_rollup_delete AFTER DELETE ON analytics_fct_banking
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+CREATE OR REPLACE TRIGGER analytics_fct_banking_rollup_truncate AFTER TRUNCATE ON analytics_fct_banking
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('transaction_date');
+
+CREATE OR REPLACE TRIGGER analytics_fct_order_rollup_insert AFTER INSERT ON analytics_fct_order
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER analytics_fct_order_rollup_update AFTER UPDATE ON analytics_fct_order
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER analytics_fct_order_rollup_delete AFTER DELETE ON analytics_fct_order
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+CREATE OR REPLACE TRIGGER analytics_fct_order_rollup_truncate AFTER TRUNCATE ON analytics_fct_order
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('order_date');
+
+CREATE OR REPLACE TRIGGER marketing_campaign_rollup_insert AFTER INSERT ON marketing_campaign
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('month');
+CREATE OR REPLACE TRIGGER marketing_campaign_rollup_update AFTER UPDATE ON marketing_campaign
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('month');
+CREATE OR REPLACE TRIGGER marketing_campaign_rollup_delete AFTER DELETE ON marketing_campaign
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('month');
+CREATE OR REPLACE TRIGGER marketing_campaign_rollup_truncate AFTER TRUNCATE ON marketing_campaign
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_dirty('month');
@@ -0,0 +1,235 @@
+/* ==============================
+   Partitioned schema profile
+   ==============================
+   Same tables as schema.sql, with bank_transaction and ecommerce_order
+   partitioned by month and indexes for the queries in bi_queries/.
+   Create it with: python load_schema.py --profile partitioned
+
+   Differences from schema.sql:
+   - The primary keys of the partitioned tables include the partition key,
+     as PostgreSQL requires.
+   - ecommerce_order_item.order_id has no foreign key, since order_id alone
+     is no longer unique in ecommerce_order.
+*/
+
+/* ==============================
+   1️⃣ Banking Service Schema
+   ============================== */
+CREATE TABLE bank_customer (
+    customer_id          BIGINT PRIMARY KEY,
+    first_name           VARCHAR(250) NOT NULL,
+    last_name            VARCHAR(250) NOT NULL,
+    email                VARCHAR(100) UNIQUE NOT NULL,
+    phone_number         VARCHAR(32),
+    address_line1        VARCHAR(255),
+    address_line2        VARCHAR(255),
+    city                 VARCHAR(100),
+    state                VARCHAR(100),
+    postal_code          VARCHAR(20),
+    country              VARCHAR(255),
+    date_of_birth        DATE,
+    gender               CHAR(1) CHECK (gender IN ('M','F','O')),
+    created_at           TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE TABLE bank_account (
+    account_id           BIGINT PRIMARY KEY,
+    customer_id          BIGINT REFERENCES bank_customer(customer_id),
+    account_type         VARCHAR(20) CHECK (account_type IN ('CHECKING','SAVINGS','LOAN')),
+    balance              NUMERIC(18,2) DEFAULT 0.00,
+    currency             CHAR(3) DEFAULT 'USD',
+    status               VARCHAR(10) CHECK (status IN ('ACTIVE','INACTIVE','CLOSED')) DEFAULT 'ACTIVE',
+    opened_at            TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    closed_at            TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE bank_transaction (
+    transaction_id      BIGINT NOT NULL,
+    account_id          BIGINT REFERENCES bank_account(account_id),
+    type                VARCHAR(20) CHECK (type IN ('DEPOSIT','WITHDRAWAL','TRANSFER')),
+    amount              NUMERIC(18,2) NOT NULL,
+    currency            CHAR(3) DEFAULT 'USD',
+    transaction_date    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    description         TEXT,
+    PRIMARY KEY (transaction_id, transaction_date)
+) PARTITION BY RANGE (transaction_date);
+
+/* ==============================
+   2️⃣ E‑commerce Service Schema
+   ============================== */
+CREATE TABLE ecommerce_customer (
+    customer_id          BIGINT PRIMARY KEY,
+    first_name           VARCHAR(250) NOT NULL,
+    last_name            VARCHAR(250) NOT NULL,
+    email                VARCHAR(100) UNIQUE NOT NULL,
+    phone_number         VARCHAR(32),
+    created_at           TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE TABLE ecommerce_address (
+    address_id           BIGINT PRIMARY KEY,
+    customer_id          BIGINT REFERENCES ecommerce_customer(customer_id),
+    address_line1        VARCHAR(255),
+    address_line2        VARCHAR(255),
+    city                 VARCHAR(100),
+    state                VARCHAR(100),
+    postal_code          VARCHAR(20),
+    country              VARCHAR(250)
+);
+
+CREATE TABLE product_category (
+    category_id          BIGINT PRIMARY KEY,
+    name                 VARCHAR(100) NOT NULL,
+    parent_category_id   BIGINT REFERENCES product_category(category_id)
+);
+
+CREATE TABLE ecommerce_product (
+    product_id           BIGINT PRIMARY KEY,
+    sku                  VARCHAR(30) UNIQUE NOT NULL,
+    name                 VARCHAR(200) NOT NULL,
+    description          TEXT,
+    category_id          BIGINT REFERENCES product_category(category_id),
+    price                NUMERIC(12,2) NOT NULL,
+    cost_price           NUMERIC(12,2),   -- for margin calc
+    weight_kg            NUMERIC(6,3),
+    stock_quantity       INT DEFAULT 0,
+    reorder_point        INT DEFAULT 0,
+    discontinued         BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE ecommerce_order (
+    order_id             BIGINT NOT NULL,
+    customer_id          BIGINT REFERENCES ecommerce_customer(customer_id),
+    order_date           TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    status               VARCHAR(20) CHECK (status IN ('PENDING','PROCESSING','SHIPPED','DELIVERED','CANCELLED')),
+    shipping_address_id  BIGINT REFERENCES ecommerce_address(address_id),
+    billing_address_id   BIGINT REFERENCES ecommerce_address(address_id),
+    total_amount         NUMERIC(12,2) NOT NULL,
+    payment_method       VARCHAR(30),
+    PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE ecommerce_order_item (
+    order_item_id        BIGINT PRIMARY KEY,
+    order_id             BIGINT,
+    product_id           BIGINT REFERENCES ecommerce_product(product_id),
+    quantity             INT NOT NULL CHECK (quantity > 0),
+    unit_price           NUMERIC(12,2) NOT NULL,
+    line_total           NUMERIC(12,2) DEFAULT NULL
+);
+
+/* ==============================
+   3️⃣ Aggregated Analytics Warehouse
+   ============================== */
+-- Central customer dimension – merge banking & ecommerce customers
+CREATE TABLE analytics_customer (
+    customer_key         BIGINT PRIMARY KEY,
+    first_name           VARCHAR(250),
+    last_name            VARCHAR(250),
+    email                VARCHAR(100) UNIQUE,
+    phone_number         VARCHAR(32),
+    created_at_bank      TIMESTAMP WITH TIME ZONE,
+    created_at_ecom      TIMESTAMP WITH TIME ZONE
+);
+
+-- Fact table for banking transactions
+CREATE TABLE analytics_fct_banking (
+    transaction_key     BIGINT PRIMARY KEY,
+    customer_key        BIGINT REFERENCES analytics_customer(customer_key),
+    account_id          BIGINT,
+    type                VARCHAR(20),
+    amount              NUMERIC(18,2),
+    currency            CHAR(3),
+    transaction_date    DATE
+);
+
+-- Fact table for e‑commerce orders
+CREATE TABLE analytics_fct_order (
+    order_key           BIGINT PRIMARY KEY,
+    customer_key        BIGINT REFERENCES analytics_customer(customer_key),
+    order_date          DATE,
+    status              VARCHAR(20),
+    total_amount        NUMERIC(12,2),
+    payment_method      VARCHAR(30)
+);
+
+-- Fact table for e‑commerce order items (line‑level)
+CREATE TABLE analytics_fct_order_item (
+    item_key            BIGINT PRIMARY KEY,
+    order_key           BIGINT REFERENCES analytics_fct_order(order_key),
+    product_id          BIGINT,
+    category_id         BIGINT,
+    quantity            INT,
+    unit_price          NUMERIC(12,2),
+    line_total          NUMERIC(12,2)
+);
+
+-- Marketing Campaign Fact Table
+CREATE TABLE marketing_campaign (
+    campaign_id          BIGINT PRIMARY KEY,
+    channel              VARCHAR(250) NOT NULL,      -- e.g., 'EMAIL', 'SOCIAL', 'PPC', 'AFFILIATE'
+    month                DATE NOT NULL,             -- first day of the month the spend was recorded
+    spend_amount         NUMERIC(15,2) NOT NULL,     -- currency in USD (or your base currency)
+    impressions          BIGINT DEFAULT 0,
+    clicks               BIGINT DEFAULT 0,
+    conversions          BIGINT DEFAULT 0,
+    revenue_generated    NUMERIC(15,2) DEFAULT 0.00
+);
+
+/* ==============================
+   Monthly partitions
+   ============================== */
+-- Creates one partition per month of [first_month, last_month] for a table
+-- partitioned by a timestamp column, named <table>_YYYY_MM. Existing
+-- partitions are kept, so it can be rerun to add the coming months.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent REGCLASS, first_month DATE, last_month DATE)
+RETURNS VOID LANGUAGE plpgsql AS $$
+DECLARE
+    month DATE := date_trunc('month', first_month);
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                       parent::text || '_' || to_char(month, 'YYYY_MM'), parent,
+                       month, (month + interval '1 month')::date);
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END;
+$$;
+
+-- The generator writes the last two years; rows outside the monthly
+-- partitions go to the default partition.
+SELECT create_monthly_partitions('bank_transaction', (now() - interval '24 months')::date, (now() + interval '3 months')::date);
+SELECT create_monthly_partitions('ecommerce_order', (now() - interval '24 months')::date, (now() + interval '3 months')::date);
+CREATE TABLE bank_transaction_default PARTITION OF bank_transaction DEFAULT;
+CREATE TABLE ecommerce_order_default PARTITION OF ecommerce_order DEFAULT;
+
+/* ==============================
+   Indexes for bi_queries/
+   ============================== */
+-- banking_net_movement: per-account sums read from the index alone
+CREATE INDEX bank_transaction_account_id_type_idx ON bank_transaction (account_id, type) INCLUDE (amount);
+-- banking_top_5_withdrawals: a partial index holding only the withdrawals
+CREATE INDEX bank_transaction_withdrawal_account_id_idx ON bank_transaction (account_id) INCLUDE (amount)
+    WHERE type = 'WITHDRAWAL';
+-- banking_monthly_deposits: the months inside the 12-month window, without reading descriptions
+CREATE INDEX bank_transaction_transaction_date_type_idx ON bank_transaction (transaction_date, type) INCLUDE (amount);
+-- banking_top_5_withdrawals: customer to accounts
+CREATE INDEX bank_account_customer_id_idx ON bank_account (customer_id);
+
+-- ecommerce_monthly_revenue: orders arrive in date order, so a block-range index
+-- narrows the first month of the window at a fraction of a B-tree's size
+CREATE INDEX ecommerce_order_order_date_brin ON ecommerce_order USING BRIN (order_date);
+-- Order history per customer
+CREATE INDEX ecommerce_order_customer_id_order_date_idx ON ecommerce_order (customer_id, order_date);
+-- ecommerce_top_10_products: units and revenue per product from the index alone
+CREATE INDEX ecommerce_order_item_product_id_idx ON ecommerce_order_item (product_id) INCLUDE (quantity, line_total);
+-- Items of an order (replaces the index behind the dropped foreign key lookups)
+CREATE INDEX ecommerce_order_item_order_id_idx ON ecommerce_order_item (order_id);
+
+-- agg_revenue_per_customer, agg_customer_ltv: facts per customer
+CREATE INDEX analytics_fct_banking_customer_key_type_idx ON analytics_fct_banking (customer_key, type) INCLUDE (amount);
+CREATE INDEX analytics_fct_order_customer_key_idx ON analytics_fct_order (customer_key) INCLUDE (order_date, total_amount);
+-- agg_marketing_roi and the rollup refreshes: date ranges of the facts, which each
+-- incremental etl_analytics.py run appends after the older dates
+CREATE INDEX analytics_fct_banking_transaction_date_brin ON analytics_fct_banking USING BRIN (transaction_date);
+CREATE INDEX analytics_fct_order_order_date_brin ON analytics_fct_order USING BRIN (order_date);
@@ -0,0 +1,333 @@
+"""
+Script to build the analytics_* star schema from the bank_* and ecommerce_* tables.
+
+This script:
+1. Merges bank and e-commerce customers into ``analytics_customer`` by email
+2. Loads new banking transactions into ``analytics_fct_banking``
+3. Loads new orders and their items into ``analytics_fct_order`` and
+   ``analytics_fct_order_item``
+
+Every step is a single set-based ``INSERT ... SELECT ... ON CONFLICT``
+statement that runs inside PostgreSQL, and all steps commit together.
+
+Incremental loads:
+    The fact tables are loaded incrementally. ``analytics_etl_watermark``
+    stores the highest ``transaction_date`` / ``order_date`` processed for
+    each fact table, and each run only reads source rows above it, up to the
+    current maximum. Customers are matched through
+    ``analytics_customer_map`` (source system and source id to customer key),
+    so only customers that have not been mapped yet are processed. Keys of
+    new customers come from the ``analytics_customer_key_seq`` sequence.
+
+Usage:
+    1. Load the source tables:
+       python load_data_from_minio.py
+
+    2. Run the ETL (nightly, or after each load):
+       python etl_analytics.py
+
+    3. Rebuild the star schema from scratch, e.g. after the source tables were
+       reloaded:
+       python etl_analytics.py --full-refresh
+
+Note:
+    Customers without an email cannot be matched across systems and are not
+    added to ``analytics_customer``; their facts get a NULL ``customer_key``.
+"""
+
+import argparse
+import psycopg2
+import time
+
+# libpq options for every connection: cast timestamps to dates in UTC, like the loader
+# (load_data_from_minio.SESSION_OPTIONS) and the rollup refresh
+SESSION_OPTIONS = '-c TimeZone=UTC'
+
+# Control objects used by the ETL, created on first run
+CONTROL_DDL = """
+CREATE SEQUENCE IF NOT EXISTS analytics_customer_key_seq;
+
+CREATE TABLE IF NOT EXISTS analytics_customer_map (
+    source              VARCHAR(20) NOT NULL,     -- 'bank' or 'ecommerce'
+    source_customer_id  BIGINT NOT NULL,
+    customer_key        BIGINT NOT NULL,
+    PRIMARY KEY (source, source_customer_id)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_etl_watermark (
+    target_table        TEXT PRIMARY KEY,
+    high_watermark      TIMESTAMP WITH TIME ZONE NOT NULL,
+    rows_processed      BIGINT NOT NULL,
+    updated_at          TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Customers not mapped yet, from both source systems
+STAGE_NEW_CUSTOMERS = """
+CREATE TEMP TABLE new_customers ON COMMIT DROP AS
+SELECT 'bank' AS source, b.customer_id, b.first_name, b.last_name, LOWER(b.email) AS email,
+       b.phone_number, b.created_at
+FROM bank_customer b
+WHERE b.email IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM analytics_customer_map m
+                  WHERE m.source = 'bank' AND m.source_customer_id = b.customer_id)
+UNION ALL
+SELECT 'ecommerce', e.customer_id, e.first_name, e.last_name, LOWER(e.email),
+       e.phone_number, e.created_at
+FROM ecommerce_customer e
+WHERE e.email IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM analytics_customer_map m
+                  WHERE m.source = 'ecommerce' AND m.source_customer_id = e.customer_id);
+"""
+
+# One dimension row per email; names and phone numbers prefer the bank record
+MERGE_CUSTOMERS = """
+INSERT INTO analytics_customer (customer_key, first_name, last_name, email, phone_number,
+                                created_at_bank, created_at_ecom)
+SELECT nextval('analytics_customer_key_seq'), first_name, last_name, email, phone_number,
+       created_at_bank, created_at_ecom
+FROM (
+    SELECT email,
+           (ARRAY_AGG(first_name ORDER BY source))[1] AS first_name,
+           (ARRAY_AGG(last_name ORDER BY source))[1] AS last_name,
+           (ARRAY_AGG(phone_number ORDER BY source))[1] AS phone_number,
+           MIN(created_at) FILTER (WHERE source = 'bank') AS created_at_bank,
+           MIN(created_at) FILTER (WHERE source = 'ecommerce') AS created_at_ecom
+    FROM new_customers
+    GROUP BY email
+) merged
+ON CONFLICT (email) DO UPDATE SET
+    first_name = COALESCE(analytics_customer.first_name, EXCLUDED.first_name),
+    last_name = COALESCE(analytics_customer.last_name, EXCLUDED.last_name),
+    phone_number = COALESCE(analytics_customer.phone_number, EXCLUDED.phone_number),
+    created_at_bank = COALESCE(analytics_customer.created_at_bank, EXCLUDED.created_at_bank),
+    created_at_ecom = COALESCE(analytics_customer.created_at_ecom, EXCLUDED.created_at_ecom);
+"""
+
+MAP_CUSTOMERS = """
+INSERT INTO analytics_customer_map (source, source_customer_id, customer_key)
+SELECT n.source, n.customer_id, ac.customer_key
+FROM new_customers n
+JOIN analytics_customer ac ON ac.email = n.email
+ON CONFLICT (source, source_customer_id) DO NOTHING;
+"""
+
+LOAD_FCT_BANKING = """
+INSERT INTO analytics_fct_banking (transaction_key, customer_key, account_id, type, amount,
+                                   currency, transaction_date)
+SELECT t.transaction_id, m.customer_key, t.account_id, t.type, t.amount, t.currency,
+       t.transaction_date::date
+FROM bank_transaction t
+JOIN bank_account a ON a.account_id = t.account_id
+LEFT JOIN analytics_customer_map m ON m.source = 'bank' AND m.source_customer_id = a.customer_id
+WHERE t.transaction_date > %(low)s AND t.transaction_date <= %(high)s
+ON CONFLICT (transaction_key) DO UPDATE SET
+    customer_key = EXCLUDED.customer_key,
+    account_id = EXCLUDED.account_id,
+    type = EXCLUDED.type,
+    amount = EXCLUDED.amount,
+    currency = EXCLUDED.currency,
+    transaction_date = EXCLUDED.transaction_date;
+"""
+
+LOAD_FCT_ORDER = """
+INSERT INTO analytics_fct_order (order_key, customer_key, order_date, status, total_amount,
+                                 payment_method)
+SELECT o.order_id, m.customer_key, o.order_date::date, o.status, o.total_amount, o.payment_method
+FROM ecommerce_order o
+LEFT JOIN analytics_customer_map m ON m.source = 'ecommerce' AND m.source_customer_id = o.customer_id
+WHERE o.order_date > %(low)s AND o.order_date <= %(high)s
+ON CONFLICT (order_key) DO UPDATE SET
+    customer_key = EXCLUDED.customer_key,
+    order_date = EXCLUDED.order_date,
+    status = EXCLUDED.status,
+    total_amount = EXCLUDED.total_amount,
+    payment_method = EXCLUDED.payment_method;
+"""
+
+LOAD_FCT_ORDER_ITEM = """
+INSERT INTO analytics_fct_order_item (item_key, order_key, product_id, category_id, quantity,
+                                      unit_price, line_total)
+SELECT i.order_item_id, i.order_id, i.product_id, p.category_id, i.quantity, i.unit_price,
+       i.line_total
+FROM ecommerce_order_item i
+JOIN ecommerce_order o ON o.order_id = i.order_id
+LEFT JOIN ecommerce_product p ON p.product_id = i.product_id
+WHERE o.order_date > %(low)s AND o.order_date <= %(high)s
+ON CONFLICT (item_key) DO UPDATE SET
+    order_key = EXCLUDED.order_key,
+    product_id = EXCLUDED.product_id,
+    category_id = EXCLUDED.category_id,
+    quantity = EXCLUDED.quantity,
+    unit_price = EXCLUDED.unit_price,
+    line_total = EXCLUDED.line_total;
+"""
+
+# Fact loads: (watermark name, source table, watermark column, [(fact table, statement)])
+FACT_LOADS = [
+    ('analytics_fct_banking', 'bank_transaction', 'transaction_date', [
+        ('analytics_fct_banking', LOAD_FCT_BANKING)
+    ]),
+    ('analytics_fct_order', 'ecommerce_order', 'order_date', [
+        ('analytics_fct_order', LOAD_FCT_ORDER),
+        ('analytics_fct_order_item', LOAD_FCT_ORDER_ITEM)
+    ])
+]
+
+def connect_to_postgres(host, port, user, password, database):
+    """
+    Connect to PostgreSQL.
+
+    The session uses ``SESSION_OPTIONS``, so month and day boundaries match
+    the rollups' dirty months and the loader's timestamps, whatever the server's ``TimeZone`` is.
+
+    Args:
+        host (str): The host of the PostgreSQL service.
+        port (int): The port of the PostgreSQL service.
+        user (str): The username for PostgreSQL.
+        password (str): The password for PostgreSQL.
+        database (str): The database name.
+
+    Returns:
+        psycopg2.connection: The PostgreSQL connection.
+    """
+    return psycopg2.connect(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database,
+        options=SESSION_OPTIONS
+    )
+
+def full_refresh(cursor):
+    """
+    Empty the star schema and its control tables so the next run rebuilds everything.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor in the ETL transaction.
+    """
+    cursor.execute("""
+        TRUNCATE analytics_fct_order_item, analytics_fct_order, analytics_fct_banking,
+                 analytics_customer, analytics_customer_map, analytics_etl_watermark
+    """)
+    cursor.execute("ALTER SEQUENCE analytics_customer_key_seq RESTART")
+    print("Emptied the analytics tables for a full refresh.")
+
+def load_customers(cursor):
+    """
+    Add customers that are not mapped yet to ``analytics_customer``.
+
+    Bank and e-commerce customers with the same (case-insensitive) email
+    share one customer key.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor in the ETL transaction.
+
+    Returns:
+        int: The number of source customers mapped.
+    """
+    cursor.execute(STAGE_NEW_CUSTOMERS)
+    cursor.execute(MERGE_CUSTOMERS)
+    cursor.execute(MAP_CUSTOMERS)
+    return cursor.rowcount
+
+def load_facts(cursor, target_table, source_table, watermark_column, statements):
+    """
+    Load the source rows above the target's watermark into the fact tables.
+
+    The upper bound is fixed before loading, so rows committed to the source
+    while the ETL runs are picked up by the next run instead of being skipped.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor in the ETL transaction.
+        target_table (str): The fact table the watermark belongs to.
+        source_table (str): The source table.
+        watermark_column (str): The source timestamp column.
+        statements (list): ``(fact table, INSERT ... SELECT statement)`` pairs,
+            run with ``low`` and ``high`` parameters.
+
+    Returns:
+        dict: Fact table name to the number of rows inserted or updated.
+    """
+    cursor.execute("SELECT high_watermark FROM analytics_etl_watermark WHERE target_table = %s",
+                   (target_table,))
+    row = cursor.fetchone()
+    low = row[0] if row else '-infinity'
+    cursor.execute(f"SELECT MAX({watermark_column}) FROM {source_table} WHERE {watermark_column} > %s",
+                   (low,))
+    high = cursor.fetchone()[0]
+    if high is None:
+        return {fact_table: 0 for fact_table, _ in statements}
+
+    row_counts = {}
+    for fact_table, statement in statements:
+        cursor.execute(statement, {'low': low, 'high': high})
+        row_counts[fact_table] = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO analytics_etl_watermark (target_table, high_watermark, rows_processed, updated_at)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (target_table) DO UPDATE
+        SET high_watermark = EXCLUDED.high_watermark,
+            rows_processed = EXCLUDED.rows_processed,
+            updated_at = EXCLUDED.updated_at
+    """, (target_table, high, sum(row_counts.values())))
+    return row_counts
+
+def run_etl(conn, refresh=False):
+    """
+    Run every ETL step in one transaction.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        refresh (bool): Rebuild the star schema from scratch.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(CONTROL_DDL)
+            if refresh:
+                full_refresh(cursor)
+
+            started = time.perf_counter()
+            mapped = load_customers(cursor)
+            print(f"Mapped {mapped} new customers into analytics_customer "
+                  f"in {time.perf_counter() - started:.2f}s.")
+
+            for target_table, source_table, watermark_column, statements in FACT_LOADS:
+                started = time.perf_counter()
+                row_counts = load_facts(cursor, target_table, source_table, watermark_column, statements)
+                elapsed = time.perf_counter() - started
+                for fact_table, rows_processed in row_counts.items():
+                    print(f"Loaded {rows_processed} rows into {fact_table} from {source_table} "
+                          f"in {elapsed:.2f}s.")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Build the analytics_* star schema from the source tables.")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Empty the analytics tables and watermarks and rebuild them from scratch.")
+    args = parser.parse_args()
+
+    # PostgreSQL Configuration
+    PG_HOST = 'localhost'
+    PG_PORT = 5432
+    PG_USER = 'postgres'
+    PG_PASSWORD = 'postgres'
+    PG_DATABASE = 'banking_db'
+
+    conn = connect_to_postgres(PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE)
+    try:
+        run_etl(conn, args.full_refresh)
+    except Exception as e:
+        print(f"Error running the analytics ETL: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
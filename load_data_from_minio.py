@@ -22,18 +22,83 @@ Dependencies:
     - pandas: For data manipulation
     - psycopg2: For PostgreSQL operations
 
+Load methods:
+    By default each table is bulk loaded with ``COPY ... FROM STDIN`` through
+    psycopg2's ``copy_expert``. Pass ``--load-method insert`` to fall back to
+    the row-by-row ``executemany`` INSERT path, or ``--load-method raw`` to
+    stream CSV objects straight into COPY without parsing them in pandas.
+    With ``--stream`` each object
+    is parsed and loaded in ``--chunk-size`` row chunks as it is downloaded,
+    so memory use does not depend on the object size. ``--pipeline`` also
+    runs the download (as parallel ranged GETs), parsing, conversion and COPY
+    of each CSV object on separate threads, so they overlap.
+
+    Objects may be CSV (``<n>_<table>.csv``), compressed CSV
+    (``<n>_<table>.csv.gz`` or ``.csv.zst``) or Parquet
+    (``<n>_<table>.parquet``). Compressed CSVs are decompressed while they
+    stream into PostgreSQL, without an uncompressed copy on disk or in memory.
+    Parquet objects are read as typed Arrow record batches and copied without
+    any pandas parsing or date fix-ups.
+
+    With ``--defer-constraints`` the primary, unique and foreign keys are
+    dropped (or never created) before loading, so rows go in without index
+    maintenance or FK lookups. Afterwards the keys are rebuilt in parallel and
+    foreign keys are added ``NOT VALID`` and then validated.
+
+    With ``--checkpoint`` every ``--chunk-size`` rows are committed together
+    with the table's progress in the ``load_checkpoint`` control table, and a
+    rerun resumes each table after its last committed batch. ``--preflight``
+    checks every foreign key of the objects before anything is loaded.
+
+    With ``--staging`` the tables are loaded into UNLOGGED copies, which get
+    their keys and are then swapped in for the live tables in one
+    transaction (see ``staging_load``).
+
+Metrics:
+    Every stage of every table (``download``, ``parse``, ``cast``,
+    ``encode_csv``, ``copy``, ``commit``, ...) is timed with
+    ``pipeline_metrics`` and summarized at the end of the run. Pass
+    ``--metrics-json`` or ``--metrics-prom`` to keep the report.
+
 Note:
     Tables are loaded in a specific order to respect foreign key constraints.
     The order is defined based on the table creation sequence in schema.sql.
 """
 
+import argparse
 import boto3
+import concurrent.futures
+import csv
+import itertools
 import pandas as pd
 import psycopg2
 import io
 import os
+import queue
+import re
+import tempfile
+import threading
+import time
 from psycopg2 import sql
 
+import compressed_io
+import load_pipeline
+import load_scheduler
+import pipeline_metrics
+import schema_ddl
+import staging_load
+
+# Object suffixes from the least to the most preferred when a table has several objects
+OBJECT_PREFERENCE = ['.csv', '.csv.gz', '.csv.zst', '.parquet']
+
+# Control table recording the object (and its ETag) each table was last loaded from
+WATERMARK_TABLE = 'load_watermark'
+# Control table recording how many rows of a table's object are committed during a checkpointed load
+CHECKPOINT_TABLE = 'load_checkpoint'
+# libpq options for every loader connection. The generator writes naive UTC timestamps; in a UTC
+# session they mean the same instant in CSV as in Parquet, whose timestamps are labelled UTC.
+SESSION_OPTIONS = '-c TimeZone=UTC'
+
 def connect_to_minio(minio_url, access_key, secret_key):
     """
     Connect to MinIO and return the S3 client.
@@ -60,6 +125,9 @@ def connect_to_minio(minio_url, access_key, secret_key):
 def connect_to_postgres(host, port, user, password, database):
     """
     Connect to PostgreSQL and return the connection.
+
+    The session uses ``SESSION_OPTIONS``, so naive timestamps in CSV objects
+    are read as UTC whatever the server's ``TimeZone`` is.
     
     Args:
         host (str): The host of the PostgreSQL service.
@@ -76,7 +144,8 @@ def connect_to_postgres(host, port, user, password, database):
         port=port,
         user=user,
         password=password,
-        database=database
+        database=database,
+        options=SESSION_OPTIONS
     )
     return conn
 
@@ -93,7 +162,7 @@ def get_table_name_from_filename(filename):
     # Remove file extension and return
     return os.path.splitext(filename)[0]
 
-def load_data_to_postgres(conn, table_name, df):
+def load_data_to_postgres(conn, table_name, df, commit=True):
     """
     Load data from DataFrame to PostgreSQL table.
     
@@ -101,6 +170,7 @@ def load_data_to_postgres(conn, table_name, df):
         conn (psycopg2.connection): The PostgreSQL connection.
         table_name (str): The name of the table to load data into.
         df (pd.DataFrame): The DataFrame containing the data.
+        commit (bool): Whether to commit the transaction after the INSERTs.
         
     Returns:
         int: The number of rows inserted.
@@ -123,31 +193,1133 @@ def load_data_to_postgres(conn, table_name, df):
     
     # Convert DataFrame to list of tuples and handle NaT values
     rows = []
-    for row in df.values:
-        # Replace NaT values with None (which becomes NULL in PostgreSQL)
-        # Convert numpy.float64 to Python float to avoid passing direct NumPy type references
-        processed_row = [None if pd.isna(val) or (hasattr(val, 'is_nat') and val.is_nat) 
-                        else float(val) if hasattr(val, 'dtype') and 'float' in str(val.dtype) 
-                        else val for val in row]
-        rows.append(tuple(processed_row))
+    with pipeline_metrics.stage('convert_rows', table_name) as record:
+        for row in df.values:
+            # Replace NaT values with None (which becomes NULL in PostgreSQL)
+            # Convert numpy.float64 to Python float to avoid passing direct NumPy type references
+            processed_row = [None if pd.isna(val) or (hasattr(val, 'is_nat') and val.is_nat) 
+                            else float(val) if hasattr(val, 'dtype') and 'float' in str(val.dtype) 
+                            else val for val in row]
+            rows.append(tuple(processed_row))
+        record.rows += len(rows)
     
     # Execute the query for each row
-    cursor.executemany(insert_query, rows)
+    with pipeline_metrics.stage('insert', table_name) as record:
+        cursor.executemany(insert_query, rows)
+        record.rows += len(rows)
     
     # Commit the transaction
-    conn.commit()
+    if commit:
+        with pipeline_metrics.stage('commit', table_name):
+            conn.commit()
     
     # Close the cursor
     cursor.close()
     
     return len(rows)
 
-def ensure_schema_loaded(conn):
+def _copy_query(table_name, columns=None, header=False):
+    """
+    Build a ``COPY <table> (<columns>) FROM STDIN`` statement for CSV input.
+
+    Args:
+        table_name (str): The name of the table to load data into.
+        columns (list): The column names in file order, or None for table order.
+        header (bool): Whether the input starts with a header line to skip.
+
+    Returns:
+        psycopg2.sql.Composed: The COPY statement.
+    """
+    column_list = sql.SQL('')
+    if columns:
+        column_list = sql.SQL(' ({})').format(sql.SQL(', ').join(map(sql.Identifier, columns)))
+    return sql.SQL("COPY {}{} FROM STDIN WITH (FORMAT csv, HEADER {})").format(
+        sql.Identifier(table_name),
+        column_list,
+        sql.SQL('true' if header else 'false')
+    )
+
+def encode_copy_buffer(table_name, df):
+    """
+    Serialize a DataFrame to the CSV input of a ``COPY ... FROM STDIN``.
+
+    The DataFrame is serialized in one vectorized ``to_csv`` call, so NULL
+    handling happens per column instead of per cell: NaN, NaT and None all
+    become empty unquoted fields, which COPY reads as NULL.
+
+    Args:
+        table_name (str): The name of the table the data belongs to.
+        df (pd.DataFrame): The DataFrame containing the data.
+
+    Returns:
+        tuple: The column names, the number of rows and an ``io.StringIO``
+        positioned at the start of the CSV.
+    """
+    # Integer columns with missing values are upcast to float by pandas; restore
+    # them as nullable integers so COPY does not see "1.0" for a BIGINT column
+    integral_columns = {
+        column: 'Int64' for column in df.columns
+        if df[column].dtype.kind == 'f' and df[column].hasnans and (df[column].dropna() % 1 == 0).all()
+    }
+    if integral_columns:
+        df = df.astype(integral_columns)
+
+    with pipeline_metrics.stage('encode_csv', table_name) as record:
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        record.rows += len(df)
+        record.bytes += buffer.tell()
+        buffer.seek(0)
+    return df.columns.tolist(), len(df), buffer
+
+def copy_data_to_postgres(conn, table_name, df, commit=True):
+    """
+    Bulk load data from a DataFrame into a PostgreSQL table with COPY.
+
+    The DataFrame is serialized with ``encode_copy_buffer``.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The name of the table to load data into.
+        df (pd.DataFrame): The DataFrame containing the data.
+        commit (bool): Whether to commit the transaction after the COPY.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    columns, rows, buffer = encode_copy_buffer(table_name, df)
+    cursor = conn.cursor()
+    with pipeline_metrics.stage('copy', table_name) as record:
+        cursor.copy_expert(_copy_query(table_name, columns), buffer)
+        record.rows += rows
+    if commit:
+        with pipeline_metrics.stage('commit', table_name):
+            conn.commit()
+    cursor.close()
+
+    return rows
+
+def _split_csv_header(csv_file, block_size=1024 * 1024):
+    """
+    Read the header line of a CSV stream and return the rest as a new stream.
+
+    Args:
+        csv_file: A file-like object with a ``read(size)`` method.
+        block_size (int): The bytes read at a time.
+
+    Returns:
+        tuple: The column names, and a readable binary stream of the remaining bytes.
+    """
+    head = b''
+    while b'\n' not in head:
+        block = csv_file.read(block_size)
+        if not block:
+            break
+        head += block
+    header, _, rest = head.partition(b'\n')
+    columns = next(csv.reader([header.decode('utf-8').rstrip('\r')]))
+    blocks = itertools.chain([rest], iter(lambda: csv_file.read(block_size), b''))
+    return columns, io.BufferedReader(load_pipeline.IterableReader(blocks))
+
+def copy_csv_to_postgres(conn, table_name, csv_file, columns=None, header=True):
+    """
+    Stream raw CSV bytes into a PostgreSQL table with COPY.
+
+    The file is passed straight to ``copy_expert``, which reads it in blocks,
+    so neither the bytes nor any parsed rows are held in memory. Values are
+    parsed by PostgreSQL itself: empty unquoted fields become NULL, money is
+    rounded to its column's scale and naive timestamps are read in the
+    session time zone (UTC, see ``SESSION_OPTIONS``). Used by
+    ``--load-method raw``; a value PostgreSQL cannot parse fails the table.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The name of the table to load data into.
+        csv_file: A file-like object with a ``read(size)`` method, such as an
+            open file or an S3 ``StreamingBody``.
+        columns (list): The column names in file order. When None, they are
+            read from the header line, or the file's columns must be in
+            table order if it has none.
+        header (bool): Whether the file starts with a header line.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    if header and columns is None:
+        columns, csv_file = _split_csv_header(csv_file)
+        header = False
+    cursor = conn.cursor()
+    with pipeline_metrics.stage('copy', table_name) as record:
+        cursor.copy_expert(_copy_query(table_name, columns, header), csv_file)
+        rows_copied = cursor.rowcount
+        record.rows += rows_copied
+    with pipeline_metrics.stage('commit', table_name):
+        conn.commit()
+    cursor.close()
+
+    return rows_copied
+
+def copy_parquet_to_postgres(conn, table_name, parquet_path, chunk_size=100000):
+    """
+    Load a Parquet file into a PostgreSQL table with COPY, one record batch at a time.
+
+    The file is memory-mapped and read as Arrow record batches, so column
+    buffers are used in place instead of being parsed from text. Each batch
+    is serialized by Arrow's CSV writer and copied. Dates, timestamps and
+    decimals keep the types they were written with, so no per-table
+    conversion is needed. The whole table is committed once, after the last
+    batch.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The name of the table to load data into.
+        parquet_path (str): The path of the Parquet file.
+        chunk_size (int): The number of rows per record batch.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    try:
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Loading Parquet objects requires pyarrow: pip install pyarrow") from e
+
+    parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+    query = _copy_query(table_name, parquet_file.schema_arrow.names)
+    write_options = pa_csv.WriteOptions(include_header=False)
+    rows_copied = 0
+    cursor = conn.cursor()
+    batches = ((table_name, batch) for batch in parquet_file.iter_batches(batch_size=chunk_size))
+    for _, batch in pipeline_metrics.timed_chunks(batches, 'read_parquet'):
+        with pipeline_metrics.stage('encode_csv', table_name) as record:
+            buffer = io.BytesIO()
+            pa_csv.write_csv(batch, buffer, write_options)
+            record.rows += batch.num_rows
+            record.bytes += buffer.tell()
+            buffer.seek(0)
+        with pipeline_metrics.stage('copy', table_name) as record:
+            cursor.copy_expert(query, buffer)
+            record.rows += batch.num_rows
+        rows_copied += batch.num_rows
+    with pipeline_metrics.stage('commit', table_name):
+        conn.commit()
+    cursor.close()
+
+    return rows_copied
+
+def copy_parquet_object_to_postgres(conn, s3_client, bucket, key, table_name, chunk_size=100000):
+    """
+    Download a Parquet object to a temporary file and load it with COPY.
+
+    Parquet needs random access to its footer and column chunks, so the
+    object is downloaded (with parallel ranged GETs) before it is read.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        key (str): The object key.
+        table_name (str): The name of the table to load data into.
+        chunk_size (int): The number of rows per record batch.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.parquet') as local_file:
+        with pipeline_metrics.stage('download', table_name) as record:
+            s3_client.download_fileobj(bucket, key, local_file)
+            local_file.flush()
+            record.bytes += local_file.tell()
+        return copy_parquet_to_postgres(conn, table_name, local_file.name, chunk_size)
+
+def prepare_dataframe(table_name, df):
+    """
+    Convert a freshly parsed CSV to the dtypes of its table.
+
+    The dtypes come from ``ddl/schema.sql`` (see ``schema_ddl.pandas_dtypes``):
+    enums are categories, IDs and quantities sized integers, money exact
+    decimals and dates ``datetime64``. Works on whole tables and on
+    ``read_csv`` chunks alike.
+
+    Args:
+        table_name (str): The name of the table the data belongs to.
+        df (pd.DataFrame): The parsed CSV data.
+
+    Returns:
+        pd.DataFrame: The DataFrame with converted columns.
+    """
+    with pipeline_metrics.stage('cast', table_name) as record:
+        record.rows += len(df)
+        return schema_ddl.cast_dataframe(df, table_name)
+
+def read_table_csv(table_name, csv_file, chunk_size=None):
+    """
+    Parse a table's CSV with the column dtypes from ``ddl/schema.sql``.
+
+    Integers, categories and text are parsed straight into their final dtype
+    (see ``schema_ddl.csv_dtypes``), so no column is inferred as float or
+    object first; ``prepare_dataframe`` then converts dates and decimals.
+    Parsing is timed as the table's ``parse`` stage; for a streamed object
+    it includes the ``download`` reads it triggers.
+
+    Args:
+        table_name (str): The name of the table the data belongs to.
+        csv_file: A path or a file-like object with a ``read(size)`` method.
+        chunk_size (int): Return an iterator of chunks of this many rows
+            instead of one DataFrame.
+
+    Returns:
+        pd.DataFrame or iterator: The parsed data, or its chunks.
+    """
+    dtype = schema_ddl.csv_dtypes(table_name)
+    if chunk_size:
+        reader = pd.read_csv(csv_file, dtype=dtype, chunksize=chunk_size)
+        chunks = pipeline_metrics.timed_chunks(((table_name, chunk) for chunk in reader), 'parse')
+        return (chunk for _, chunk in chunks)
+    with pipeline_metrics.stage('parse', table_name) as record:
+        df = pd.read_csv(csv_file, dtype=dtype)
+        record.rows += len(df)
+    return df
+
+def stream_csv_to_postgres(conn, table_name, csv_file, chunk_size=100000, load_method='copy'):
+    """
+    Load a CSV stream into PostgreSQL chunk by chunk.
+
+    ``pd.read_csv(chunksize=...)`` pulls the stream in blocks, so at most one
+    chunk of raw bytes, parsed rows and converted values is in memory at a
+    time, whatever the object size. Type fixes are applied to every chunk.
+    With COPY the whole table is committed once, after the last chunk.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The name of the table to load data into.
+        csv_file: A file-like object with a ``read(size)`` method, such as an
+            S3 ``StreamingBody``.
+        chunk_size (int): The number of rows parsed and loaded per chunk.
+        load_method (str): ``'copy'`` or ``'insert'``.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    rows_loaded = 0
+    for chunk in read_table_csv(table_name, csv_file, chunk_size):
+        chunk = prepare_dataframe(table_name, chunk)
+        if load_method == 'copy':
+            rows_loaded += copy_data_to_postgres(conn, table_name, chunk, commit=False)
+        else:
+            rows_loaded += load_data_to_postgres(conn, table_name, chunk)
+    with pipeline_metrics.stage('commit', table_name):
+        conn.commit()
+    return rows_loaded
+
+def checkpointed_csv_to_postgres(conn, table_name, csv_file, object_key, etag, start_row=0, batch_size=100000,
+                                 load_method='copy'):
+    """
+    Load a CSV stream in committed batches, resuming after ``start_row`` rows.
+
+    Each batch of ``batch_size`` rows is committed in the same transaction as
+    the table's row count in the checkpoint table (see ``save_checkpoint``).
+    So after a failure the table holds exactly the committed batches, and a
+    rerun passes their count as ``start_row``. Rows before ``start_row`` are
+    parsed and skipped, since compressed streams cannot be entered at a byte
+    offset.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The name of the table to load data into.
+        csv_file: A file-like object with a ``read(size)`` method.
+        object_key (str): The key of the object being loaded.
+        etag (str): The object's ETag, without quotes.
+        start_row (int): The number of rows already committed from this object.
+        batch_size (int): The number of rows per committed batch.
+        load_method (str): ``'copy'`` or ``'insert'``.
+
+    Returns:
+        int: The number of rows of the object in the table, ``start_row`` included.
+    """
+    position = 0
+    for chunk in read_table_csv(table_name, csv_file, batch_size):
+        if position + len(chunk) <= start_row:
+            position += len(chunk)
+            continue
+        if position < start_row:
+            chunk = chunk.iloc[start_row - position:]
+            position = start_row
+        chunk = prepare_dataframe(table_name, chunk)
+        if load_method == 'copy':
+            position += copy_data_to_postgres(conn, table_name, chunk, commit=False)
+        else:
+            position += load_data_to_postgres(conn, table_name, chunk, commit=False)
+        save_checkpoint(conn, table_name, object_key, etag, position)
+        with pipeline_metrics.stage('commit', table_name):
+            conn.commit()
+    return position
+
+def pipelined_csv_to_postgres(conn, s3_client, bucket, key, size, table_name, chunk_size=100000, depth=4,
+                              range_size=8 * 1024 * 1024, prefetch=2):
+    """
+    Load a CSV object with its download, parsing, conversion and COPY overlapped.
+
+    The stages run on their own threads, connected by queues of at most
+    ``depth`` items (see ``load_pipeline.run_pipeline``):
+
+    1. Download: ranged GETs of ``range_size`` bytes, ``prefetch`` at a time.
+    2. Parse: decompress the blocks and parse them into ``chunk_size`` row chunks.
+       The compression is taken from the key's suffix or, failing that, from
+       the object's ``Content-Encoding``.
+    3. Convert: apply ``prepare_dataframe`` and serialize each chunk for COPY.
+    4. COPY: copy each chunk on ``conn`` in the calling thread.
+
+    While PostgreSQL copies one chunk, the next one is converted and parsed
+    and the following bytes download, so the table loads at about the speed
+    of its slowest stage. The whole table is committed once, after the last
+    chunk.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        key (str): The key of a ``.csv``, ``.csv.gz`` or ``.csv.zst`` object.
+        size (int): The object size in bytes.
+        table_name (str): The name of the table to load data into.
+        chunk_size (int): The number of rows per chunk.
+        depth (int): The maximum number of items queued between two stages.
+        range_size (int): The bytes per ranged GET.
+        prefetch (int): The number of ranged GETs in flight.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    compression = compressed_io.compression_of(key)
+    if compression is None:
+        # No suffix: fall back to the Content-Encoding, as open_csv_object does
+        encoding = s3_client.head_object(Bucket=bucket, Key=key).get('ContentEncoding')
+        compression = compressed_io.compression_of(key, encoding)
+    blocks = load_pipeline.iter_object_ranges(s3_client, bucket, key, size, range_size, prefetch, table_name)
+
+    def parse(blocks):
+        stream = io.BufferedReader(load_pipeline.IterableReader(blocks))
+        return read_table_csv(table_name, compressed_io.open_reader(stream, compression), chunk_size)
+
+    def convert(chunks):
+        for chunk in chunks:
+            yield encode_copy_buffer(table_name, prepare_dataframe(table_name, chunk))
+
+    def copy(buffers):
+        rows_loaded = 0
+        with conn.cursor() as cursor:
+            for columns, rows, buffer in buffers:
+                with pipeline_metrics.stage('copy', table_name) as record:
+                    cursor.copy_expert(_copy_query(table_name, columns), buffer)
+                    record.rows += rows
+                rows_loaded += rows
+        with pipeline_metrics.stage('commit', table_name):
+            conn.commit()
+        return rows_loaded
+
+    try:
+        return load_pipeline.run_pipeline(blocks, [parse, convert], copy, depth, table_name)
+    except Exception:
+        conn.rollback()
+        raise
+
+def copy_stream_parallel(connection_pool, table_name, csv_file, streams=4, chunk_size=100000):
+    """
+    Load one large CSV stream over several parallel COPY streams.
+
+    The stream is parsed chunk by chunk in the calling thread and the chunks
+    are handed, through a bounded queue, to ``streams`` worker threads that
+    each COPY into their own pooled connection. Nothing is committed until the
+    whole stream has been copied; an error before that rolls every stream back.
+
+    The streams are then committed one after another, which is not atomic: if
+    a later commit fails, the rows of the streams committed before it stay in
+    the table. No watermark is recorded for the table in that case, so a rerun
+    with ``--incremental`` truncates and reloads it. (Committing all streams
+    atomically would need two-phase commit, which the stock PostgreSQL
+    container disables with ``max_prepared_transactions = 0``.)
+
+    Args:
+        connection_pool (psycopg2.pool.ThreadedConnectionPool): The connection pool.
+        table_name (str): The name of the table to load data into.
+        csv_file: A file-like object with a ``read(size)`` method.
+        streams (int): The number of parallel COPY streams.
+        chunk_size (int): The number of rows per chunk.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    chunk_queue = queue.Queue(maxsize=streams * 2)
+    stop = threading.Event()
+    connections = [connection_pool.getconn() for _ in range(streams)]
+
+    def copy_worker(conn):
+        rows_copied = 0
+        while not stop.is_set():
+            try:
+                chunk = chunk_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if chunk is None:
+                break
+            rows_copied += copy_data_to_postgres(conn, table_name, chunk, commit=False)
+        return rows_copied
+
+    def enqueue(item):
+        # Block while the queue is full, but fail fast if a COPY stream died
+        while True:
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+            try:
+                chunk_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=streams) as executor:
+            futures = [executor.submit(copy_worker, conn) for conn in connections]
+            try:
+                for chunk in read_table_csv(table_name, csv_file, chunk_size):
+                    enqueue(prepare_dataframe(table_name, chunk))
+                for _ in futures:
+                    enqueue(None)
+                rows_loaded = sum(future.result() for future in futures)
+            except Exception:
+                stop.set()
+                raise
+        with pipeline_metrics.stage('commit', table_name):
+            # Per-stream commits: a failure here leaves the earlier streams' rows committed
+            for conn in connections:
+                conn.commit()
+        return rows_loaded
+    except Exception:
+        for conn in connections:
+            conn.rollback()
+        raise
+    finally:
+        for conn in connections:
+            connection_pool.putconn(conn)
+
+def table_name_from_key(key):
+    """
+    Extract the table name from a ``<n>_<table>.csv[.gz|.zst]`` or ``<n>_<table>.parquet`` object key.
+
+    Args:
+        key (str): The object key.
+
+    Returns:
+        str: The table name, or None if the key does not follow the pattern.
+    """
+    match = re.match(r'^\d+_(\w+)\.(?:csv(?:\.gz|\.zst)?|parquet)$', key)
+    return match.group(1) if match else None
+
+def open_csv_object(s3_client, bucket, key):
+    """
+    Open a CSV object as a stream of decompressed bytes.
+
+    The compression is taken from the key's suffix or, failing that, from the
+    object's ``Content-Encoding``. Decompression happens as the body is read,
+    so the object is never held or stored uncompressed. Reads of the body are
+    timed as the table's ``download`` stage, counting compressed bytes.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        key (str): The object key.
+
+    Returns:
+        A readable binary stream of the CSV bytes.
+    """
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    compression = compressed_io.compression_of(key, response.get('ContentEncoding'))
+    body = pipeline_metrics.metered(response['Body'], 'download', table_name_from_key(key))
+    return compressed_io.open_reader(body, compression)
+
+def object_rank(key):
+    """
+    Rank a table object by its format, see ``OBJECT_PREFERENCE``.
+
+    Args:
+        key (str): The object key.
+
+    Returns:
+        int: The position of the key's suffix in ``OBJECT_PREFERENCE``.
+    """
+    return max(rank for rank, suffix in enumerate(OBJECT_PREFERENCE) if key.endswith(suffix))
+
+def list_table_objects(s3_client, bucket):
+    """
+    List the table files in a bucket.
+
+    When a table has several objects, a Parquet object is used first, then a
+    zstd, a gzip and finally a plain CSV one.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+
+    Returns:
+        dict: Table name to ``(object key, size in bytes, ETag)``, with the ETag unquoted.
+    """
+    objects = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            table_name = table_name_from_key(obj['Key'])
+            if table_name and (table_name not in objects or
+                               object_rank(obj['Key']) > object_rank(objects[table_name][0])):
+                objects[table_name] = (obj['Key'], obj['Size'], obj['ETag'].strip('"'))
+    return objects
+
+def load_bucket_parallel(s3_client, bucket, connection_pool, workers=4, streams_per_table=4,
+                         split_threshold=256 * 1024 * 1024, chunk_size=100000, tables_to_load=None,
+                         pipeline_options=None, checkpoints=None, load_method='copy'):
+    """
+    Load every table file in a bucket, running independent tables concurrently.
+
+    The foreign-key dependency graph is read from ``ddl/schema.sql``; a table
+    starts as soon as the tables it references are loaded. With COPY, objects
+    larger than ``split_threshold`` are loaded over ``streams_per_table``
+    parallel COPY streams; INSERT and raw loads use one stream per table.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        connection_pool (psycopg2.pool.ThreadedConnectionPool): Must hold at
+            least ``workers * streams_per_table`` connections.
+        workers (int): The maximum number of tables loaded at the same time.
+        streams_per_table (int): The number of COPY streams for large objects.
+        split_threshold (int): The object size in bytes above which a table is split.
+        chunk_size (int): The number of rows per chunk.
+        tables_to_load (list): Only load these tables, e.g. the output of
+            ``prepare_incremental_load``. Defaults to every table in the bucket.
+        pipeline_options (dict): Load the CSV objects that are not split with
+            ``pipelined_csv_to_postgres``, passing these keyword arguments
+            (``depth``, ``range_size``, ``prefetch``). None to stream them.
+        checkpoints (dict): Load every CSV object with
+            ``checkpointed_csv_to_postgres``, starting each table at its row
+            count in this dict (see ``prepare_checkpointed_load``). Such
+            tables are never split. None to load without checkpoints.
+        load_method (str): ``'copy'``, ``'insert'`` or ``'raw'`` (see
+            ``copy_csv_to_postgres``) for CSV objects. Parquet objects are
+            always loaded with COPY.
+
+    Returns:
+        dict: The per-table results of ``load_scheduler.run_dependency_schedule``.
+    """
+    objects = list_table_objects(s3_client, bucket)
+    tables = schema_ddl.parse_schema()
+    dependencies = schema_ddl.table_dependencies(tables)
+    load_order = [table_name for table_name in tables if table_name in objects]
+    if tables_to_load is not None:
+        load_order = [table_name for table_name in load_order if table_name in tables_to_load]
+
+    def load_table(table_name):
+        key, size, etag = objects[table_name]
+        print(f"Processing {key} for table {table_name}...")
+        started = time.perf_counter()
+        if key.endswith('.parquet'):
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                rows_loaded = copy_parquet_object_to_postgres(conn, s3_client, bucket, key, table_name,
+                                                              chunk_size)
+        elif checkpoints is not None:
+            body = open_csv_object(s3_client, bucket, key)
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                rows_loaded = checkpointed_csv_to_postgres(conn, table_name, body, key, etag,
+                                                           checkpoints.get(table_name, 0), chunk_size, load_method)
+        elif load_method == 'raw':
+            body = open_csv_object(s3_client, bucket, key)
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                rows_loaded = copy_csv_to_postgres(conn, table_name, body)
+        elif load_method == 'copy' and size > split_threshold and streams_per_table > 1:
+            body = open_csv_object(s3_client, bucket, key)
+            rows_loaded = copy_stream_parallel(connection_pool, table_name, body, streams_per_table, chunk_size)
+        elif pipeline_options is not None:
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                rows_loaded = pipelined_csv_to_postgres(conn, s3_client, bucket, key, size, table_name, chunk_size,
+                                                        **pipeline_options)
+        else:
+            body = open_csv_object(s3_client, bucket, key)
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                rows_loaded = stream_csv_to_postgres(conn, table_name, body, chunk_size, load_method)
+        with load_scheduler.pooled_connection(connection_pool) as conn:
+            record_watermark(conn, table_name, key, etag, rows_loaded)
+        elapsed = time.perf_counter() - started
+        print(f"Loaded {rows_loaded} rows into {table_name} table "
+              f"in {elapsed:.2f}s ({rows_loaded / max(elapsed, 1e-9):,.0f} rows/s).")
+        return rows_loaded
+
+    results = load_scheduler.run_dependency_schedule(load_order, dependencies, load_table, workers)
+    for table_name in load_order:
+        status, detail = results[table_name]
+        if status == 'error':
+            print(f"Error loading data into {table_name}: {detail}")
+        elif status == 'skipped':
+            print(f"Skipped {table_name} because {detail} did not load.")
+    return results
+
+def ensure_watermark_table(conn):
+    """
+    Create the control tables that record which object each table was loaded
+    from, and how far a checkpointed load of it has got.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} (
+                table_name TEXT PRIMARY KEY,
+                object_key TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                rows_loaded BIGINT NOT NULL,
+                loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """).format(sql.Identifier(WATERMARK_TABLE)))
+        cursor.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} (
+                table_name TEXT PRIMARY KEY,
+                object_key TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                rows_committed BIGINT NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """).format(sql.Identifier(CHECKPOINT_TABLE)))
+    conn.commit()
+
+def save_checkpoint(conn, table_name, object_key, etag, rows_committed):
+    """
+    Record how many rows of an object a table holds, without committing.
+
+    Call it in the transaction that loads the rows, so the checkpoint and the
+    rows are committed together.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The table being loaded.
+        object_key (str): The key of the object it is loaded from.
+        etag (str): The object's ETag, without quotes.
+        rows_committed (int): The number of rows of the object in the table.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (table_name, object_key, etag, rows_committed, updated_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE
+            SET object_key = EXCLUDED.object_key, etag = EXCLUDED.etag,
+                rows_committed = EXCLUDED.rows_committed, updated_at = EXCLUDED.updated_at
+        """).format(sql.Identifier(CHECKPOINT_TABLE)), (table_name, object_key, etag, rows_committed))
+
+def record_watermark(conn, table_name, object_key, etag, rows_loaded):
+    """
+    Record that a table now holds the content of an object.
+
+    The table's checkpoint, if any, is removed in the same transaction.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_name (str): The loaded table.
+        object_key (str): The key of the object it was loaded from.
+        etag (str): The object's ETag, without quotes.
+        rows_loaded (int): The number of rows loaded.
+    """
+    with pipeline_metrics.stage('watermark', table_name), conn.cursor() as cursor:
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (table_name, object_key, etag, rows_loaded, loaded_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE
+            SET object_key = EXCLUDED.object_key, etag = EXCLUDED.etag,
+                rows_loaded = EXCLUDED.rows_loaded, loaded_at = EXCLUDED.loaded_at
+        """).format(sql.Identifier(WATERMARK_TABLE)), (table_name, object_key, etag, rows_loaded))
+        cursor.execute(sql.SQL("DELETE FROM {} WHERE table_name = %s").format(sql.Identifier(CHECKPOINT_TABLE)),
+                       (table_name,))
+        conn.commit()
+
+def prepare_incremental_load(conn, objects):
+    """
+    Work out which tables must be reloaded and empty them.
+
+    A table is reloaded when its object's ETag differs from the one in the
+    watermark table. Every object is a full snapshot of its table, so changed
+    tables are truncated first. Tables that reference a changed table are
+    reloaded too, because their keys point into the old snapshot.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        objects (dict): The output of ``list_table_objects``.
+
+    Returns:
+        list: The tables to load, in schema order.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT table_name, etag FROM {}").format(sql.Identifier(WATERMARK_TABLE)))
+        watermarks = dict(cursor.fetchall())
+
+    tables = schema_ddl.parse_schema()
+    changed = {table_name for table_name, (_, _, etag) in objects.items() if watermarks.get(table_name) != etag}
+    changed = _with_dependents(changed, objects, schema_ddl.table_dependencies(tables))
+
+    to_load = [table_name for table_name in tables if table_name in changed]
+    for table_name in tables:
+        if table_name in objects and table_name not in changed:
+            print(f"Skipping {table_name}: {objects[table_name][0]} is already loaded.")
+    _reset_tables(conn, to_load)
+    return to_load
+
+def _with_dependents(table_names, objects, dependencies):
+    """
+    Add every table with an object that references one of ``table_names``, directly or not.
+
+    A table whose parent is reloaded must be reloaded too, because its keys
+    point into the parent's old rows.
+
+    Args:
+        table_names (set): The tables being reloaded.
+        objects (dict): The output of ``list_table_objects``.
+        dependencies (dict): The output of ``schema_ddl.table_dependencies``.
+
+    Returns:
+        set: ``table_names`` and their dependents.
+    """
+    table_names = set(table_names)
+    grown = True
+    while grown:
+        downstream = {table_name for table_name in objects
+                      if table_name not in table_names and dependencies.get(table_name, set()) & table_names}
+        table_names |= downstream
+        grown = bool(downstream)
+    return table_names
+
+def _reset_tables(conn, table_names):
+    """
+    Truncate tables and forget their watermarks and checkpoints, in one transaction.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_names (list): The tables to empty.
+    """
+    if not table_names:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("TRUNCATE {}").format(
+            sql.SQL(', ').join(sql.Identifier(table_name) for table_name in table_names)))
+        for control_table in [WATERMARK_TABLE, CHECKPOINT_TABLE]:
+            cursor.execute(sql.SQL("DELETE FROM {} WHERE table_name = ANY(%s)").format(
+                sql.Identifier(control_table)), (list(table_names),))
+    conn.commit()
+
+def prepare_checkpointed_load(conn, objects):
+    """
+    Work out where a checkpointed load of every table starts.
+
+    - A table whose watermark has its object's ETag is already loaded and is skipped.
+    - A table with a checkpoint for the same object and ETag resumes after
+      the checkpoint's committed rows.
+    - Every other table starts over: it is truncated, together with the
+      tables that reference it (see ``prepare_incremental_load``). This also
+      clears tables left half loaded by a load without checkpoints.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        objects (dict): The output of ``list_table_objects``.
+
+    Returns:
+        tuple: The tables to load in schema order, and a dict of table name to
+        the number of rows already committed for the resumed tables.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT table_name, etag FROM {}").format(sql.Identifier(WATERMARK_TABLE)))
+        watermarks = dict(cursor.fetchall())
+        cursor.execute(sql.SQL("SELECT table_name, object_key, etag, rows_committed FROM {}").format(
+            sql.Identifier(CHECKPOINT_TABLE)))
+        checkpoints = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    tables = schema_ddl.parse_schema()
+    loaded = {table_name for table_name, (_, _, etag) in objects.items() if watermarks.get(table_name) == etag}
+    resumable = {table_name for table_name, (key, _, etag) in objects.items()
+                 if table_name not in loaded and checkpoints.get(table_name, (None, None))[:2] == (key, etag)}
+    restart = {table_name for table_name in objects if table_name not in loaded | resumable}
+    restart = _with_dependents(restart, objects, schema_ddl.table_dependencies(tables))
+
+    to_load = [table_name for table_name in tables if table_name in objects and table_name not in loaded - restart]
+    offsets = {}
+    for table_name in to_load:
+        if table_name in restart:
+            continue
+        offsets[table_name] = checkpoints[table_name][2]
+        print(f"Resuming {table_name} after {offsets[table_name]:,} committed rows of {objects[table_name][0]}.")
+    for table_name in tables:
+        if table_name in loaded - restart:
+            print(f"Skipping {table_name}: {objects[table_name][0]} is already loaded.")
+    _reset_tables(conn, [table_name for table_name in to_load if table_name in restart])
+    return to_load, offsets
+
+def read_key_columns(s3_client, bucket, key, table_name, columns):
+    """
+    Read only the given columns of a table object.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        key (str): The object key.
+        table_name (str): The table the object belongs to.
+        columns (list): The column names to read.
+
+    Returns:
+        pd.DataFrame: The columns, with the dtypes of ``schema_ddl.csv_dtypes``.
+    """
+    if key.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+        return pq.read_table(io.BytesIO(body.read()), columns=columns).to_pandas()
+    dtypes = schema_ddl.csv_dtypes(table_name)
+    return pd.read_csv(open_csv_object(s3_client, bucket, key), usecols=columns,
+                       dtype={column: dtypes[column] for column in columns})
+
+def find_orphaned_keys(s3_client, bucket, objects, conn, tables_to_load):
+    """
+    Find the foreign-key values of the objects that have no parent row.
+
+    Only the key columns are read: the foreign keys of ``tables_to_load`` and
+    the keys they reference. The referenced keys come from the parent's
+    object, or from the database when the bucket has no object for the
+    parent. Each foreign key is then checked with a hash-based
+    ``Series.isin`` over the whole column. NULLs are allowed.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        objects (dict): The output of ``list_table_objects``.
+        conn (psycopg2.connection): The PostgreSQL connection.
+        tables_to_load (list): The tables about to be loaded.
+
+    Returns:
+        list: One dict per foreign key with orphans, with the ``table``,
+        ``column``, ``references`` (``'table.column'``), the ``orphans`` count
+        and up to five orphaned ``samples``.
+    """
+    tables = schema_ddl.parse_schema()
+    foreign_keys = [(table_name, column['name'], column['references'])
+                    for table_name in tables_to_load if table_name in tables
+                    for column in tables[table_name]['columns'] if column['references']]
+    needed = {}
+    for table_name, column, (ref_table, ref_column) in foreign_keys:
+        needed.setdefault(table_name, set()).add(column)
+        needed.setdefault(ref_table, set()).add(ref_column)
+
+    values = {}
+    for table_name, columns in needed.items():
+        with pipeline_metrics.stage('preflight', table_name) as record:
+            columns = sorted(columns)
+            if table_name in objects:
+                df = read_key_columns(s3_client, bucket, objects[table_name][0], table_name, columns)
+            else:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("SELECT {} FROM {}").format(
+                        sql.SQL(', ').join(map(sql.Identifier, columns)), sql.Identifier(table_name)))
+                    df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            record.rows += len(df)
+            values[table_name] = df
+
+    orphaned = []
+    for table_name, column, (ref_table, ref_column) in foreign_keys:
+        child = values[table_name][column].dropna()
+        orphans = child[~child.isin(values[ref_table][ref_column])]
+        if len(orphans):
+            orphaned.append({
+                'table': table_name,
+                'column': column,
+                'references': f"{ref_table}.{ref_column}",
+                'orphans': len(orphans),
+                'samples': orphans.drop_duplicates().head(5).tolist()
+            })
+    return orphaned
+
+def drop_key_constraints(conn, table_names):
+    """
+    Drop the primary key, unique and foreign key constraints of tables before a bulk load.
+
+    Foreign keys of other tables that reference one of ``table_names`` are
+    dropped as well, since the keys they depend on go away. Every drop runs in
+    a single transaction.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_names (list): The tables about to be loaded.
+
+    Returns:
+        int: The number of constraints dropped.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT conrelid::regclass::text, conname
+        FROM pg_constraint
+        WHERE contype IN ('p', 'u', 'f')
+          AND (conrelid = ANY(%s::regclass[])
+               OR (contype = 'f' AND confrelid = ANY(%s::regclass[])))
+        ORDER BY contype <> 'f'
+    """, (table_names, table_names))
+    constraints = cursor.fetchall()
+    with pipeline_metrics.stage('drop_constraints'):
+        for table_name, constraint_name in constraints:
+            cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(
+                sql.Identifier(table_name), sql.Identifier(constraint_name)))
+        conn.commit()
+    cursor.close()
+    return len(constraints)
+
+def rebuild_key_constraints(connection_pool, table_names, workers=4, schema='public'):
+    """
+    Add the missing key constraints of ``ddl/schema.sql`` after a bulk load.
+
+    The constraints are built in three phases:
+
+    1. Primary keys and unique constraints, one ``ALTER TABLE`` per table with
+       all of its indexes, with independent tables built in parallel.
+    2. Every foreign key, added as ``NOT VALID`` in one short transaction. This
+       only records the constraint and does not scan any table. Each key is
+       added under its own savepoint, so one failure does not undo the others.
+    3. ``VALIDATE CONSTRAINT`` for each foreign key, in parallel. Validation
+       takes a ``SHARE UPDATE EXCLUSIVE`` lock, so the checks do not block
+       each other or readers.
+
+    Args:
+        connection_pool (psycopg2.pool.ThreadedConnectionPool): The connection pool.
+        table_names (list): The tables whose constraints are rebuilt. Constraints
+            that already exist are left alone.
+        workers (int): The maximum number of constraints built at the same time.
+        schema (str): The schema whose existing constraints are left alone. The
+            tables themselves are found through the connections' ``search_path``.
+
+    Returns:
+        dict: Constraint name to ``None`` when it was built, or the exception raised.
+    """
+    tables = schema_ddl.parse_schema()
+    with load_scheduler.pooled_connection(connection_pool) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT conname FROM pg_constraint WHERE connamespace = %s::regnamespace", (schema,))
+            existing = {row[0] for row in cursor.fetchall()}
+    definitions = {
+        name: [d for d in schema_ddl.constraint_definitions(tables[name]) if d['name'] not in existing]
+        for name in table_names if name in tables
+    }
+    results = {}
+
+    def run(statement, stage, table_name):
+        with pipeline_metrics.stage(stage, table_name):
+            with load_scheduler.pooled_connection(connection_pool) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(statement)
+                conn.commit()
+
+    def run_parallel(statements, phase, stage):
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, statement, stage, table_name): names
+                       for table_name, names, statement in statements}
+            for future in concurrent.futures.as_completed(futures):
+                for name in futures[future]:
+                    results[name] = future.exception()
+                if future.exception() is not None:
+                    print(f"Error building {', '.join(futures[future])}: {future.exception()}")
+        print(f"{phase} for {len(statements)} tables in {time.perf_counter() - started:.2f}s.")
+
+    # Phase 1: primary keys and unique indexes, one statement per table
+    key_statements = []
+    for table_name, table_definitions in definitions.items():
+        keys = [d for d in table_definitions if d['kind'] != 'foreign_key']
+        if keys:
+            key_statements.append((
+                table_name,
+                [d['name'] for d in keys],
+                f"ALTER TABLE {table_name} " + ", ".join(f"ADD {d['sql']}" for d in keys)
+            ))
+    run_parallel(key_statements, "Built primary keys and unique constraints", 'build_keys')
+
+    # Phase 2: register every foreign key without checking existing rows
+    foreign_keys = [
+        (table_name, d)
+        for table_name, table_definitions in definitions.items()
+        for d in table_definitions
+        if d['kind'] == 'foreign_key' and results.get(f"{d['references']}_pkey") is None
+    ]
+    started = time.perf_counter()
+    with pipeline_metrics.stage('add_foreign_keys'):
+        with load_scheduler.pooled_connection(connection_pool) as conn:
+            with conn.cursor() as cursor:
+                for table_name, d in foreign_keys:
+                    cursor.execute("SAVEPOINT add_foreign_key")
+                    try:
+                        cursor.execute(f"ALTER TABLE {table_name} ADD {d['sql']} NOT VALID")
+                        cursor.execute("RELEASE SAVEPOINT add_foreign_key")
+                        results[d['name']] = None
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT add_foreign_key")
+                        results[d['name']] = e
+                        print(f"Error adding {d['name']}: {e}")
+            conn.commit()
+    foreign_keys = [(table_name, d) for table_name, d in foreign_keys if results[d['name']] is None]
+    print(f"Added {len(foreign_keys)} foreign keys as NOT VALID in {time.perf_counter() - started:.2f}s.")
+
+    # Phase 3: validate the foreign keys, one task per child table
+    validate_statements = []
+    for table_name in dict.fromkeys(table_name for table_name, _ in foreign_keys):
+        names = [d['name'] for child, d in foreign_keys if child == table_name]
+        validate_statements.append((
+            table_name,
+            names,
+            "; ".join(f"ALTER TABLE {table_name} VALIDATE CONSTRAINT {name}" for name in names)
+        ))
+    run_parallel(validate_statements, "Validated foreign keys", 'validate_foreign_keys')
+    return results
+
+def publish_staging_load(connection_pool, conn, table_names, failed_tables, workers=4):
+    """
+    Build the keys of a staging load and swap its tables in for the live ones.
+
+    Nothing is swapped when a table or one of its constraints failed; the
+    staging tables are dropped and the live tables keep serving the
+    previous load.
+
+    Args:
+        connection_pool (psycopg2.pool.ThreadedConnectionPool): A pool whose
+            connections use ``staging_load.STAGING_OPTIONS``.
+        conn (psycopg2.connection): The PostgreSQL connection used for the swap.
+        table_names (list): The tables loaded into staging, in dependency order.
+        failed_tables (set): The tables that did not load.
+        workers (int): The maximum number of constraints built at the same time.
+
+    Returns:
+        bool: True when the staging tables were swapped in.
+    """
+    if not failed_tables:
+        try:
+            results = rebuild_key_constraints(connection_pool, table_names, workers, staging_load.STAGING_SCHEMA)
+        except Exception:
+            staging_load.drop_staging_tables(conn)
+            raise
+        failed_tables = {name for name, error in results.items() if error is not None}
+    if failed_tables:
+        print(f"Not swapping the staging tables because {', '.join(sorted(failed_tables))} failed; "
+              f"the live tables are unchanged.")
+        staging_load.drop_staging_tables(conn)
+        return False
+    started = time.perf_counter()
+    staging_load.swap_staging_tables(conn, table_names, [WATERMARK_TABLE])
+    print(f"Swapped in {len(table_names)} staging tables in {time.perf_counter() - started:.2f}s.")
+    return True
+
+def ensure_schema_loaded(conn, defer_constraints=False):
     """
     Ensure the database schema is loaded.
     
     Args:
         conn (psycopg2.connection): The PostgreSQL connection.
+        defer_constraints (bool): Create the tables without primary, unique and
+            foreign keys; ``rebuild_key_constraints`` adds them after the load.
     """
     try:
         # Check if tables exist by querying information_schema
@@ -162,11 +1334,17 @@ def ensure_schema_loaded(conn):
         # If no tables exist, load the schema
         if table_count == 0:
             print("No tables found. Loading schema...")
-            with open('./ddl/schema.sql', encoding='utf-8') as f:
-                schema_sql = f.read()
-                cursor.execute(schema_sql)
+            if defer_constraints:
+                tables = schema_ddl.parse_schema()
+                cursor.execute("\n".join(schema_ddl.create_table_sql(table) for table in tables.values()))
                 conn.commit()
-                print("Schema loaded successfully.")
+                print("Schema loaded without key constraints.")
+            else:
+                with open('./ddl/schema.sql', encoding='utf-8') as f:
+                    schema_sql = f.read()
+                    cursor.execute(schema_sql)
+                    conn.commit()
+                    print("Schema loaded successfully.")
         else:
             print(f"Found {table_count} existing tables. Schema already loaded.")
         
@@ -179,6 +1357,64 @@ def main():
     """
     Main function to run the script.
     """
+    parser = argparse.ArgumentParser(description="Load synthetic data from MinIO into PostgreSQL.")
+    parser.add_argument('--load-method', choices=['copy', 'insert', 'raw'], default='copy',
+                        help="Bulk load with COPY FROM STDIN (default), row-by-row INSERTs, or raw COPY, which "
+                             "streams CSV objects into COPY unparsed and lets PostgreSQL convert the values. "
+                             "Parquet objects are always loaded with COPY.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Read each object in chunks and load them as they arrive, with bounded memory.")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="Rows parsed and loaded per chunk in streaming mode.")
+    parser.add_argument('--parallel', type=int, default=1,
+                        help="Load up to N independent tables at the same time, following the "
+                             "foreign-key graph in ddl/schema.sql (implies --stream).")
+    parser.add_argument('--streams-per-table', type=int, default=4,
+                        help="Parallel COPY streams for objects above --split-threshold-mb.")
+    parser.add_argument('--split-threshold-mb', type=int, default=256,
+                        help="Object size above which a table is split into parallel COPY streams.")
+    parser.add_argument('--defer-constraints', action='store_true',
+                        help="Drop primary, unique and foreign keys before loading and rebuild them "
+                             "in parallel afterwards, so rows are loaded without index or FK checks.")
+    parser.add_argument('--constraint-workers', type=int, default=4,
+                        help="Constraints built at the same time with --defer-constraints.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Skip tables whose object has not changed since it was last loaded, "
+                             "and truncate and reload the ones that have.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Download, parse, convert and COPY each CSV object on separate threads so the "
+                             "stages overlap (implies --stream, COPY only).")
+    parser.add_argument('--pipeline-depth', type=int, default=4,
+                        help="Items queued between two pipeline stages.")
+    parser.add_argument('--range-size-mb', type=int, default=8,
+                        help="Size of each ranged GET with --pipeline.")
+    parser.add_argument('--prefetch-ranges', type=int, default=2,
+                        help="Ranged GETs in flight per object with --pipeline.")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="Commit every --chunk-size rows together with the table's progress, and resume "
+                             "each table after its last committed batch on the next run (implies --stream).")
+    parser.add_argument('--preflight', action='store_true',
+                        help="Check every foreign key of the objects for values without a parent row "
+                             "before loading anything, and stop if there are any.")
+    parser.add_argument('--staging', action='store_true',
+                        help="Load into UNLOGGED copies of the tables, build their keys, then swap them in "
+                             "for the live tables in one transaction, so readers never see a partial load.")
+    pipeline_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    if args.staging and (args.checkpoint or args.incremental):
+        parser.error("--staging reloads whole tables and cannot be combined with --checkpoint or --incremental")
+    if args.pipeline and args.load_method != 'copy':
+        parser.error("--pipeline only supports --load-method copy")
+    if args.load_method == 'raw' and args.checkpoint:
+        parser.error("--checkpoint commits parsed batches and does not support --load-method raw")
+    if args.pipeline and args.checkpoint:
+        parser.error("--pipeline and --checkpoint cannot be combined")
+    pipeline_options = None
+    if args.pipeline:
+        pipeline_options = {'depth': args.pipeline_depth, 'range_size': args.range_size_mb * 1024 * 1024,
+                            'prefetch': args.prefetch_ranges}
+    pipeline_metrics.start('load', trace_memory=args.trace_memory)
+
     # MinIO Configuration
     MINIO_BUCKET = 'raw-data'
     MINIO_URL = 'http://localhost:9000'
@@ -199,7 +1435,8 @@ def main():
     pg_conn = connect_to_postgres(PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE)
     
     # Ensure schema is loaded
-    ensure_schema_loaded(pg_conn)
+    ensure_schema_loaded(pg_conn, args.defer_constraints)
+    ensure_watermark_table(pg_conn)
     
     try:
         # Check if bucket exists
@@ -213,6 +1450,60 @@ def main():
             print("Please run minio_load.py first to upload data to MinIO, then run this script again.")
             return
         
+        objects = list_table_objects(s3_client, MINIO_BUCKET)
+        loaded_tables = [table_name for table_name in schema_ddl.parse_schema() if table_name in objects]
+        checkpoints = None
+        if args.preflight:
+            # Check the keys before anything is truncated or loaded
+            orphaned = find_orphaned_keys(s3_client, MINIO_BUCKET, objects, pg_conn, loaded_tables)
+            for orphan in orphaned:
+                print(f"Pre-flight: {orphan['orphans']:,} rows of {orphan['table']}.{orphan['column']} have no "
+                      f"matching {orphan['references']}, e.g. {orphan['samples']}")
+            if orphaned:
+                print("Pre-flight check failed; nothing was loaded.")
+                return
+            print(f"Pre-flight check passed for {len(loaded_tables)} tables.")
+        if args.checkpoint:
+            loaded_tables, checkpoints = prepare_checkpointed_load(pg_conn, objects)
+        elif args.incremental:
+            loaded_tables = prepare_incremental_load(pg_conn, objects)
+        if (args.checkpoint or args.incremental) and not loaded_tables:
+            print("All tables are up to date.")
+            return
+
+        pool_options = SESSION_OPTIONS
+        if args.staging:
+            # Load into keyless UNLOGGED copies; the live tables stay untouched until the swap
+            staging_load.check_swappable(pg_conn, loaded_tables)
+            staging_load.create_staging_tables(pg_conn, loaded_tables, [WATERMARK_TABLE])
+            staging_load.use_staging(pg_conn)
+            pool_options = f"{SESSION_OPTIONS} {staging_load.STAGING_OPTIONS}"
+            print(f"Created {len(loaded_tables)} staging tables in schema {staging_load.STAGING_SCHEMA}.")
+        elif args.defer_constraints:
+            # Load into bare tables; keys are rebuilt once all rows are in
+            dropped = drop_key_constraints(pg_conn, loaded_tables)
+            print(f"Dropped {dropped} key constraints before loading.")
+
+        if args.parallel > 1:
+            # Load independent tables concurrently over a pool of connections
+            connection_pool = load_scheduler.create_connection_pool(
+                args.parallel * args.streams_per_table, PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE,
+                pool_options)
+            try:
+                results = load_bucket_parallel(s3_client, MINIO_BUCKET, connection_pool, args.parallel,
+                                               args.streams_per_table, args.split_threshold_mb * 1024 * 1024,
+                                               args.chunk_size, loaded_tables, pipeline_options, checkpoints,
+                                               args.load_method)
+                if args.staging:
+                    failed = {table_name for table_name, (status, _) in results.items() if status != 'ok'}
+                    publish_staging_load(connection_pool, pg_conn, loaded_tables, failed, args.constraint_workers)
+                elif args.defer_constraints:
+                    rebuild_key_constraints(connection_pool, list(schema_ddl.parse_schema()),
+                                            args.constraint_workers)
+            finally:
+                connection_pool.closeall()
+            return
+
         # Define the order of tables to load based on schema.sql dependencies
         table_order = [
             'bank_customer',
@@ -235,67 +1526,82 @@ def main():
         response = s3_client.list_objects_v2(Bucket=MINIO_BUCKET)
         
         if 'Contents' in response:
-            # Create a list to store files by table name
-
-            files_by_table = [
-                ("0_bank_customer.csv", "bank_customer"),
-                ("1_bank_account.csv", "bank_account"),
-                ("2_bank_transaction.csv", "bank_transaction"),
-                ("3_ecommerce_customer.csv", "ecommerce_customer"),
-                ("4_ecommerce_address.csv", "ecommerce_address"),
-                ("5_product_category.csv", "product_category"),
-                ("6_ecommerce_product.csv", "ecommerce_product"),
-                ("7_ecommerce_order.csv", "ecommerce_order"),
-                ("8_ecommerce_order_item.csv", "ecommerce_order_item"),
-                ("9_marketing_campaign.csv", "marketing_campaign")
-            ]
+            # Table files (CSV or Parquet) in schema order
+            files_by_table = [(objects[table_name][0], table_name) for table_name in loaded_tables]
+            dependencies = schema_ddl.table_dependencies(schema_ddl.parse_schema())
+            failed = set()
             # Second pass: process files in the correct order
             for filename, table_name in files_by_table:
 
+                if checkpoints is not None and dependencies.get(table_name, set()) & failed:
+                    # Its parent is incomplete; resume both on the next run
+                    print(f"Skipped {table_name} because {', '.join(sorted(dependencies[table_name] & failed))} "
+                          f"did not load.")
+                    failed.add(table_name)
+                    continue
+
                 print(f"Processing {filename} for table {table_name}...")
-                # Get the object from MinIO
-                obj_response = s3_client.get_object(Bucket=MINIO_BUCKET, Key=filename)
-
-                # Read the CSV data into a DataFrame
-                csv_content = obj_response['Body'].read()
-                df = pd.read_csv(io.BytesIO(csv_content))
-
-                # Handle data type conversions based on table name
-                if table_name in ['bank_customer', 'ecommerce_customer']:
-                    # Convert date columns
-                    if 'date_of_birth' in df.columns:
-                        df['date_of_birth'] = pd.to_datetime(df['date_of_birth'], errors='coerce').dt.date
-                    if 'created_at' in df.columns:
-                        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-
-                elif table_name in ['bank_account', 'ecommerce_order']:
-                    # Convert date columns
-                    if 'opened_at' in df.columns:
-                        df['opened_at'] = pd.to_datetime(df['opened_at'], errors='coerce')
-                    if 'closed_at' in df.columns:
-                        # Handle NaN values in closed_at
-                        df['closed_at'] = pd.to_datetime(df['closed_at'], errors='coerce')
-                    if 'order_date' in df.columns:
-                        df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-
-                elif table_name == 'bank_transaction':
-                    # Convert transaction_date
-                    if 'transaction_date' in df.columns:
-                        df['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
-
-                elif table_name == 'marketing_campaign':
-                    # Convert month to date
-                    if 'month' in df.columns:
-                        df['month'] = pd.to_datetime(df['month'], errors='coerce').dt.date
 
                 # Load the data into PostgreSQL
                 try:
-                    rows_inserted = load_data_to_postgres(pg_conn, table_name, df)
-                    print(f"Loaded {rows_inserted} rows into {table_name} table.")
+                    started = time.perf_counter()
+                    if filename.endswith('.parquet'):
+                        # Typed Arrow batches are copied as-is, without prepare_dataframe
+                        rows_inserted = copy_parquet_object_to_postgres(pg_conn, s3_client, MINIO_BUCKET, filename,
+                                                                        table_name, args.chunk_size)
+                    elif checkpoints is not None:
+                        # Commit in batches of --chunk-size rows, starting after the last committed batch
+                        rows_inserted = checkpointed_csv_to_postgres(pg_conn, table_name,
+                                                                     open_csv_object(s3_client, MINIO_BUCKET, filename),
+                                                                     filename, objects[table_name][2],
+                                                                     checkpoints.get(table_name, 0),
+                                                                     args.chunk_size, args.load_method)
+                    elif args.load_method == 'raw':
+                        # Stream the (decompressed) bytes into COPY; PostgreSQL parses the values
+                        rows_inserted = copy_csv_to_postgres(pg_conn, table_name,
+                                                             open_csv_object(s3_client, MINIO_BUCKET, filename))
+                    elif pipeline_options is not None:
+                        # Overlap the download, parsing, conversion and COPY of the object
+                        rows_inserted = pipelined_csv_to_postgres(pg_conn, s3_client, MINIO_BUCKET, filename,
+                                                                  objects[table_name][1], table_name,
+                                                                  args.chunk_size, **pipeline_options)
+                    elif args.stream:
+                        # Parse and load the object chunk by chunk as it is downloaded (and decompressed)
+                        rows_inserted = stream_csv_to_postgres(pg_conn, table_name,
+                                                               open_csv_object(s3_client, MINIO_BUCKET, filename),
+                                                               args.chunk_size, args.load_method)
+                    else:
+                        # Get the object from MinIO and read the CSV data into a DataFrame
+                        csv_content = open_csv_object(s3_client, MINIO_BUCKET, filename).read()
+                        df = prepare_dataframe(table_name, read_table_csv(table_name, io.BytesIO(csv_content)))
+                        if args.load_method == 'copy':
+                            rows_inserted = copy_data_to_postgres(pg_conn, table_name, df)
+                        else:
+                            rows_inserted = load_data_to_postgres(pg_conn, table_name, df)
+                    record_watermark(pg_conn, table_name, filename, objects[table_name][2], rows_inserted)
+                    elapsed = time.perf_counter() - started
+                    print(f"Loaded {rows_inserted} rows into {table_name} table "
+                          f"in {elapsed:.2f}s ({rows_inserted / max(elapsed, 1e-9):,.0f} rows/s).")
                 except Exception as e:
                     print(f"Error loading data into {table_name}: {e}")
+                    pg_conn.rollback()
+                    failed.add(table_name)
+                    if checkpoints is not None:
+                        print(f"The committed batches of {table_name} are kept; rerun with --checkpoint to resume.")
                     # Continue with next file instead of stopping the entire process
                     continue
+            if args.staging or args.defer_constraints:
+                connection_pool = load_scheduler.create_connection_pool(
+                    args.constraint_workers, PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE, pool_options)
+                try:
+                    if args.staging:
+                        publish_staging_load(connection_pool, pg_conn, loaded_tables, failed,
+                                             args.constraint_workers)
+                    else:
+                        rebuild_key_constraints(connection_pool, list(schema_ddl.parse_schema()),
+                                                args.constraint_workers)
+                finally:
+                    connection_pool.closeall()
         else:
             print(f"No objects found in the {MINIO_BUCKET} bucket.")
     
@@ -306,6 +1612,7 @@ def main():
         # Close the PostgreSQL connection
         if pg_conn:
             pg_conn.close()
+        pipeline_metrics.finish(args.metrics_json, args.metrics_prom)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Pipelined loading: run the stages of a table load on separate threads.
+
+A load reads an object, parses it, converts the rows and copies them into
+PostgreSQL. Run one after the other, the network is idle while a chunk is
+parsed and the CPU is idle while PostgreSQL writes it. ``run_pipeline`` gives
+each stage its own thread and connects them with bounded queues. The stages
+overlap, and a full queue blocks the stage that feeds it. A table then loads
+at about the speed of its slowest stage. boto3 network reads, zstd/gzip
+decompression, the pandas CSV parser and libpq release the GIL for most of
+their work, so threads are enough for the stages to run at the same time.
+
+Usage:
+    blocks = iter_object_ranges(s3_client, 'raw-data', key, size)
+    rows = run_pipeline(blocks, [parse_chunks, encode_chunks], copy_chunks, depth=4)
+"""
+
+import collections
+import concurrent.futures
+import io
+import queue
+import threading
+
+import pipeline_metrics
+
+# Marks the end of a queue's items
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when another stage has failed."""
+
+
+class IterableReader(io.RawIOBase):
+    """
+    A readable binary stream over an iterable of byte blocks.
+
+    Wrap it in ``io.BufferedReader`` (or any reader that calls ``read``) to
+    parse blocks as they arrive, e.g. from ``iter_object_ranges``.
+
+    Args:
+        blocks (iterable): The ``bytes`` blocks, in order.
+    """
+
+    def __init__(self, blocks):
+        super().__init__()
+        self._blocks = iter(blocks)
+        self._block = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._block:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._block = memoryview(block)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+
+def iter_object_ranges(s3_client, bucket, key, size, range_size=8 * 1024 * 1024, prefetch=2, table_name=None):
+    """
+    Read an object with ranged GETs, keeping ``prefetch`` requests in flight.
+
+    Each range is a separate ``GET`` with a ``Range`` header, so the next
+    ranges download while the current one is consumed. Blocks are yielded in
+    object order.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to MinIO.
+        bucket (str): The bucket name.
+        key (str): The object key.
+        size (int): The object size in bytes.
+        range_size (int): The bytes per range request.
+        prefetch (int): The number of range requests in flight.
+        table_name (str): The table the object belongs to, for the ``download`` metrics.
+
+    Yields:
+        bytes: The object's bytes, one range at a time.
+    """
+    def get_range(start):
+        with pipeline_metrics.stage('download', table_name) as record:
+            end = min(start + range_size, size) - 1
+            response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+            block = response['Body'].read()
+            record.bytes += len(block)
+        return block
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pending = collections.deque()
+        try:
+            for start in range(0, size, range_size):
+                pending.append(executor.submit(get_range, start))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def run_pipeline(source, stages, sink, depth=4, table_name=None):
+    """
+    Run a source, a chain of stages and a sink concurrently over bounded queues.
+
+    The source and every stage run on their own thread and the sink runs on
+    the calling thread, so it can use the caller's database connection. Each
+    stage is a function that takes an iterator of items and yields items; it
+    may yield more or fewer items than it takes. When any part fails, the
+    others stop at their next queue operation and the first error is raised.
+
+    Time spent waiting for an item is recorded as the ``queue_wait`` stage,
+    so it is not counted in the self time of the stage that waits. A stage
+    whose input is rarely waited for is the bottleneck.
+
+    Args:
+        source (iterable): The items fed to the first stage.
+        stages (list): The stage functions, in order.
+        sink (callable): Takes an iterator of the last stage's items and
+            returns the pipeline's result.
+        depth (int): The maximum number of items waiting between two stages.
+        table_name (str): The table being loaded, for the metrics.
+
+    Returns:
+        The sink's return value.
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+
+    def put(out_queue, item):
+        while not stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise PipelineStopped()
+
+    def get(in_queue):
+        with pipeline_metrics.stage('queue_wait', table_name):
+            while True:
+                try:
+                    return in_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        raise PipelineStopped()
+
+    def drain(in_queue):
+        while True:
+            item = get(in_queue)
+            if item is _DONE:
+                return
+            yield item
+
+    def run_stage(start, out_queue):
+        try:
+            # Stages are started here, so any work they do up front also runs on their thread
+            for item in start():
+                put(out_queue, item)
+            put(out_queue, _DONE)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=run_stage, args=(lambda: source, queues[0]), daemon=True)]
+    for stage, in_queue, out_queue in zip(stages, queues, queues[1:]):
+        start = lambda stage=stage, in_queue=in_queue: stage(drain(in_queue))
+        threads.append(threading.Thread(target=run_stage, args=(start, out_queue), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        result = sink(drain(queues[-1]))
+    except PipelineStopped:
+        result = None
+    except BaseException as e:
+        errors.insert(0, e)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return result
@@ -0,0 +1,129 @@
+"""
+Dependency-aware scheduling of table loads across a pool of connections.
+
+A table is started as soon as every table it references has finished, so
+independent chains (banking, e-commerce, marketing) load at the same time and
+the total load time is bounded by the longest dependency chain rather than by
+the sum of all tables.
+
+Usage:
+    pool = create_connection_pool(8, 'localhost', 5432, 'postgres', 'postgres', 'banking_db')
+    results = run_dependency_schedule(['bank_customer', 'bank_account'],
+                                      {'bank_account': {'bank_customer'}},
+                                      load_table, workers=4)
+"""
+
+import concurrent.futures
+import contextlib
+
+from psycopg2 import pool as pg_pool
+
+
+def create_connection_pool(max_connections, host, port, user, password, database, options=None):
+    """
+    Create a thread-safe pool of PostgreSQL connections.
+
+    Args:
+        max_connections (int): The maximum number of open connections.
+        host (str): The host of the PostgreSQL service.
+        port (int): The port of the PostgreSQL service.
+        user (str): The username for PostgreSQL.
+        password (str): The password for PostgreSQL.
+        database (str): The database name.
+        options (str): libpq command-line options for every connection, e.g.
+            ``'-c search_path=load_staging,public'``.
+
+    Returns:
+        psycopg2.pool.ThreadedConnectionPool: The connection pool.
+    """
+    return pg_pool.ThreadedConnectionPool(
+        1,
+        max_connections,
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database,
+        options=options
+    )
+
+
+@contextlib.contextmanager
+def pooled_connection(connection_pool):
+    """
+    Borrow a connection from the pool for the duration of a ``with`` block.
+
+    The connection is rolled back if the block raises, and always returned.
+
+    Args:
+        connection_pool (psycopg2.pool.ThreadedConnectionPool): The pool.
+
+    Yields:
+        psycopg2.connection: The borrowed connection.
+    """
+    conn = connection_pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        connection_pool.putconn(conn)
+
+
+def run_dependency_schedule(tables, dependencies, load_table, workers):
+    """
+    Run ``load_table`` for every table, starting each one once its parents are done.
+
+    Dependencies on tables that are not in ``tables`` are ignored. When a table
+    fails, every table that depends on it (directly or not) is skipped.
+
+    Args:
+        tables (list): The tables to load.
+        dependencies (dict): Table name to the set of table names it references.
+        load_table (callable): Called with a table name; its return value is
+            recorded as the table's result.
+        workers (int): The maximum number of tables loaded at the same time.
+
+    Returns:
+        dict: Table name to ``('ok', result)``, ``('error', exception)`` or
+              ``('skipped', failed_parent)``.
+    """
+    pending = {table: set(dependencies.get(table, ())) & set(tables) for table in tables}
+    results = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+
+        def submit_ready():
+            for table in [table for table, parents in pending.items() if not parents]:
+                del pending[table]
+                running[executor.submit(load_table, table)] = table
+
+        submit_ready()
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                table = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    results[table] = ('ok', future.result())
+                    for parents in pending.values():
+                        parents.discard(table)
+                    continue
+
+                results[table] = ('error', error)
+                # Skip everything downstream of the failed table
+                failed = [table]
+                while failed:
+                    parent = failed.pop()
+                    for child in [child for child, parents in pending.items() if parent in parents]:
+                        del pending[child]
+                        results[child] = ('skipped', table)
+                        failed.append(child)
+            submit_ready()
+
+    # Anything still pending waits on a cycle and can never start
+    for table in pending:
+        results[table] = ('skipped', 'circular dependency')
+    return results
@@ -1,8 +1,29 @@
+import argparse
+
 import psycopg2
 
+import schema_ddl
+
+# Schema profiles: name -> DDL file
+PROFILES = {
+    'default': './ddl/schema.sql',
+    'partitioned': './ddl/schema_partitioned.sql'
+}
+
 
 def main():
     """Main function to run the script."""
+    parser = argparse.ArgumentParser(description="Create the database schema from ddl/schema.sql.")
+    parser.add_argument('--without-constraints', action='store_true',
+                        help="Create the tables without primary, unique and foreign keys, for bulk "
+                             "loading with load_data_from_minio.py --defer-constraints.")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default',
+                        help="Schema profile: 'partitioned' partitions bank_transaction and ecommerce_order "
+                             "by month and adds indexes for the BI queries.")
+    args = parser.parse_args()
+    if args.without_constraints and args.profile != 'default':
+        parser.error("--without-constraints only applies to the default profile.")
+
     conn = psycopg2.connect(
         host="localhost",
         port=5432,
@@ -11,11 +32,15 @@ def main():
         database="banking_db"
     )
     with conn.cursor() as cursor:
-        cursor.execute(
-            open('./ddl/schema.sql', encoding='utf-8').read()
-        )
+        if args.without_constraints:
+            tables = schema_ddl.parse_schema()
+            cursor.execute("\n".join(schema_ddl.create_table_sql(table) for table in tables.values()))
+        else:
+            cursor.execute(
+                open(PROFILES[args.profile], encoding='utf-8').read()
+            )
         cursor.connection.commit()
-    print("Generated schema")
+    print(f"Generated schema ({args.profile} profile)")
     conn.close()
 
 
@@ -1,9 +1,193 @@
+import argparse
 import boto3
+import concurrent.futures
+import hashlib
+import json
 import os
+import time
+from boto3.s3.transfer import TransferConfig
+from s3transfer.utils import ChunksizeAdjuster
 
-def upload_to_minio(bucket_name, local_folder, minio_url, access_key, secret_key):
+import compressed_io
+import pipeline_metrics
+
+MB = 1024 * 1024
+# Object recording the size, mtime and ETag of every uploaded file
+MANIFEST_KEY = '_manifest.json'
+# Uploaded file types and their content types; CSVs may also be compressed (.csv.gz, .csv.zst)
+CONTENT_TYPES = {
+    '.csv': 'text/csv',
+    '.parquet': 'application/vnd.apache.parquet'
+}
+
+def upload_args(key):
+    """
+    Returns the object metadata of an uploaded file.
+
+    Compressed CSVs keep their ``text/csv`` content type and get the
+    ``Content-Encoding`` of their codec, so readers know how to decode them.
+
+    Args:
+        key (str): The object key, e.g. ``2_bank_transaction.csv.zst``.
+
+    Returns:
+        dict: The ``ExtraArgs`` of the upload, or None if the file is not a table file.
+    """
+    content_type = CONTENT_TYPES.get(os.path.splitext(compressed_io.strip_suffix(key))[1])
+    if content_type is None:
+        return None
+    extra_args = {'ContentType': content_type}
+    compression = compressed_io.compression_of(key)
+    if compression:
+        extra_args['ContentEncoding'] = compression
+    return extra_args
+
+def table_of(key):
+    """
+    Returns the table a generated file belongs to, used to label its metrics.
+
+    Args:
+        key (str): The file name or object key, e.g. ``2_bank_transaction.csv.zst``.
+
+    Returns:
+        str: The table name, e.g. ``bank_transaction``.
+    """
+    return os.path.splitext(compressed_io.strip_suffix(key))[0].partition('_')[2]
+
+def file_etag(local_path, transfer_config):
     """
-    Uploads files from a local folder to a Minio bucket.
+    Computes the ETag a file gets when uploaded with the given transfer settings.
+
+    Single-part uploads get the MD5 of the content. Multipart uploads get the
+    MD5 of the concatenated part MD5s followed by ``-<number of parts>``, so
+    the part size must match the one used for the upload.
+
+    Args:
+        local_path (str): The path of the file.
+        transfer_config (boto3.s3.transfer.TransferConfig): Multipart settings.
+
+    Returns:
+        str: The ETag, without quotes.
+    """
+    size = os.path.getsize(local_path)
+    if size < transfer_config.multipart_threshold:
+        digest = hashlib.md5()
+        with open(local_path, 'rb') as f:
+            for block in iter(lambda: f.read(MB), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    chunksize = ChunksizeAdjuster().adjust_chunksize(transfer_config.multipart_chunksize, size)
+    part_digests = []
+    with open(local_path, 'rb') as f:
+        for part in iter(lambda: f.read(chunksize), b''):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+def load_manifest(s3_client, bucket_name):
+    """
+    Reads the upload manifest from the bucket.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to Minio.
+        bucket_name (str): The name of the Minio bucket.
+
+    Returns:
+        dict: Object key to ``{'size', 'mtime_ns', 'etag'}``, empty if there is no manifest.
+    """
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket_name, Key=MANIFEST_KEY)['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        return {}
+
+def remote_objects(s3_client, bucket_name):
+    """
+    Lists the size and ETag of every object in the bucket.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to Minio.
+        bucket_name (str): The name of the Minio bucket.
+
+    Returns:
+        dict: Object key to ``(size, etag)``, with the ETag unquoted.
+    """
+    objects = {}
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name):
+        for obj in page.get('Contents', []):
+            objects[obj['Key']] = (obj['Size'], obj['ETag'].strip('"'))
+    return objects
+
+def is_unchanged(local_path, key, manifest, remote, transfer_config):
+    """
+    Checks whether a local file already matches its object in the bucket.
+
+    When the file's size and mtime match the manifest and the object still has
+    the ETag recorded there, the file is not read at all. Otherwise the file is
+    hashed and its expected ETag is compared with the object's.
+
+    Args:
+        local_path (str): The path of the file.
+        key (str): The object key.
+        manifest (dict): The output of ``load_manifest``.
+        remote (dict): The output of ``remote_objects``.
+        transfer_config (boto3.s3.transfer.TransferConfig): Multipart settings.
+
+    Returns:
+        bool: True if the upload can be skipped.
+    """
+    if key not in remote:
+        return False
+    stat = os.stat(local_path)
+    remote_size, remote_etag = remote[key]
+    if stat.st_size != remote_size:
+        return False
+    entry = manifest.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns \
+            and entry['etag'] == remote_etag:
+        return True
+    return file_etag(local_path, transfer_config) == remote_etag
+
+def upload_file(s3_client, bucket_name, local_path, key, transfer_config):
+    """
+    Uploads one file to a Minio bucket and measures its throughput.
+
+    Files above the transfer config's multipart threshold are sent as a
+    multipart upload whose parts are uploaded concurrently.
+
+    Args:
+        s3_client (boto3.client): The S3 client connected to Minio.
+        bucket_name (str): The name of the Minio bucket.
+        local_path (str): The path of the file to upload.
+        key (str): The object key.
+        transfer_config (boto3.s3.transfer.TransferConfig): Multipart settings.
+
+    Returns:
+        tuple: The number of bytes uploaded and the elapsed seconds.
+    """
+    size = os.path.getsize(local_path)
+    started = time.perf_counter()
+    with pipeline_metrics.stage('upload', table_of(key)) as record:
+        s3_client.upload_file(local_path, bucket_name, key, ExtraArgs=upload_args(key), Config=transfer_config)
+        record.bytes += size
+    elapsed = time.perf_counter() - started
+    print(f"Uploaded {key} to {bucket_name}: {size / MB:,.1f} MB in {elapsed:.2f}s "
+          f"({size / MB / max(elapsed, 1e-9):,.1f} MB/s)")
+    return size, elapsed
+
+def upload_to_minio(bucket_name, local_folder, minio_url, access_key, secret_key,
+                    file_workers=4, multipart_threshold_mb=64, multipart_chunksize_mb=64,
+                    max_concurrency=8, sync=False):
+    """
+    Uploads the CSV (plain or compressed) and Parquet files from a local folder to a Minio bucket.
+
+    Several files are uploaded at the same time, largest first, and large
+    files are split into multipart uploads with parts sent in parallel. All
+    uploads share one client whose connection pool is sized for
+    ``file_workers * max_concurrency`` concurrent requests.
+
+    After the upload a manifest object (``_manifest.json``) records the size,
+    mtime and ETag of every file. With ``sync`` only files whose content
+    differs from the bucket are uploaded.
 
     Args:
         bucket_name (str): The name of the Minio bucket.
@@ -11,6 +195,11 @@ def upload_to_minio(bucket_name, local_folder, minio_url, access_key, secret_key
         minio_url (str): The URL of the Minio service.
         access_key (str): The Minio access key.
         secret_key (str): The Minio secret key.
+        file_workers (int): The number of files uploaded at the same time.
+        multipart_threshold_mb (int): File size above which multipart upload is used.
+        multipart_chunksize_mb (int): The size of each multipart part.
+        max_concurrency (int): The number of parts uploaded at the same time per file.
+        sync (bool): Skip files that are already in the bucket with the same content.
     """
     s3_client = boto3.client(
         's3',
@@ -18,9 +207,16 @@ def upload_to_minio(bucket_name, local_folder, minio_url, access_key, secret_key
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
         aws_session_token=None,
-        config=boto3.session.Config(signature_version='s3v4'),
+        config=boto3.session.Config(signature_version='s3v4',
+                                    max_pool_connections=file_workers * max_concurrency),
         verify=False
     )
+    transfer_config = TransferConfig(
+        multipart_threshold=multipart_threshold_mb * MB,
+        multipart_chunksize=multipart_chunksize_mb * MB,
+        max_concurrency=max_concurrency,
+        use_threads=True
+    )
 
     # Create bucket if it doesn't exist
     try:
@@ -28,15 +224,68 @@ def upload_to_minio(bucket_name, local_folder, minio_url, access_key, secret_key
     except:
         s3_client.create_bucket(Bucket=bucket_name)
 
-    # Upload files
-    for filename in os.listdir(local_folder):
-        if filename.endswith('.csv'):
-            local_path = os.path.join(local_folder, filename)
-            s3_client.upload_file(local_path, bucket_name, filename)
-            print(f"Uploaded {filename} to {bucket_name}")
+    # Upload files, largest first so the big tables do not start last
+    filenames = [filename for filename in os.listdir(local_folder) if upload_args(filename)]
+    filenames.sort(key=lambda filename: os.path.getsize(os.path.join(local_folder, filename)), reverse=True)
+
+    manifest = load_manifest(s3_client, bucket_name)
+    if sync:
+        remote = remote_objects(s3_client, bucket_name)
+        unchanged = []
+        for filename in filenames:
+            with pipeline_metrics.stage('sync_check', table_of(filename)):
+                if is_unchanged(os.path.join(local_folder, filename), filename, manifest, remote, transfer_config):
+                    unchanged.append(filename)
+        for filename in unchanged:
+            stat = os.stat(os.path.join(local_folder, filename))
+            manifest[filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'etag': remote[filename][1]}
+            print(f"Skipped {filename}: unchanged in {bucket_name}")
+        filenames = [filename for filename in filenames if filename not in unchanged]
+
+    started = time.perf_counter()
+    total_bytes = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=file_workers) as executor:
+        futures = {
+            executor.submit(upload_file, s3_client, bucket_name,
+                            os.path.join(local_folder, filename), filename, transfer_config): filename
+            for filename in filenames
+        }
+        for future in concurrent.futures.as_completed(futures):
+            filename = futures[future]
+            try:
+                size, _ = future.result()
+                total_bytes += size
+            except Exception as e:
+                print(f"Error uploading {filename}: {e}")
+                continue
+            stat = os.stat(os.path.join(local_folder, filename))
+            with pipeline_metrics.stage('manifest', table_of(filename)):
+                etag = s3_client.head_object(Bucket=bucket_name, Key=filename)['ETag'].strip('"')
+            manifest[filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'etag': etag}
+    elapsed = time.perf_counter() - started
+    print(f"Uploaded {total_bytes / MB:,.1f} MB in {elapsed:.2f}s "
+          f"({total_bytes / MB / max(elapsed, 1e-9):,.1f} MB/s)")
+
+    with pipeline_metrics.stage('manifest'):
+        s3_client.put_object(Bucket=bucket_name, Key=MANIFEST_KEY,
+                             Body=json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'),
+                             ContentType='application/json')
 
 if __name__ == "__main__":
-    # ... (previous data generation code) ...
+    parser = argparse.ArgumentParser(description="Upload the generated data to Minio.")
+    parser.add_argument('--file-workers', type=int, default=4,
+                        help="Number of files uploaded at the same time.")
+    parser.add_argument('--multipart-threshold-mb', type=int, default=64,
+                        help="Files larger than this are sent as multipart uploads.")
+    parser.add_argument('--multipart-chunksize-mb', type=int, default=64,
+                        help="Size of each multipart part.")
+    parser.add_argument('--max-concurrency', type=int, default=8,
+                        help="Parts uploaded at the same time for each file.")
+    parser.add_argument('--sync', action='store_true',
+                        help="Only upload files whose content differs from the bucket.")
+    pipeline_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    pipeline_metrics.start('upload', trace_memory=args.trace_memory)
 
     # Minio Configuration
     MINIO_BUCKET = 'raw-data'
@@ -44,4 +293,7 @@ if __name__ == "__main__":
     MINIO_ACCESS_KEY = 'minioadmin'
     MINIO_SECRET_KEY = 'minioadmin'
 
-    upload_to_minio(MINIO_BUCKET, 'synthetic_data', MINIO_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
\ No newline at end of file
+    upload_to_minio(MINIO_BUCKET, 'synthetic_data', MINIO_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY,
+                    args.file_workers, args.multipart_threshold_mb, args.multipart_chunksize_mb,
+                    args.max_concurrency, args.sync)
+    pipeline_metrics.finish(args.metrics_json, args.metrics_prom)
@@ -0,0 +1,478 @@
+"""
+Stage timing and resource metrics for the data pipeline scripts.
+
+An entry point calls ``start()`` once; code anywhere in the pipeline then
+wraps its work in ``stage(name, table)`` blocks, which record:
+
+- wall time, and the self time that excludes nested stages on the same
+  thread (e.g. ``parse`` without the ``download`` reads it triggers);
+- CPU time of the thread running the stage;
+- rows and bytes, set on the yielded record;
+- the peak traced Python memory the stage allocated on top of what was
+  already allocated when it started, with ``trace_memory`` (tracemalloc
+  slows allocation-heavy code down, so it is opt-in). tracemalloc has one
+  process-wide counter: a stage's peak includes its nested stages and
+  anything other threads allocated while it ran.
+
+Records with the same stage and table are summed, so per-chunk stages add
+up to one line per table. ``finish()`` prints the stages by self time, the
+hottest first, and can write a JSON run report and a Prometheus text-format
+file (for node_exporter's textfile collector). Without ``start()`` every
+call is a no-op, so library code can be instrumented unconditionally.
+
+Usage:
+    pipeline_metrics.start('load', trace_memory=True)
+    with pipeline_metrics.stage('copy', 'bank_customer') as record:
+        record.rows += copy_rows()
+    pipeline_metrics.finish(json_path='run.json', prometheus_path='run.prom')
+"""
+
+import contextlib
+import datetime
+import json
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+_collector = None
+
+
+class StageRecord:
+    """
+    The totals of one stage of one table.
+
+    Attributes:
+        stage (str): The stage name.
+        table (str): The table name, or None for pipeline-wide stages.
+        calls (int): How many times the stage ran.
+        wall_s (float): Wall time including nested stages.
+        self_s (float): Wall time excluding nested stages on the same thread.
+        cpu_s (float): CPU time of the thread, including nested stages.
+        rows (int): Rows processed.
+        bytes (int): Bytes read or written.
+        peak_traced_bytes (int): Peak traced memory allocated by the stage, above
+            the traced memory at its start; the largest of its calls.
+    """
+
+    def __init__(self, stage, table):
+        self.stage = stage
+        self.table = table
+        self.calls = 0
+        self.wall_s = 0.0
+        self.self_s = 0.0
+        self.cpu_s = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_traced_bytes = 0
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: The record's fields, with times rounded to microseconds.
+        """
+        return {
+            'stage': self.stage,
+            'table': self.table,
+            'calls': self.calls,
+            'wall_s': round(self.wall_s, 6),
+            'self_s': round(self.self_s, 6),
+            'cpu_s': round(self.cpu_s, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'peak_traced_bytes': self.peak_traced_bytes
+        }
+
+
+class PipelineMetrics:
+    """
+    Collects the stage records of one pipeline run.
+
+    Stages may run concurrently on several threads; records are updated
+    under a lock.
+
+    Args:
+        pipeline (str): The pipeline name, e.g. ``'generate'``.
+        trace_memory (bool): Track peak Python memory per stage with tracemalloc.
+    """
+
+    def __init__(self, pipeline, trace_memory=False):
+        self.pipeline = pipeline
+        self.trace_memory = trace_memory
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._records = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Stages reset tracemalloc's peak, so the run's peak is kept here
+        self._traced_peak = 0
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _record(self, stage, table):
+        key = (stage, table)
+        if key not in self._records:
+            self._records[key] = StageRecord(stage, table)
+        return self._records[key]
+
+    def _collect_traced_peak(self, stack):
+        """
+        Fold tracemalloc's peak into the running stages, then reset it.
+
+        Each stage on ``stack`` keeps the highest traced memory seen since it
+        started in ``peak_traced_bytes`` while it runs. Resetting the peak
+        lets a stage that starts now measure only its own high point.
+
+        Args:
+            stack (list): The scratch records of this thread's running stages.
+
+        Returns:
+            int: The traced memory right now.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        for record in stack:
+            record.peak_traced_bytes = max(record.peak_traced_bytes, peak)
+        with self._lock:
+            self._traced_peak = max(self._traced_peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextlib.contextmanager
+    def stage(self, stage, table=None):
+        """
+        Time a block of work as one call of a stage.
+
+        Args:
+            stage (str): The stage name.
+            table (str): The table the work belongs to.
+
+        Yields:
+            StageRecord: A scratch record whose ``rows`` and ``bytes`` the
+            block may increase; they are added to the stage totals on exit.
+            The block may also set its ``table`` once it is known, or set
+            ``stage`` to None to discard the measurement.
+        """
+        scratch = StageRecord(stage, table)
+        stack = self._local.__dict__.setdefault('stack', [])
+        traced_start = self._collect_traced_peak(stack) if self.trace_memory else 0
+        stack.append(scratch)
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield scratch
+        finally:
+            wall_s = time.perf_counter() - started
+            cpu_s = time.thread_time() - cpu_started
+            if self.trace_memory:
+                self._collect_traced_peak(stack)
+            stack.pop()
+            if stack:
+                # The parent's self time excludes this stage
+                stack[-1].self_s -= wall_s
+            if scratch.stage is not None:
+                peak = max(scratch.peak_traced_bytes - traced_start, 0)
+                self.add(scratch.stage, scratch.table, wall_s=wall_s, self_s=wall_s + scratch.self_s, cpu_s=cpu_s,
+                         rows=scratch.rows, bytes=scratch.bytes, peak_traced_bytes=peak)
+
+    def add(self, stage, table=None, calls=1, wall_s=0.0, self_s=None, cpu_s=0.0, rows=0, bytes=0,
+            peak_traced_bytes=0):
+        """
+        Add a measurement taken elsewhere to a stage's totals.
+
+        Args:
+            stage (str): The stage name.
+            table (str): The table the work belongs to.
+            calls (int): How many runs of the stage the measurement covers.
+            wall_s (float): Wall time.
+            self_s (float): Self time, defaults to ``wall_s``.
+            cpu_s (float): CPU time.
+            rows (int): Rows processed.
+            bytes (int): Bytes read or written.
+            peak_traced_bytes (int): Peak traced memory.
+        """
+        with self._lock:
+            record = self._record(stage, table)
+            record.calls += calls
+            record.wall_s += wall_s
+            record.self_s += wall_s if self_s is None else self_s
+            record.cpu_s += cpu_s
+            record.rows += rows
+            record.bytes += bytes
+            record.peak_traced_bytes = max(record.peak_traced_bytes, peak_traced_bytes)
+
+    def report(self):
+        """
+        Build the run report.
+
+        ``peak_rss_bytes`` is the high-water mark of the process (and of its
+        finished child processes) since it started.
+
+        Returns:
+            dict: The pipeline totals and the stage records, hottest first.
+        """
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        rss_unit = 1 if sys.platform == 'darwin' else 1024
+        with self._lock:
+            records = sorted(self._records.values(), key=lambda record: record.self_s, reverse=True)
+            stages = [record.as_dict() for record in records]
+        return {
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.isoformat(),
+            'wall_s': round(time.perf_counter() - self._started, 6),
+            'cpu_s': round(time.process_time() - self._cpu_started, 6),
+            'child_cpu_s': round(children.ru_utime + children.ru_stime, 6),
+            'peak_rss_bytes': max(usage.ru_maxrss, children.ru_maxrss) * rss_unit,
+            'peak_traced_bytes': self._run_traced_peak() if self.trace_memory else None,
+            'stages': stages
+        }
+
+    def _run_traced_peak(self):
+        """
+        Returns:
+            int: The peak traced memory of the whole run.
+        """
+        with self._lock:
+            return max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+
+    def prometheus_text(self, report=None):
+        """
+        Render the run report in the Prometheus text exposition format.
+
+        Args:
+            report (dict): The output of ``report``, built if omitted.
+
+        Returns:
+            str: One gauge per stage field, labelled with pipeline, stage and table.
+        """
+        report = report or self.report()
+        lines = []
+        pipeline_label = f'pipeline="{report["pipeline"]}"'
+        for field, help_text in [('wall_s', 'Wall time of the run in seconds.'),
+                                 ('cpu_s', 'CPU time of the run in seconds.'),
+                                 ('peak_rss_bytes', 'Peak resident set size of the run in bytes.')]:
+            name = f"pipeline_run_{field.replace('_s', '_seconds') if field.endswith('_s') else field}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge",
+                      f"{name}{{{pipeline_label}}} {report[field]}"]
+        for field, name, help_text in [
+                ('calls', 'pipeline_stage_calls', 'Times the stage ran.'),
+                ('wall_s', 'pipeline_stage_wall_seconds', 'Wall time of the stage, including nested stages.'),
+                ('self_s', 'pipeline_stage_self_seconds', 'Wall time of the stage, excluding nested stages.'),
+                ('cpu_s', 'pipeline_stage_cpu_seconds', 'CPU time of the thread running the stage.'),
+                ('rows', 'pipeline_stage_rows', 'Rows processed by the stage.'),
+                ('bytes', 'pipeline_stage_bytes', 'Bytes read or written by the stage.'),
+                ('peak_traced_bytes', 'pipeline_stage_peak_traced_bytes', 'Peak traced memory allocated by the stage.')]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for record in report['stages']:
+                labels = f'{pipeline_label},stage="{record["stage"]}",table="{record["table"] or ""}"'
+                lines.append(f"{name}{{{labels}}} {record[field]}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self, report=None, limit=15):
+        """
+        Print the run totals and the stages with the most self time.
+
+        Args:
+            report (dict): The output of ``report``, built if omitted.
+            limit (int): The number of stages to print.
+        """
+        report = report or self.report()
+        print(f"{report['pipeline']} run: {report['wall_s']:.2f}s wall, {report['cpu_s']:.2f}s CPU "
+              f"(+{report['child_cpu_s']:.2f}s in child processes), "
+              f"peak RSS {report['peak_rss_bytes'] / 1024 ** 2:,.1f} MB")
+        print(f"  {'stage':<16} {'table':<22} {'calls':>6} {'self s':>8} {'wall s':>8} {'cpu s':>8} "
+              f"{'rows':>12} {'MB':>9}")
+        for record in report['stages'][:limit]:
+            print(f"  {record['stage']:<16} {record['table'] or '-':<22} {record['calls']:>6} "
+                  f"{record['self_s']:>8.2f} {record['wall_s']:>8.2f} {record['cpu_s']:>8.2f} "
+                  f"{record['rows']:>12,} {record['bytes'] / 1024 ** 2:>9,.1f}")
+
+
+class MeteredReader:
+    """
+    A file-like wrapper that times every ``read`` as a stage and counts its bytes.
+
+    Used around S3 response bodies so that the network transfer shows up as a
+    ``download`` stage nested in whichever stage consumes the stream.
+
+    Args:
+        fileobj: A binary file object with a ``read(size)`` method.
+        stage (str): The stage name of the reads.
+        table (str): The table the data belongs to.
+    """
+
+    def __init__(self, fileobj, stage, table=None):
+        self._fileobj = fileobj
+        self._stage = stage
+        self._table = table
+
+    def read(self, size=-1):
+        with stage(self._stage, self._table) as record:
+            data = self._fileobj.read(size)
+            record.bytes += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
+
+
+def add_arguments(parser):
+    """
+    Add the metrics options shared by the pipeline scripts to an argument parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The script's parser.
+    """
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="Write a JSON report of every stage's time, rows, bytes and memory.")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="Write the stage metrics in the Prometheus text format "
+                             "(e.g. for node_exporter's textfile collector).")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record the peak Python memory of every stage with tracemalloc (slower).")
+
+
+def start(pipeline, trace_memory=False):
+    """
+    Start collecting metrics for this process.
+
+    Args:
+        pipeline (str): The pipeline name used in the reports.
+        trace_memory (bool): Track peak Python memory per stage with tracemalloc.
+
+    Returns:
+        PipelineMetrics: The active collector.
+    """
+    global _collector
+    _collector = PipelineMetrics(pipeline, trace_memory)
+    return _collector
+
+
+def stage(name, table=None):
+    """
+    Time a block as a stage of the active collector; a no-op without one.
+
+    Args:
+        name (str): The stage name.
+        table (str): The table the work belongs to.
+
+    Returns:
+        A context manager yielding a ``StageRecord`` for rows and bytes.
+    """
+    if _collector is None:
+        return contextlib.nullcontext(StageRecord(name, table))
+    return _collector.stage(name, table)
+
+
+def add(name, table=None, **values):
+    """
+    Add a measurement to the active collector; a no-op without one.
+
+    Args:
+        name (str): The stage name.
+        table (str): The table the work belongs to.
+        **values: ``wall_s``, ``cpu_s``, ``rows``, ``bytes`` and so on, see ``PipelineMetrics.add``.
+    """
+    if _collector is not None:
+        _collector.add(name, table, **values)
+
+
+def timed_chunks(chunks, name='generate'):
+    """
+    Time how long each ``(table_name, DataFrame)`` chunk takes to produce.
+
+    Args:
+        chunks (iterable): ``(table_name, DataFrame)`` chunks, e.g. from a ``stream_*`` generator.
+        name (str): The stage name.
+
+    Yields:
+        tuple: The chunks unchanged, each timed as a stage of its table with its row count.
+    """
+    iterator = iter(chunks)
+    while True:
+        with stage(name) as record:
+            chunk = next(iterator, None)
+            if chunk is None:
+                record.stage = None
+            else:
+                record.table = chunk[0]
+                record.rows += len(chunk[1])
+        if chunk is None:
+            return
+        yield chunk
+
+
+def metered(fileobj, name='download', table=None):
+    """
+    Wrap a stream so its reads are timed as a stage; unchanged without a collector.
+
+    Args:
+        fileobj: A binary file object.
+        name (str): The stage name of the reads.
+        table (str): The table the data belongs to.
+
+    Returns:
+        The wrapped or the original stream.
+    """
+    return fileobj if _collector is None else MeteredReader(fileobj, name, table)
+
+
+def options():
+    """
+    Returns:
+        dict: The ``start`` arguments of the active collector, for starting one
+        in a worker process, or None without an active collector.
+    """
+    return None if _collector is None else {'pipeline': _collector.pipeline,
+                                            'trace_memory': _collector.trace_memory}
+
+
+def stage_records():
+    """
+    Returns:
+        list: The stage records of the active collector as dicts, e.g. to
+        return them from a worker process; empty without a collector.
+    """
+    return [] if _collector is None else _collector.report()['stages']
+
+
+def merge(records):
+    """
+    Add stage records collected in another process to the active collector.
+
+    Args:
+        records (list): Dicts from ``stage_records``.
+    """
+    for record in records:
+        add(record['stage'], record['table'], calls=record['calls'], wall_s=record['wall_s'],
+            self_s=record['self_s'], cpu_s=record['cpu_s'], rows=record['rows'], bytes=record['bytes'],
+            peak_traced_bytes=record['peak_traced_bytes'])
+
+
+def finish(json_path=None, prometheus_path=None):
+    """
+    Print the summary of the active collector and write its reports.
+
+    Args:
+        json_path (str): Write the JSON run report to this path.
+        prometheus_path (str): Write the Prometheus text-format metrics to this path.
+
+    Returns:
+        dict: The run report, or None without an active collector.
+    """
+    if _collector is None:
+        return None
+    report = _collector.report()
+    _collector.print_summary(report)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote the run report to {json_path}")
+    if prometheus_path:
+        with open(prometheus_path, 'w', encoding='utf-8') as f:
+            f.write(_collector.prometheus_text(report))
+        print(f"Wrote Prometheus metrics to {prometheus_path}")
+    return report
@@ -0,0 +1,285 @@
+"""
+Script to build and refresh the pre-aggregated rollups behind the bi_queries dashboards.
+
+The rollup tables, the dirty-month log and its triggers are defined in
+``ddl/rollups.sql``. Every load into a source table records the months it
+touched, and a refresh rebuilds only those months of the rollups fed by that
+table, so its cost depends on the new data rather than on the size of
+``bank_transaction``. The ``bi_queries/*_rollup.sql`` variants of the
+dashboard queries read these rollups instead of the fact tables.
+
+Usage:
+    1. Create the rollups and build them from the current data:
+       python preaggregate.py --init
+
+    2. After each load (and after etl_analytics.py), refresh the changed months:
+       python preaggregate.py
+
+    3. Rebuild every rollup from scratch:
+       python preaggregate.py --full
+"""
+
+import argparse
+import datetime
+import psycopg2
+import time
+
+ROLLUPS_PATH = './ddl/rollups.sql'
+# Marks a source table whose rollups must be rebuilt entirely (e.g. after TRUNCATE)
+ALL_MONTHS = datetime.date.min
+# libpq options for every connection: work in UTC, like the loader (load_data_from_minio.SESSION_OPTIONS),
+# whose session is where the dirty-month triggers compute their months
+SESSION_OPTIONS = '-c TimeZone=UTC'
+
+# Each rollup: its table, its date key column, the source tables that feed it,
+# and the aggregation of the rows dated in [start, end)
+ROLLUPS = [
+    {
+        'table': 'rollup_bank_daily',
+        'key_column': 'day',
+        'sources': ['bank_transaction'],
+        'query': """
+            SELECT transaction_date::date, type, COUNT(*), SUM(amount)
+            FROM bank_transaction
+            WHERE transaction_date >= %(start)s AND transaction_date < %(end)s
+            GROUP BY 1, 2
+        """
+    },
+    {
+        'table': 'rollup_bank_account_monthly',
+        'key_column': 'month',
+        'sources': ['bank_transaction'],
+        'query': """
+            SELECT date_trunc('month', transaction_date)::date, account_id, type, COUNT(*), SUM(amount)
+            FROM bank_transaction
+            WHERE transaction_date >= %(start)s AND transaction_date < %(end)s
+            GROUP BY 1, 2, 3
+        """
+    },
+    {
+        'table': 'rollup_order_daily',
+        'key_column': 'day',
+        'sources': ['ecommerce_order'],
+        'query': """
+            SELECT order_date::date, status, COUNT(*), SUM(total_amount)
+            FROM ecommerce_order
+            WHERE order_date >= %(start)s AND order_date < %(end)s
+            GROUP BY 1, 2
+        """
+    },
+    {
+        'table': 'rollup_product_monthly',
+        'key_column': 'month',
+        'sources': ['ecommerce_order', 'ecommerce_order_item'],
+        'query': """
+            SELECT date_trunc('month', o.order_date)::date, oi.product_id, SUM(oi.quantity), SUM(oi.line_total)
+            FROM ecommerce_order_item oi
+            JOIN ecommerce_order o ON o.order_id = oi.order_id
+            WHERE o.order_date >= %(start)s AND o.order_date < %(end)s
+            GROUP BY 1, 2
+        """
+    },
+    {
+        'table': 'rollup_channel_monthly',
+        'key_column': 'month',
+        'sources': ['marketing_campaign', 'analytics_fct_order'],
+        'query': """
+            WITH monthly_orders AS (
+                SELECT date_trunc('month', order_date)::date AS month, SUM(total_amount) AS revenue
+                FROM analytics_fct_order
+                WHERE order_date >= %(start)s AND order_date < %(end)s
+                GROUP BY 1
+            ),
+            channel_spend AS (
+                SELECT date_trunc('month', month)::date AS month, channel,
+                       COUNT(*) AS campaigns, SUM(spend_amount) AS spend
+                FROM marketing_campaign
+                WHERE month >= %(start)s AND month < %(end)s
+                GROUP BY 1, 2
+            )
+            SELECT c.month, c.channel, c.campaigns, c.spend,
+                   COALESCE(o.revenue, 0) * COALESCE(
+                       c.spend / NULLIF(SUM(c.spend) OVER (PARTITION BY c.month), 0),
+                       c.campaigns::numeric / SUM(c.campaigns) OVER (PARTITION BY c.month))
+            FROM channel_spend c
+            LEFT JOIN monthly_orders o ON o.month = c.month
+        """
+    },
+    {
+        'table': 'rollup_customer_monthly',
+        'key_column': 'month',
+        'sources': ['analytics_fct_banking', 'analytics_fct_order'],
+        'query': """
+            SELECT month, customer_key, SUM(deposit_count), SUM(deposit_amount),
+                   SUM(order_count), SUM(order_amount)
+            FROM (
+                SELECT date_trunc('month', transaction_date)::date AS month, customer_key,
+                       COUNT(*) AS deposit_count, SUM(amount) AS deposit_amount,
+                       0 AS order_count, NULL::numeric AS order_amount
+                FROM analytics_fct_banking
+                WHERE type = 'DEPOSIT' AND customer_key IS NOT NULL
+                  AND transaction_date >= %(start)s AND transaction_date < %(end)s
+                GROUP BY 1, 2
+                UNION ALL
+                SELECT date_trunc('month', order_date)::date, customer_key,
+                       0, NULL, COUNT(*), SUM(total_amount)
+                FROM analytics_fct_order
+                WHERE customer_key IS NOT NULL
+                  AND order_date >= %(start)s AND order_date < %(end)s
+                GROUP BY 1, 2
+            ) facts
+            GROUP BY 1, 2
+        """
+    }
+]
+
+def connect_to_postgres(host, port, user, password, database):
+    """
+    Connect to PostgreSQL.
+
+    The session uses ``SESSION_OPTIONS``, so month and day boundaries match
+    the dirty months recorded by the triggers during a load, whatever the server's ``TimeZone`` is.
+
+    Args:
+        host (str): The host of the PostgreSQL service.
+        port (int): The port of the PostgreSQL service.
+        user (str): The username for PostgreSQL.
+        password (str): The password for PostgreSQL.
+        database (str): The database name.
+
+    Returns:
+        psycopg2.connection: The PostgreSQL connection.
+    """
+    return psycopg2.connect(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database,
+        options=SESSION_OPTIONS
+    )
+
+def next_month(month):
+    """
+    Return the first day of the month after ``month``.
+
+    Args:
+        month (datetime.date): The first day of a month.
+
+    Returns:
+        datetime.date: The first day of the following month.
+    """
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+def refresh_rollup(cursor, rollup, months):
+    """
+    Rebuild the given months of one rollup.
+
+    The rollup rows of each month are deleted and re-aggregated from the
+    source rows dated in that month, using range predicates so the source
+    scan is limited to the month.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor in the refresh transaction.
+        rollup (dict): An entry of ``ROLLUPS``.
+        months (set): First days of the months to rebuild; containing
+            ``ALL_MONTHS`` rebuilds the whole rollup.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    if ALL_MONTHS in months:
+        ranges = [('-infinity', 'infinity')]
+        cursor.execute(f"TRUNCATE {rollup['table']}")
+    else:
+        ranges = [(month, next_month(month)) for month in sorted(months)]
+
+    rows_written = 0
+    for start, end in ranges:
+        if ALL_MONTHS not in months:
+            cursor.execute(
+                f"DELETE FROM {rollup['table']} "
+                f"WHERE {rollup['key_column']} >= %(start)s AND {rollup['key_column']} < %(end)s",
+                {'start': start, 'end': end})
+        cursor.execute(f"INSERT INTO {rollup['table']} {rollup['query']}", {'start': start, 'end': end})
+        rows_written += cursor.rowcount
+    return rows_written
+
+def refresh_rollups(conn, full=False):
+    """
+    Refresh every rollup whose source tables changed, in one transaction.
+
+    The dirty months are claimed with a ``DELETE ... RETURNING``, so months
+    marked by loads that commit while the refresh runs stay queued for the
+    next refresh.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        full (bool): Rebuild every rollup from scratch.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM rollup_dirty_month RETURNING source_table, month")
+            dirty = {}
+            for source_table, month in cursor.fetchall():
+                dirty.setdefault(source_table, set()).add(month)
+
+            for rollup in ROLLUPS:
+                months = {ALL_MONTHS} if full else set().union(
+                    *(dirty.get(source, set()) for source in rollup['sources']))
+                if not months:
+                    print(f"{rollup['table']} is up to date.")
+                    continue
+                started = time.perf_counter()
+                rows_written = refresh_rollup(cursor, rollup, months)
+                scope = 'all months' if ALL_MONTHS in months else f"{len(months)} months"
+                print(f"Refreshed {rollup['table']} for {scope}: {rows_written} rows "
+                      f"in {time.perf_counter() - started:.2f}s.")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def init_rollups(conn):
+    """
+    Create the rollup tables and triggers from ``ddl/rollups.sql``.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+    """
+    with conn.cursor() as cursor:
+        with open(ROLLUPS_PATH, encoding='utf-8') as f:
+            cursor.execute(f.read())
+    conn.commit()
+    print("Rollup tables and triggers created.")
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Build and refresh the pre-aggregated dashboard rollups.")
+    parser.add_argument('--init', action='store_true',
+                        help="Create the rollup tables and triggers, then build every rollup.")
+    parser.add_argument('--full', action='store_true',
+                        help="Rebuild every rollup instead of only the changed months.")
+    args = parser.parse_args()
+
+    # PostgreSQL Configuration
+    PG_HOST = 'localhost'
+    PG_PORT = 5432
+    PG_USER = 'postgres'
+    PG_PASSWORD = 'postgres'
+    PG_DATABASE = 'banking_db'
+
+    conn = connect_to_postgres(PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE)
+    try:
+        if args.init:
+            init_rollups(conn)
+        refresh_rollups(conn, full=args.full or args.init)
+    except Exception as e:
+        print(f"Error refreshing the rollups: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
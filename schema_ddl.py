@@ -0,0 +1,527 @@
+"""
+Parser for the table definitions in ddl/schema.sql.
+
+The loader scripts use this module to derive facts from the schema instead of
+hard-coding them, for example the foreign-key dependency graph that decides
+which tables can be loaded at the same time.
+
+Each table is returned as a dict::
+
+    {
+        'name': 'bank_account',
+        'columns': [
+            {'name': 'account_id', 'type': 'BIGINT', 'primary_key': True,
+             'unique': False, 'not_null': False, 'default': None,
+             'check': None, 'references': None},
+            {'name': 'customer_id', 'type': 'BIGINT', ...,
+             'references': ('bank_customer', 'customer_id')},
+            ...
+        ],
+        'constraints': [],   # table-level constraint clauses, verbatim
+    }
+"""
+
+import functools
+import re
+
+SCHEMA_PATH = './ddl/schema.sql'
+
+# Keywords that end a column's type and start its constraint clauses
+_CONSTRAINT_START = re.compile(
+    r'\b(PRIMARY\s+KEY|REFERENCES|UNIQUE|NOT\s+NULL|NULL|DEFAULT|CHECK|CONSTRAINT)\b', re.IGNORECASE)
+_TABLE_CONSTRAINT = re.compile(r'^(PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|CHECK|CONSTRAINT)\b', re.IGNORECASE)
+_CREATE_TABLE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\(', re.IGNORECASE)
+_REFERENCES = re.compile(r'REFERENCES\s+(\w+)\s*\(\s*(\w+)\s*\)', re.IGNORECASE)
+_DEFAULT = re.compile(r"DEFAULT\s+('(?:[^']|'')*'|[\w.]+(?:\(\))?)", re.IGNORECASE)
+
+
+def _strip_comments(text):
+    """
+    Remove ``/* ... */`` block comments and ``--`` line comments from SQL.
+
+    Args:
+        text (str): The SQL text.
+
+    Returns:
+        str: The SQL text without comments.
+    """
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
+    return re.sub(r'--[^\n]*', '', text)
+
+
+def _balanced_end(text, start):
+    """
+    Find the index of the parenthesis closing the one at ``start``.
+
+    Args:
+        text (str): The SQL text.
+        start (int): The index of an opening parenthesis.
+
+    Returns:
+        int: The index of the matching closing parenthesis.
+    """
+    depth = 0
+    in_quote = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if char == "'":
+            in_quote = not in_quote
+        elif not in_quote and char == '(':
+            depth += 1
+        elif not in_quote and char == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError(f"Unbalanced parentheses in: {text[start:start + 80]}...")
+
+
+def _split_top_level(text):
+    """
+    Split a comma-separated SQL list, ignoring commas inside parentheses or quotes.
+
+    Args:
+        text (str): The list body, e.g. the inside of ``CREATE TABLE x (...)``.
+
+    Returns:
+        list: The stripped, non-empty items.
+    """
+    items = []
+    depth = 0
+    in_quote = False
+    current = []
+    for char in text:
+        if char == "'":
+            in_quote = not in_quote
+        elif not in_quote and char == '(':
+            depth += 1
+        elif not in_quote and char == ')':
+            depth -= 1
+        elif not in_quote and depth == 0 and char == ',':
+            items.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    items.append(''.join(current).strip())
+    return [item for item in items if item]
+
+
+def _parse_column(definition):
+    """
+    Parse one column definition such as ``balance NUMERIC(18,2) DEFAULT 0.00``.
+
+    Args:
+        definition (str): The column definition.
+
+    Returns:
+        dict: The column description (see the module docstring).
+    """
+    name, rest = definition.split(None, 1)
+    match = _CONSTRAINT_START.search(rest)
+    column_type = rest[:match.start()] if match else rest
+    constraints = rest[match.start():] if match else ''
+
+    check = None
+    check_match = re.search(r'\bCHECK\s*\(', constraints, re.IGNORECASE)
+    if check_match:
+        open_paren = check_match.end() - 1
+        check = constraints[open_paren + 1:_balanced_end(constraints, open_paren)].strip()
+
+    references = _REFERENCES.search(constraints)
+    default = _DEFAULT.search(constraints)
+    return {
+        'name': name,
+        'type': ' '.join(column_type.split()),
+        'primary_key': bool(re.search(r'\bPRIMARY\s+KEY\b', constraints, re.IGNORECASE)),
+        'unique': bool(re.search(r'\bUNIQUE\b', constraints, re.IGNORECASE)),
+        'not_null': bool(re.search(r'\bNOT\s+NULL\b', constraints, re.IGNORECASE)),
+        'default': default.group(1) if default else None,
+        'check': check,
+        'references': (references.group(1), references.group(2)) if references else None
+    }
+
+
+def parse_schema(path=SCHEMA_PATH):
+    """
+    Parse every ``CREATE TABLE`` statement in a schema file.
+
+    Args:
+        path (str): The path of the schema file.
+
+    Returns:
+        dict: Table name to table description, in file order.
+    """
+    with open(path, encoding='utf-8') as f:
+        text = _strip_comments(f.read())
+
+    tables = {}
+    for match in _CREATE_TABLE.finditer(text):
+        open_paren = match.end() - 1
+        body = text[open_paren + 1:_balanced_end(text, open_paren)]
+        columns = []
+        constraints = []
+        for item in _split_top_level(body):
+            if _TABLE_CONSTRAINT.match(item):
+                constraints.append(' '.join(item.split()))
+            else:
+                columns.append(_parse_column(item))
+        tables[match.group(1)] = {'name': match.group(1), 'columns': columns, 'constraints': constraints}
+    return tables
+
+
+def table_dependencies(tables):
+    """
+    Build the foreign-key dependency graph of the schema.
+
+    Self-references (e.g. ``product_category.parent_category_id``) are left
+    out, since they do not constrain load order between tables.
+
+    Args:
+        tables (dict): The output of ``parse_schema``.
+
+    Returns:
+        dict: Table name to the set of table names it references.
+    """
+    dependencies = {}
+    for name, table in tables.items():
+        referenced = {column['references'][0] for column in table['columns'] if column['references']}
+        for constraint in table['constraints']:
+            referenced.update(ref_table for ref_table, _ in _REFERENCES.findall(constraint))
+        referenced.discard(name)
+        dependencies[name] = referenced
+    return dependencies
+
+
+def create_table_sql(table):
+    """
+    Render a ``CREATE TABLE`` statement without key constraints.
+
+    Column types, ``DEFAULT``, ``NOT NULL`` and ``CHECK`` clauses are kept
+    since they are cheap row-local checks; primary keys, ``UNIQUE`` and
+    ``REFERENCES`` are left out so that bulk loads do not pay for index
+    maintenance or foreign-key lookups. Add them afterwards with the
+    statements from ``constraint_definitions``.
+
+    Args:
+        table (dict): A table description from ``parse_schema``.
+
+    Returns:
+        str: The ``CREATE TABLE`` statement.
+    """
+    lines = []
+    for column in table['columns']:
+        line = f"{column['name']} {column['type']}"
+        if column['default'] is not None:
+            line += f" DEFAULT {column['default']}"
+        if column['not_null'] or column['primary_key']:
+            line += " NOT NULL"
+        if column['check']:
+            line += f" CHECK ({column['check']})"
+        lines.append(line)
+    lines.extend(table['constraints'])
+    return f"CREATE TABLE {table['name']} (\n    " + ",\n    ".join(lines) + "\n);"
+
+
+def constraint_definitions(table):
+    """
+    List the primary key, unique and foreign key constraints of a table.
+
+    Constraint names follow PostgreSQL's defaults (``<table>_pkey``,
+    ``<table>_<column>_key``, ``<table>_<column>_fkey``), so constraints added
+    after a bulk load look exactly like the ones ``schema.sql`` creates.
+
+    Args:
+        table (dict): A table description from ``parse_schema``.
+
+    Returns:
+        list: Dicts with ``name``, ``kind`` (``'primary_key'``, ``'unique'`` or
+              ``'foreign_key'``), ``references`` (the referenced table, or None)
+              and ``sql`` (the clause for ``ALTER TABLE ... ADD``).
+    """
+    definitions = []
+    primary_key = [column['name'] for column in table['columns'] if column['primary_key']]
+    if primary_key:
+        definitions.append({
+            'name': f"{table['name']}_pkey",
+            'kind': 'primary_key',
+            'references': None,
+            'sql': f"CONSTRAINT {table['name']}_pkey PRIMARY KEY ({', '.join(primary_key)})"
+        })
+    for column in table['columns']:
+        if column['unique']:
+            name = f"{table['name']}_{column['name']}_key"
+            definitions.append({
+                'name': name,
+                'kind': 'unique',
+                'references': None,
+                'sql': f"CONSTRAINT {name} UNIQUE ({column['name']})"
+            })
+    for column in table['columns']:
+        if column['references']:
+            ref_table, ref_column = column['references']
+            name = f"{table['name']}_{column['name']}_fkey"
+            definitions.append({
+                'name': name,
+                'kind': 'foreign_key',
+                'references': ref_table,
+                'sql': f"CONSTRAINT {name} FOREIGN KEY ({column['name']}) REFERENCES {ref_table} ({ref_column})"
+            })
+    return definitions
+
+
+def arrow_type(sql_type):
+    """
+    Map a column type from ``schema.sql`` to a pyarrow type.
+
+    ``NUMERIC(p,s)`` becomes ``decimal128(p, s)``, ``DATE`` becomes ``date32``
+    and ``TIMESTAMP WITH TIME ZONE`` becomes a UTC microsecond timestamp, so
+    values keep their exact SQL type in Parquet files. Text types map to
+    ``string``. The generator's timestamps are naive UTC, and the CSV loader
+    reads them in a UTC session (``load_data_from_minio.SESSION_OPTIONS``), so
+    both formats load the same instants.
+
+    Args:
+        sql_type (str): The column type, e.g. ``'NUMERIC(18,2)'``.
+
+    Returns:
+        pyarrow.DataType: The Arrow type.
+    """
+    import pyarrow as pa
+
+    upper = sql_type.upper()
+    decimal = re.match(r'(?:NUMERIC|DECIMAL)\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)', upper)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    if upper.startswith('TIMESTAMP'):
+        with_time_zone = 'WITH TIME ZONE' in upper or upper == 'TIMESTAMPTZ'
+        return pa.timestamp('us', tz='UTC' if with_time_zone else None)
+    base = upper.split('(')[0].strip()
+    return {
+        'BIGINT': pa.int64(),
+        'BIGSERIAL': pa.int64(),
+        'INT': pa.int32(),
+        'INTEGER': pa.int32(),
+        'SERIAL': pa.int32(),
+        'SMALLINT': pa.int16(),
+        'BOOLEAN': pa.bool_(),
+        'DATE': pa.date32(),
+        'REAL': pa.float32(),
+        'DOUBLE PRECISION': pa.float64(),
+        'NUMERIC': pa.float64(),
+        'DECIMAL': pa.float64(),
+    }.get(base, pa.string())
+
+
+def arrow_schema(table, columns=None):
+    """
+    Build the Arrow schema of a table.
+
+    Args:
+        table (dict): A table description from ``parse_schema``.
+        columns (list): Restrict the schema to these columns, in this order.
+            Defaults to every column of the table.
+
+    Returns:
+        pyarrow.Schema: The schema.
+    """
+    import pyarrow as pa
+
+    types = {column['name']: arrow_type(column['type']) for column in table['columns']}
+    names = columns if columns is not None else list(types)
+    return pa.schema([pa.field(name, types[name]) for name in names])
+
+
+# Free-text columns that hold a small set of values without a CHECK constraint
+CATEGORY_COLUMNS = {'currency', 'payment_method', 'channel', 'country', 'state', 'type', 'status'}
+
+_IN_LIST = re.compile(r"^\s*\w+\s+IN\s*\((.*)\)\s*$", re.IGNORECASE | re.DOTALL)
+
+
+def enum_values(column):
+    """
+    Return the values allowed by a ``CHECK (column IN (...))`` constraint.
+
+    Args:
+        column (dict): A column description from ``parse_schema``.
+
+    Returns:
+        list: The allowed values in declaration order, or None if the column
+              has no such constraint.
+    """
+    match = _IN_LIST.match(column['check'] or '')
+    if not match:
+        return None
+    return [value.replace("''", "'") for value in re.findall(r"'((?:[^']|'')*)'", match.group(1))]
+
+
+def pandas_dtype(column):
+    """
+    Map a column from ``schema.sql`` to the pandas dtype it is held in.
+
+    - ``CHECK (... IN (...))`` enums become a ``CategoricalDtype`` with the
+      allowed values, and the low-cardinality columns of ``CATEGORY_COLUMNS``
+      become ``category``, so each value is a small code instead of a string.
+    - ``SMALLINT``, ``INT`` and ``BIGINT`` become ``int16``, ``int32`` and
+      ``int64``; nullable columns use the matching nullable ``Int`` type
+      instead of being upcast to float.
+    - ``NUMERIC(p,s)`` becomes an exact Arrow ``decimal128(p, s)`` and text
+      an Arrow-backed string when pyarrow is installed; without it they stay
+      ``float64`` and ``str``.
+    - ``DATE`` and ``TIMESTAMP`` become ``datetime64`` with second and
+      microsecond resolution.
+
+    Args:
+        column (dict): A column description from ``parse_schema``.
+
+    Returns:
+        The pandas dtype, or a dtype name.
+    """
+    import pandas as pd
+
+    values = enum_values(column)
+    if values:
+        return pd.CategoricalDtype(values)
+    if column['name'] in CATEGORY_COLUMNS:
+        return 'category'
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+
+    upper = column['type'].upper()
+    nullable = not (column['not_null'] or column['primary_key'])
+    decimal = re.match(r'(?:NUMERIC|DECIMAL)\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)', upper)
+    if decimal:
+        if pa is None:
+            return 'float64'
+        return pd.ArrowDtype(pa.decimal128(int(decimal.group(1)), int(decimal.group(2))))
+    if upper.startswith('TIMESTAMP'):
+        return 'datetime64[us]'
+    base = upper.split('(')[0].strip()
+    if base == 'DATE':
+        return 'datetime64[s]'
+    integer = {'BIGINT': 'int64', 'BIGSERIAL': 'int64', 'INT': 'int32', 'INTEGER': 'int32',
+               'SERIAL': 'int32', 'SMALLINT': 'int16'}.get(base)
+    if integer:
+        return integer.capitalize() if nullable else integer
+    if base == 'BOOLEAN':
+        return 'boolean' if nullable else 'bool'
+    if base in ('REAL', 'DOUBLE PRECISION', 'NUMERIC', 'DECIMAL'):
+        return 'float32' if base == 'REAL' else 'float64'
+    return pd.StringDtype('pyarrow') if pa is not None else 'str'
+
+
+@functools.lru_cache(maxsize=None)
+def pandas_dtypes(table_name, path=SCHEMA_PATH):
+    """
+    Return the pandas dtype of every column of a table.
+
+    The schema is parsed once per process; callers must not modify the result.
+
+    Args:
+        table_name (str): The table name.
+        path (str): The path of the schema file.
+
+    Returns:
+        dict: Column name to pandas dtype, see ``pandas_dtype``.
+    """
+    table = parse_schema(path)[table_name]
+    return {column['name']: pandas_dtype(column) for column in table['columns']}
+
+
+def csv_dtypes(table_name, path=SCHEMA_PATH):
+    """
+    Return the ``read_csv`` dtypes of a table.
+
+    Integers, booleans, categories and text are parsed straight into their
+    final dtype, which also keeps values such as zero-padded postal codes as
+    text. Dates and decimals are read as text and converted exactly by
+    ``cast_dataframe``.
+
+    Args:
+        table_name (str): The table name.
+        path (str): The path of the schema file.
+
+    Returns:
+        dict: Column name to the dtype passed to ``pd.read_csv``.
+    """
+    return {name: 'str' if _is_datetime(dtype) or str(dtype).startswith('decimal') else dtype
+            for name, dtype in pandas_dtypes(table_name, path).items()}
+
+
+def _is_datetime(dtype):
+    """
+    Tell whether a dtype from ``pandas_dtype`` is a ``datetime64`` type.
+
+    Args:
+        dtype: A pandas dtype or dtype name.
+
+    Returns:
+        bool: True for ``datetime64`` dtypes.
+    """
+    return isinstance(dtype, str) and dtype.startswith('datetime64')
+
+
+def _cast_decimal(values, dtype):
+    """
+    Cast a Series to a decimal dtype, rounding to its scale the way PostgreSQL does.
+
+    A safe Arrow cast refuses values with more decimal places than the
+    scale, such as the unrounded ``37.019999999999996`` in older CSVs, while
+    PostgreSQL rounds them half away from zero. Text is parsed into a wide
+    decimal first so the rounding is exact.
+
+    Args:
+        values (pd.Series): Text, numbers or decimals.
+        dtype (pd.ArrowDtype): A ``decimal128`` dtype from ``pandas_dtype``.
+
+    Returns:
+        pd.Series: The rounded values with ``dtype``.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    target = dtype.pyarrow_dtype
+    array = pa.array(values, from_pandas=True)
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        array = array.cast(pa.decimal128(38, 38 - (target.precision - target.scale)))
+    array = pc.round(array, ndigits=target.scale, round_mode='half_towards_infinity').cast(target)
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=values.index, name=values.name)
+
+
+def cast_dataframe(df, table_name, path=SCHEMA_PATH):
+    """
+    Convert the columns of a DataFrame to the dtypes of its table.
+
+    Works on whole tables and on chunks alike; text columns and columns that
+    are not in the table are left as they are. Unparseable dates become ``NaT``,
+    timezone-aware timestamps are converted to naive UTC, and money values are
+    rounded to their column's scale.
+
+    Args:
+        df (pd.DataFrame): The table data.
+        table_name (str): The table the data belongs to.
+        path (str): The path of the schema file.
+
+    Returns:
+        pd.DataFrame: The DataFrame with converted columns.
+    """
+    import pandas as pd
+
+    dtypes = pandas_dtypes(table_name, path)
+    for name in df.columns:
+        dtype = dtypes.get(name)
+        # Text is left as parsed: astype(str) would turn missing values into 'nan' on pandas < 3
+        if dtype is None or dtype == 'str' or df[name].dtype == dtype:
+            continue
+        if _is_datetime(dtype):
+            values = pd.to_datetime(df[name], errors='coerce')
+            if values.dt.tz is not None:
+                values = values.dt.tz_convert(None)
+            df[name] = values.astype(dtype)
+        elif str(dtype).startswith('decimal'):
+            df[name] = _cast_decimal(df[name], dtype)
+        else:
+            df[name] = df[name].astype(dtype)
+    return df
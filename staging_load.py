@@ -0,0 +1,261 @@
+"""
+Staging loads: fill UNLOGGED shadow tables, then swap them in atomically.
+
+A direct reload writes into the tables the dashboards read, so queries see
+half-loaded data and every row goes through the WAL. A staging load instead:
+
+1. Creates an ``UNLOGGED`` copy of every reloaded table, without keys, in
+   the ``load_staging`` schema. Loader connections put that schema first on
+   their ``search_path``, so the usual load functions write into the copies.
+2. Loads the data, then builds the keys of the copies (see
+   ``load_data_from_minio.rebuild_key_constraints``).
+3. Rebuilds the other indexes of the live tables on the copies, analyzes
+   the copies and makes them ``LOGGED``.
+4. In one short transaction, moves the live tables into ``load_retired``
+   and the copies into ``public``. It then moves the triggers and privileges
+   of the live tables onto the new ones.
+
+Readers see either the old tables or the new ones, never a partial load.
+Rows and index entries are not WAL-logged one by one while they load.
+``SET LOGGED`` writes each finished table once. Under ``wal_level = minimal``
+it skips the WAL entirely.
+
+Usage:
+    check_swappable(conn, table_names)
+    create_staging_tables(conn, table_names, copy_tables=['load_watermark'])
+    ... load with connections using STAGING_OPTIONS ...
+    swap_staging_tables(conn, table_names, copy_tables=['load_watermark'])
+"""
+
+import re
+
+from psycopg2 import sql
+
+import pipeline_metrics
+import schema_ddl
+
+STAGING_SCHEMA = 'load_staging'
+RETIRED_SCHEMA = 'load_retired'
+# libpq options for loader connections, so unqualified table names resolve to the staging copies
+STAGING_OPTIONS = f"-c search_path={STAGING_SCHEMA},public"
+
+
+def check_swappable(conn, table_names):
+    """
+    Check that swapping the live tables would not break objects that depend on them.
+
+    Foreign keys and views refer to a table itself, not its name. After a
+    swap they would still point at the retired table, and would be dropped
+    with it. The copies are plain ``ddl/schema.sql`` tables, so partitioned
+    live tables (``load_schema.py --profile partitioned``) are refused too.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_names (list): The tables to reload.
+
+    Raises:
+        ValueError: If a table outside ``table_names`` has a foreign key to
+            one of them, a view reads one of them, or one of them is partitioned.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT relname FROM pg_class
+            WHERE oid = ANY(SELECT to_regclass('public.' || name) FROM unnest(%s::text[]) AS name)
+              AND relkind = 'p'
+        """, (table_names,))
+        problems = [f"{table} is partitioned" for table, in cursor.fetchall()]
+        cursor.execute("""
+            SELECT conrelid::regclass::text, confrelid::regclass::text
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND confrelid = ANY(SELECT to_regclass('public.' || name) FROM unnest(%s::text[]) AS name)
+              AND conrelid <> ALL(SELECT to_regclass('public.' || name) FROM unnest(%s::text[]) AS name)
+        """, (table_names, table_names))
+        problems += [f"{child} references {parent}" for child, parent in cursor.fetchall()]
+        cursor.execute("""
+            SELECT DISTINCT view.oid::regclass::text, dependency.refobjid::regclass::text
+            FROM pg_depend dependency
+            JOIN pg_rewrite rule ON rule.oid = dependency.objid
+            JOIN pg_class view ON view.oid = rule.ev_class
+            WHERE dependency.classid = 'pg_rewrite'::regclass
+              AND dependency.refobjid = ANY(SELECT to_regclass('public.' || name) FROM unnest(%s::text[]) AS name)
+              AND view.oid <> dependency.refobjid
+        """, (table_names,))
+        problems += [f"view {view} reads {table}" for view, table in cursor.fetchall()]
+    conn.rollback()
+    if problems:
+        raise ValueError(f"Cannot swap the reloaded tables: {'; '.join(problems)}. "
+                         f"Reload the dependent tables too or drop the dependent objects first, "
+                         f"and load partitioned tables without --staging.")
+
+
+def create_staging_tables(conn, table_names, copy_tables=()):
+    """
+    Create empty UNLOGGED copies of tables, without key constraints, in the staging schema.
+
+    Any staging schema left by an earlier, failed load is dropped first.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_names (list): The tables to reload, as defined in ``ddl/schema.sql``.
+        copy_tables (list): Control tables (e.g. the load watermarks) copied
+            with their rows, so they are updated in staging and swapped
+            together with the data.
+    """
+    tables = schema_ddl.parse_schema()
+    with pipeline_metrics.stage('staging_create'), conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE; CREATE SCHEMA {}").format(
+            sql.Identifier(STAGING_SCHEMA), sql.Identifier(STAGING_SCHEMA)))
+        cursor.execute(sql.SQL("SET LOCAL search_path TO {}").format(sql.Identifier(STAGING_SCHEMA)))
+        for table_name in table_names:
+            cursor.execute(schema_ddl.create_table_sql(tables[table_name]).replace(
+                'CREATE TABLE', 'CREATE UNLOGGED TABLE', 1))
+        for table_name in copy_tables:
+            cursor.execute(sql.SQL("CREATE TABLE {staging}.{table} (LIKE public.{table} INCLUDING ALL); "
+                                   "INSERT INTO {staging}.{table} SELECT * FROM public.{table}").format(
+                staging=sql.Identifier(STAGING_SCHEMA), table=sql.Identifier(table_name)))
+    conn.commit()
+
+
+def use_staging(conn):
+    """
+    Point a connection's unqualified table names at the staging copies.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SET search_path TO {}, public").format(sql.Identifier(STAGING_SCHEMA)))
+    conn.commit()
+
+
+def drop_staging_tables(conn):
+    """
+    Drop the staging schema and everything in it, e.g. after a failed load.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+    """
+    conn.rollback()
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(STAGING_SCHEMA)))
+    conn.commit()
+
+
+def _secondary_indexes(cursor, table_name):
+    """
+    Render the indexes of a live table that do not back a constraint, for its staging copy.
+
+    These are the BRIN, covering and partial indexes of the schema profiles
+    and any index added by hand. Key indexes are rebuilt from
+    ``ddl/schema.sql`` instead.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor on the database.
+        table_name (str): The table name in ``public``.
+
+    Returns:
+        list: ``CREATE INDEX`` statements on the staging copy.
+    """
+    cursor.execute("""
+        SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i
+        WHERE i.indrelid = to_regclass('public.' || %s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                          WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid AND c.contype IN ('p', 'u', 'x'))
+        ORDER BY i.indexrelid
+    """, (table_name,))
+    live = re.compile(r' ON (ONLY )?public\.' + re.escape(table_name) + r' USING ')
+    return [live.sub(f' ON {STAGING_SCHEMA}.{table_name} USING ', row[0], count=1) for row in cursor.fetchall()]
+
+
+def _table_grants(cursor, table_name):
+    """
+    Render the privileges granted on a live table as ``GRANT`` statements.
+
+    Args:
+        cursor (psycopg2.cursor): A cursor of the swap transaction.
+        table_name (str): The table name in ``public``.
+
+    Returns:
+        list: The ``GRANT`` statements, without the owner's own privileges.
+    """
+    cursor.execute("""
+        SELECT format('GRANT %%s ON public.%%I TO %%s', acl.privilege_type, c.relname,
+                      CASE WHEN acl.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(acl.grantee::regrole::text) END)
+        FROM pg_class c, aclexplode(c.relacl) acl
+        WHERE c.oid = to_regclass('public.' || %s) AND acl.grantee <> c.relowner
+    """, (table_name,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def swap_staging_tables(conn, table_names, copy_tables=(), lock_timeout='30s'):
+    """
+    Make the staging copies logged and swap them in for the live tables.
+
+    The indexes of the live tables that do not back a constraint are built
+    on the copies first, keeping their names. The copies are then analyzed
+    and set ``LOGGED``, parents before children, since a logged table cannot
+    reference an unlogged one. The swap then runs in one transaction:
+
+    1. Each live table is moved to ``load_retired`` and its copy to ``public``.
+       Constraint and index names are kept, since each schema has its own.
+    2. The retired tables are truncated. Their ``AFTER TRUNCATE`` triggers
+       fire, so the rollups see their rows as removed (see ``ddl/rollups.sql``).
+    3. The triggers and privileges of the live tables are recreated on the
+       new ones.
+
+    The retired tables are dropped after the commit.
+
+    Args:
+        conn (psycopg2.connection): The PostgreSQL connection.
+        table_names (list): The reloaded tables, in dependency order.
+        copy_tables (list): The control tables copied by ``create_staging_tables``.
+        lock_timeout (str): How long the swap waits for readers of the live tables.
+    """
+    conn.rollback()
+    with conn.cursor() as cursor:
+        for table_name in table_names:
+            staged = sql.SQL('.').join([sql.Identifier(STAGING_SCHEMA), sql.Identifier(table_name)])
+            with pipeline_metrics.stage('build_indexes', table_name):
+                for statement in _secondary_indexes(cursor, table_name):
+                    cursor.execute(statement)
+                conn.commit()
+            with pipeline_metrics.stage('analyze', table_name):
+                cursor.execute(sql.SQL("ANALYZE {}").format(staged))
+                conn.commit()
+            with pipeline_metrics.stage('set_logged', table_name):
+                cursor.execute(sql.SQL("ALTER TABLE {} SET LOGGED").format(staged))
+                conn.commit()
+
+    with pipeline_metrics.stage('swap'), conn.cursor() as cursor:
+        cursor.execute("SET LOCAL search_path TO public")
+        cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+        cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE; CREATE SCHEMA {}").format(
+            sql.Identifier(RETIRED_SCHEMA), sql.Identifier(RETIRED_SCHEMA)))
+        retired = []
+        recreate = []
+        for table_name in list(table_names) + list(copy_tables):
+            cursor.execute("SELECT to_regclass(%s)", (f"public.{table_name}",))
+            if cursor.fetchone()[0] is not None:
+                cursor.execute("""
+                    SELECT pg_get_triggerdef(oid) FROM pg_trigger
+                    WHERE tgrelid = to_regclass(%s) AND NOT tgisinternal
+                """, (f"public.{table_name}",))
+                recreate += [row[0] for row in cursor.fetchall()] + _table_grants(cursor, table_name)
+                cursor.execute(sql.SQL("ALTER TABLE public.{} SET SCHEMA {}").format(
+                    sql.Identifier(table_name), sql.Identifier(RETIRED_SCHEMA)))
+                retired.append(table_name)
+            cursor.execute(sql.SQL("ALTER TABLE {}.{} SET SCHEMA public").format(
+                sql.Identifier(STAGING_SCHEMA), sql.Identifier(table_name)))
+        if retired:
+            cursor.execute(sql.SQL("TRUNCATE {}").format(sql.SQL(', ').join(
+                sql.SQL('.').join([sql.Identifier(RETIRED_SCHEMA), sql.Identifier(table_name)])
+                for table_name in retired)))
+        for statement in recreate:
+            cursor.execute(statement)
+    conn.commit()
+
+    with pipeline_metrics.stage('drop_retired'), conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP SCHEMA {} CASCADE; DROP SCHEMA {} CASCADE").format(
+            sql.Identifier(RETIRED_SCHEMA), sql.Identifier(STAGING_SCHEMA)))
+    conn.commit()
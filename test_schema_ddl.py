@@ -0,0 +1,41 @@
+"""
+Tests for the schema-derived dtypes in schema_ddl.py.
+
+Run with:
+    python -m pytest -q test_schema_ddl.py
+"""
+
+import decimal
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import schema_ddl
+
+pytest.importorskip('pyarrow')
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ddl', 'schema.sql')
+
+
+def test_cast_dataframe_rounds_money_to_column_scale():
+    # line_total was written unrounded by older versions of the generator
+    csv = (b"order_item_id,order_id,product_id,quantity,unit_price,line_total\n"
+           b"1,2,3,3,12.34,37.019999999999996\n"
+           b"2,2,3,1,0.285,-0.285\n"
+           b"3,2,3,1,5,\n")
+    df = pd.read_csv(io.BytesIO(csv), dtype=schema_ddl.csv_dtypes('ecommerce_order_item', SCHEMA_PATH))
+    df = schema_ddl.cast_dataframe(df, 'ecommerce_order_item', SCHEMA_PATH)
+
+    assert str(df['line_total'].dtype) == 'decimal128(12, 2)[pyarrow]'
+    assert df['line_total'].tolist()[:2] == [decimal.Decimal('37.02'), decimal.Decimal('-0.29')]
+    assert pd.isna(df['line_total'].iloc[2])
+    assert df['unit_price'].tolist() == [decimal.Decimal('12.34'), decimal.Decimal('0.29'), decimal.Decimal('5.00')]
+
+
+def test_cast_dataframe_rounds_float_money():
+    df = pd.DataFrame({'order_item_id': [1], 'line_total': [37.019999999999996]})
+    df = schema_ddl.cast_dataframe(df, 'ecommerce_order_item', SCHEMA_PATH)
+
+    assert df['line_total'].tolist() == [decimal.Decimal('37.02')]
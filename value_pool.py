@@ -0,0 +1,166 @@
+"""
+Seeded pools of Faker values for the vectorized data generators.
+
+Calling Faker once per row costs tens of microseconds per value and dominates
+generation time at scale. A ``ValuePool`` calls each Faker provider a bounded
+number of times, keeps the values as a NumPy array and fills a column by
+drawing random indices into it, so the Faker cost is O(pool size) instead of
+O(rows). Pools are built from their own seed and cached on disk, so later runs
+only read them back.
+
+Values that must be unique (emails) are made unique by appending the row's
+primary key to a pooled value.
+
+Usage:
+    pool = ValuePool(sizes={'sentence': 50000})
+    descriptions = pool.sample(rng, 'sentence', 100000)
+    emails = pool.unique_emails(rng, customer_ids)
+"""
+
+import json
+import os
+
+import faker
+import numpy as np
+
+# Values generated per provider; small closed sets (states, countries) repeat within their pool
+DEFAULT_POOL_SIZES = {
+    'first_name': 5000,
+    'last_name': 5000,
+    'email': 20000,
+    'phone_number': 20000,
+    'street_address': 20000,
+    'secondary_address': 2000,
+    'city': 5000,
+    'state': 500,
+    'postal_code': 20000,
+    'country': 1000,
+    'sentence': 20000,
+    'text': 5000,
+    'bs': 5000
+}
+
+# How each pooled value is produced; commas are removed from address parts as in the row generators
+PROVIDERS = {
+    'first_name': lambda fake: fake.first_name(),
+    'last_name': lambda fake: fake.last_name(),
+    'email': lambda fake: fake.email(),
+    'phone_number': lambda fake: fake.phone_number(),
+    'street_address': lambda fake: fake.street_address().replace(',', ' '),
+    'secondary_address': lambda fake: fake.secondary_address().replace(',', ' '),
+    'city': lambda fake: fake.city(),
+    'state': lambda fake: fake.state(),
+    'postal_code': lambda fake: fake.zipcode(),
+    'country': lambda fake: fake.country(),
+    'sentence': lambda fake: fake.sentence(),
+    'text': lambda fake: fake.text(),
+    'bs': lambda fake: fake.bs()
+}
+
+CACHE_DIR = '.value_pools'
+
+
+class ValuePool:
+    """
+    Samples Faker-like values from seeded, disk-cached pools.
+
+    A pool is built the first time it is sampled: from the cache file if one
+    exists for the same provider, size, seed and Faker version, otherwise by
+    calling the provider ``size`` times with a Faker seeded from ``seed`` and
+    the provider name. The pools are independent of the data seed, so every
+    dataset reuses the same cache while the draws into the pools still follow
+    the caller's random generator.
+
+    Args:
+        sizes (dict): Pool size per provider, overriding ``DEFAULT_POOL_SIZES``.
+        seed (int): The seed the pools are built from.
+        cache_dir (str): The directory of the cached pools, or None to disable the cache.
+    """
+
+    def __init__(self, sizes=None, seed=0, cache_dir=CACHE_DIR):
+        self.sizes = dict(DEFAULT_POOL_SIZES)
+        self.sizes.update(sizes or {})
+        unknown = set(self.sizes) - set(PROVIDERS)
+        if unknown:
+            raise ValueError(f"Unknown value pools: {', '.join(sorted(unknown))}")
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self._pools = {}
+
+    def _cache_path(self, provider):
+        """
+        Returns the cache file of a pool.
+
+        Args:
+            provider (str): The provider name.
+
+        Returns:
+            str: The path, which encodes every input that changes the pool.
+        """
+        return os.path.join(self.cache_dir,
+                            f"{provider}-{self.sizes[provider]}-{self.seed}-faker{faker.VERSION}.json")
+
+    def values(self, provider):
+        """
+        Returns the pool of a provider, building or loading it on first use.
+
+        Args:
+            provider (str): The provider name, a key of ``PROVIDERS``.
+
+        Returns:
+            np.ndarray: The pooled values as a string array.
+        """
+        if provider in self._pools:
+            return self._pools[provider]
+
+        path = self._cache_path(provider) if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                values = json.load(f)
+        else:
+            fake = faker.Faker()
+            fake.seed_instance(f"{self.seed}:{provider}")
+            values = [PROVIDERS[provider](fake) for _ in range(self.sizes[provider])]
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write to a temporary file first so concurrent workers never read a partial pool
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(values, f)
+                os.replace(temp_path, path)
+
+        self._pools[provider] = np.array(values, dtype=str)
+        return self._pools[provider]
+
+    def sample(self, rng, provider, size):
+        """
+        Draws values from a pool with replacement.
+
+        Args:
+            rng (np.random.Generator): The random generator to draw from.
+            provider (str): The provider name.
+            size (int): The number of values.
+
+        Returns:
+            np.ndarray: ``size`` values.
+        """
+        pool = self.values(provider)
+        return pool[rng.integers(0, pool.size, size=size)]
+
+    def unique_emails(self, rng, ids):
+        """
+        Draws emails that are unique as long as ``ids`` are.
+
+        The row's ID is appended to the local part of a pooled email, e.g.
+        ``jsmith.1234567890@example.org``.
+
+        Args:
+            rng (np.random.Generator): The random generator to draw from.
+            ids (np.ndarray): The primary keys of the rows.
+
+        Returns:
+            np.ndarray: One email per ID.
+        """
+        local_parts, domains = np.char.partition(self.sample(rng, 'email', ids.size), '@')[:, ::2].T
+        return np.char.add(np.char.add(local_parts, '.'),
+                           np.char.add(ids.astype(str), np.char.add('@', domains)))